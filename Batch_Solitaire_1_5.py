@@ -0,0 +1,448 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Welcome to the Solitaire Batch Module.
+
+Plays thousands of games at once with NumPy. Every game is one row of a
+    set of arrays, and each step makes one move in every game that is
+    still being played, using whole-array operations rather than card
+    objects.
+
+The rules are the same as Location.can_move_cards, Location.can_move_home
+    and SpareCards.advance, and the moves are recorded in the usual
+    notation, so any game can be checked by playing it again with
+    execute_move (see verify_game).
+
+The batch policy plays the first of these moves that it can:
+    1 - the top spare card to its home pile ("SE")
+    2 - the top card of a column to its home pile ("1" -> "7")
+    3 - a column to column move that turns over a face-down card ("M35")
+    4 - the top spare card to a column ("S4")
+    5 - advance the spares pile ("S")
+Columns are tried from left to right. Like play_position, a game ends
+    when it is won, when there are no moves, when max_moves have been
+    played, or when a whole pass through the spares pile goes by without
+    any move except "S". batch_policy is the same policy for one game at
+    a time, so play_one_game(seed, batch_policy) plays the same game as
+    the batch.
+
+Usage:
+    python Batch_Solitaire_1_5.py 1 10000
+    (plays deals 1 to 10000 and prints a BatchReport)
+
+NumPy is needed for this module only; the game itself doesn't use it.
+
+"""
+
+import argparse
+import sys
+import time
+
+import numpy as np
+
+from Solitaire_1_5 import *  # import all from module
+
+
+MAX_COLUMN = 6 + 13  # 6 face-down cards under a run from King to Ace
+MAX_SPARES = 24
+EMPTY = -1  # an empty place in an array of cards
+
+# the kinds of move the batch policy makes, in the order it tries them
+NO_MOVE, SPARE_HOME, COLUMN_HOME, REVEAL, SPARE_COLUMN, ADVANCE = range(0, 6)
+
+# move code (see MOVE_CODES) for each kind of move
+SE_CODE = MOVE_CODES["SE"]
+S_CODE = MOVE_CODES["S"]
+HOME_CODES = np.array([MOVE_CODES[str(x)] for x in range(1, 8)], dtype=np.uint8)
+SPARE_COLUMN_CODES = np.array([MOVE_CODES[f"S{x}"] for x in range(1, 8)],
+                              dtype=np.uint8)
+M_CODES = np.zeros((7, 7), dtype=np.uint8)  # [from column, to column]
+for x in range(0, 7):
+    for y in range(0, 7):
+        if x != y:
+            M_CODES[x, y] = MOVE_CODES[f"M{x + 1}{y + 1}"]
+
+
+# Lookup tables by card id. An EMPTY place (-1) picks the last entry, 
+# whose value (20) is never one more or one less than a real card's, so 
+# nothing can move onto or from an empty place by mistake.
+VALUES = np.array([card_id % 13 + 1 for card_id in range(0, 52)] + [20],
+                  dtype=np.int8)
+SUITS = np.array([card_id // 13 for card_id in range(0, 52)] + [0],
+                 dtype=np.intp)
+REDS = np.array([card_id // 13 in (SUIT_INDEX["Hearts"], SUIT_INDEX["Diamonds"])
+                 for card_id in range(0, 52)] + [False])
+
+
+def batch_policy(policy_location_list, legal_move_list, rng):
+    """
+    A policy for play_one_game that picks the same move as 
+        BatchGames.choose_moves, from the moves find_legal_moves allows
+    """
+    legal_moves = set(legal_move_list)
+    if "SE" in legal_moves:
+        return "SE"
+    for x in range(0, 7):
+        if str(x + 1) in legal_moves:
+            return str(x + 1)
+    # a column to column move of the whole face-up run, from above a 
+    # face-down card
+    for x in range(0, 7):
+        column = policy_location_list[x]
+        if not 0 < column.face_up_start < len(column.card_list):
+            continue
+        card = column.card_list[column.face_up_start]
+        for y in range(0, 7):
+            if f"M{x + 1}{y + 1}" not in legal_moves:
+                continue
+            target_list = policy_location_list[y].card_list
+            if len(target_list) == 0:
+                if card.value == 13:
+                    return f"M{x + 1}{y + 1}"
+            elif column.can_move_cards(card, target_list[-1]):
+                return f"M{x + 1}{y + 1}"
+    for x in range(0, 7):
+        if f"S{x + 1}" in legal_moves:
+            return f"S{x + 1}"
+    if "S" in legal_moves:
+        return "S"
+    return None
+
+
+class BatchGames(object):
+    """
+    Many games held as NumPy arrays, one row per game, played together
+        by step.
+
+    Card ids are the codes from card_to_code without the FACE_UP bit.
+        The spares are held as in CompactState: the discard pile, then
+        the visible pile, then the spares pile, marked out by two
+        cursors.
+
+    Attributes:
+        seeds - array of the deal numbers, one per game
+        draw_count - how many spare cards are turned over at a time
+        columns - int8 array [game, column, position] of card ids, EMPTY
+            past the end of each column
+        column_lengths - int8 array [game, column]
+        face_down - int8 array [game, column] of how many face-down cards
+            are at the bottom of each column
+        homes - int8 array [game, SUIT_INDEX] of cards on each home pile
+        spares - int8 array [game, position] of spare card ids
+        spare_lengths - int16 array of how many spare cards each game has
+        visible_start - int16 array, index in spares of the first visible
+            card
+        stock_start - int16 array, index in spares of the next card to
+            be turned over
+        playing - bool array, True while a game is still being played
+        moves - int32 array of moves made in each game
+        stock_passes - int32 array of times each spares pile was recycled
+        progress - bool array, True if a move other than "S" was made in
+            this pass through the spares pile
+        move_codes - list of uint8 arrays, the move code made by each
+            game at each step (255 for no move), if record_moves is True
+
+    Methods:
+        can_move_home / can_move_onto - the rules, for arrays of cards
+        choose_moves - picks the batch policy's move for some games
+        step - makes one move in every game still being played. Returns
+            the number of games still being played
+        run - steps until every game is finished. Returns a BatchReport
+        won - returns a bool array, True for each game that has been won
+        compact_state - returns one game as a CompactState
+        records - returns the games as GameRecords (needs record_moves)
+    """
+
+    def __init__(self, seeds, draw_count=3, record_moves=False):
+        if draw_count < 1:
+            raise ValueError(f"draw_count must be at least 1, got {draw_count}")
+        self.seeds = np.array(seeds, dtype=np.int64)
+        self.draw_count = draw_count
+        games = len(self.seeds)
+        self.columns = np.full((games, 7, MAX_COLUMN), EMPTY, dtype=np.int8)
+        self.column_lengths = np.zeros((games, 7), dtype=np.int8)
+        self.face_down = np.zeros((games, 7), dtype=np.int8)
+        self.homes = np.zeros((games, 4), dtype=np.int8)
+        self.spares = np.full((games, MAX_SPARES), EMPTY, dtype=np.int8)
+        self.spare_lengths = np.zeros(games, dtype=np.int16)
+        self.visible_start = np.zeros(games, dtype=np.int16)
+        self.stock_start = np.zeros(games, dtype=np.int16)
+
+        # deck positions from deal_order are card ids, since create_deck 
+        # makes the cards in card id order. The columns are dealt as in 
+        # deal_new_hand, and the rest of the cards are the spares pile.
+        deals = np.array([deal_order(int(seed)) for seed in self.seeds],
+                         dtype=np.int8).reshape(games, 52)
+        dealt = 0
+        for x in range(0, 7):
+            self.columns[:, x, 0:x + 1] = deals[:, dealt:dealt + x + 1]
+            self.column_lengths[:, x] = x + 1
+            self.face_down[:, x] = x
+            dealt += x + 1
+        self.spares[:, 0:52 - dealt] = deals[:, dealt:]
+        self.spare_lengths[:] = 52 - dealt
+
+        self.playing = np.ones(games, dtype=bool)
+        self.moves = np.zeros(games, dtype=np.int32)
+        self.stock_passes = np.zeros(games, dtype=np.int32)
+        self.progress = np.ones(games, dtype=bool)
+        self.move_codes = [] if record_moves else None
+
+    def won(self):
+        return self.homes.sum(axis=1) == 52
+
+    def can_move_home(self, rows, cards):
+        """
+        Location.can_move_home for an array of cards, one per row in 
+            rows, or [row, column]: True where the card is the next one 
+            for its home pile
+        """
+        home_counts = self.homes[rows.reshape(-1, *([1] * (cards.ndim - 1))),
+                                 SUITS[cards]]
+        return home_counts == VALUES[cards] - 1
+
+    @staticmethod
+    def can_move_onto(cards, targets):
+        """
+        Column.move_cards' rule for arrays of cards and the top cards of 
+            the columns they would go onto (EMPTY for an empty column): 
+            opposite colours and one lower in value, or a King onto an 
+            empty column. The arrays are broadcast together.
+        """
+        card_values = VALUES[cards]
+        onto_card = ((VALUES[targets] == card_values + 1)
+                     & (REDS[cards] != REDS[targets]))
+        onto_empty = (targets == EMPTY) & (card_values == 13)
+        return onto_card | onto_empty
+
+    def choose_moves(self, rows):
+        """
+        Picks the move for each game in rows (an array of game numbers)
+        Returns a tuple of arrays, one entry per game in rows: (the kind 
+            of move to make, the column moved from, the column moved to)
+        """
+        games = len(rows)
+        column_numbers = np.arange(7)[None, :]
+        column_rows = rows[:, None]
+        lengths = self.column_lengths[rows]
+        face_down = self.face_down[rows]
+        tops = self.columns[column_rows, column_numbers,
+                            np.maximum(lengths - 1, 0)]
+        tops[lengths == 0] = EMPTY
+        stock_start = self.stock_start[rows]
+        visible = self.spares[rows, np.maximum(stock_start - 1, 0)]
+        visible[stock_start == self.visible_start[rows]] = EMPTY
+
+        kinds = np.full(games, NO_MOVE, dtype=np.int8)
+        sources = np.zeros(games, dtype=np.intp)
+        destinations = np.zeros(games, dtype=np.intp)
+
+        # 5.0 advance, if there are cards to turn over, as in 
+        # find_legal_moves: cards left in the spares pile or the discard 
+        # pile, not only visible ones (tried last, so set first)
+        kinds[(stock_start < self.spare_lengths[rows])
+              | (self.visible_start[rows] > 0)] = ADVANCE
+
+        # 4.0 top spare card to a column
+        spare_fits = self.can_move_onto(visible[:, None], tops)
+        chosen = spare_fits.any(axis=1)
+        kinds[chosen] = SPARE_COLUMN
+        destinations[chosen] = spare_fits.argmax(axis=1)[chosen]
+
+        # 3.0 column to column, moving the whole face-up run from above a 
+        # face-down card
+        bottoms = self.columns[column_rows, column_numbers, face_down]
+        bottoms[(face_down == 0) | (lengths == face_down)] = EMPTY
+        reveal_fits = self.can_move_onto(bottoms[:, :, None],
+                                         tops[:, None, :])  # [game, from, to]
+        reveal_fits[:, np.arange(7), np.arange(7)] = False
+        reveal_fits = reveal_fits.reshape(games, 49)
+        chosen = reveal_fits.any(axis=1)
+        first = reveal_fits.argmax(axis=1)
+        kinds[chosen] = REVEAL
+        sources[chosen] = first[chosen] // 7
+        destinations[chosen] = first[chosen] % 7
+
+        # 2.0 top card of a column to its home pile
+        home_fits = self.can_move_home(rows, tops)
+        chosen = home_fits.any(axis=1)
+        kinds[chosen] = COLUMN_HOME
+        sources[chosen] = home_fits.argmax(axis=1)[chosen]
+
+        # 1.0 top spare card to its home pile
+        kinds[self.can_move_home(rows, visible)] = SPARE_HOME
+        return kinds, sources, destinations
+
+    def remove_visible(self, rows):
+        """
+        Takes the top visible spare card out of the spares of each game
+            in rows, closing up the gap. Returns the cards taken.
+        """
+        position = self.stock_start[rows] - 1
+        cards = self.spares[rows, position]
+        places = np.arange(MAX_SPARES)[None, :]
+        index = np.minimum(places + (places >= position[:, None]), MAX_SPARES - 1)
+        spares = np.take_along_axis(self.spares[rows], index, axis=1)
+        spares[:, MAX_SPARES - 1] = EMPTY
+        self.spares[rows] = spares
+        self.stock_start[rows] -= 1
+        self.spare_lengths[rows] -= 1
+        return cards
+
+    def add_to_column(self, rows, columns, cards):
+        lengths = self.column_lengths[rows, columns]
+        self.columns[rows, columns, lengths] = cards
+        self.column_lengths[rows, columns] = lengths + 1
+
+    def add_to_home(self, rows, cards):
+        self.homes[rows, SUITS[cards]] += 1
+
+    def step(self):
+        # only the games still being played are looked at
+        playing_rows = np.flatnonzero(self.playing)
+        kinds, sources, destinations = self.choose_moves(playing_rows)
+        codes = np.full(len(self.seeds), 255, dtype=np.uint8)
+
+        # 1.0 top spare card to its home pile
+        rows = playing_rows[kinds == SPARE_HOME]
+        self.add_to_home(rows, self.remove_visible(rows))
+        codes[rows] = SE_CODE
+
+        # 2.0 top card of a column to its home pile, turning over the card 
+        # underneath if it is face-down
+        chosen = kinds == COLUMN_HOME
+        rows = playing_rows[chosen]
+        columns = sources[chosen]
+        lengths = self.column_lengths[rows, columns] - 1
+        self.add_to_home(rows, self.columns[rows, columns, lengths])
+        self.columns[rows, columns, lengths] = EMPTY
+        self.column_lengths[rows, columns] = lengths
+        revealed = (lengths > 0) & (self.face_down[rows, columns] == lengths)
+        self.face_down[rows[revealed], columns[revealed]] -= 1
+        codes[rows] = HOME_CODES[columns]
+
+        # 3.0 the face-up run moves from one column to another, one place 
+        # at a time, then the card underneath is turned over
+        chosen = kinds == REVEAL
+        rows = playing_rows[chosen]
+        from_columns = sources[chosen]
+        to_columns = destinations[chosen]
+        starts = self.face_down[rows, from_columns].astype(np.intp)
+        run_lengths = self.column_lengths[rows, from_columns] - starts
+        to_lengths = self.column_lengths[rows, to_columns].astype(np.intp)
+        for x in range(0, run_lengths.max(initial=0)):
+            moving = run_lengths > x
+            moving_rows = rows[moving]
+            self.columns[moving_rows, to_columns[moving], to_lengths[moving] + x] = \
+                self.columns[moving_rows, from_columns[moving], starts[moving] + x]
+            self.columns[moving_rows, from_columns[moving], starts[moving] + x] = EMPTY
+        self.column_lengths[rows, to_columns] += run_lengths.astype(np.int8)
+        self.column_lengths[rows, from_columns] = starts
+        self.face_down[rows, from_columns] -= 1
+        codes[rows] = M_CODES[from_columns, to_columns]
+
+        # 4.0 top spare card to a column
+        chosen = kinds == SPARE_COLUMN
+        rows = playing_rows[chosen]
+        self.add_to_column(rows, destinations[chosen], self.remove_visible(rows))
+        codes[rows] = SPARE_COLUMN_CODES[destinations[chosen]]
+
+        self.progress[playing_rows[(kinds != NO_MOVE) & (kinds != ADVANCE)]] = True
+
+        # 5.0 advance, as SpareCards.advance: recycling when the spares 
+        # pile is empty, unless the last pass made no progress
+        rows = playing_rows[kinds == ADVANCE]
+        recycling = self.stock_start[rows] == self.spare_lengths[rows]
+        stuck = recycling & ~self.progress[rows]
+        self.playing[rows[stuck]] = False
+        recycled_rows = rows[recycling & ~stuck]
+        self.stock_passes[recycled_rows] += 1
+        self.progress[recycled_rows] = False
+        self.stock_start[recycled_rows] = 0
+        rows = rows[~stuck]
+        self.visible_start[rows] = self.stock_start[rows]
+        self.stock_start[rows] = np.minimum(self.spare_lengths[rows],
+                                            self.stock_start[rows] + self.draw_count)
+        codes[rows] = S_CODE
+
+        self.playing[playing_rows[kinds == NO_MOVE]] = False
+        self.moves[codes != 255] += 1
+        self.playing[playing_rows[self.homes[playing_rows].sum(axis=1) == 52]] = False
+        if self.move_codes is not None:
+            self.move_codes.append(codes)
+        return int(self.playing.sum())
+
+    def run(self, max_moves=1000):
+        start = time.perf_counter()
+        self.playing &= ~self.won()
+        for x in range(0, max_moves):
+            if self.step() == 0:
+                break
+        self.playing[:] = False
+        return BatchReport(len(self.seeds), int(self.won().sum()),
+                           int(self.moves.sum()), int(self.stock_passes.sum()),
+                           time.perf_counter() - start)
+
+    def compact_state(self, n):
+        """
+        Returns game n as a CompactState, with the same face-up bits as
+            the location_list it stands for
+        """
+        columns = []
+        for x in range(0, 7):
+            length = self.column_lengths[n, x]
+            face_down = self.face_down[n, x]
+            columns.append(bytearray(
+                int(card) | (FACE_UP if y >= face_down else 0)
+                for y, card in enumerate(self.columns[n, x, 0:length])))
+        visible_start = int(self.visible_start[n])
+        stock_start = int(self.stock_start[n])
+        spares = bytearray(
+            int(card) | (FACE_UP if visible_start <= y < stock_start else 0)
+            for y, card in enumerate(self.spares[n, 0:self.spare_lengths[n]]))
+        return CompactState(columns, bytearray(int(h) for h in self.homes[n]),
+                            spares, visible_start, stock_start,
+                            self.draw_count)
+
+    def records(self):
+        if self.move_codes is None:
+            raise ValueError("the moves weren't recorded (see record_moves)")
+        all_codes = (np.stack(self.move_codes, axis=1) if self.move_codes
+                     else np.zeros((len(self.seeds), 0), dtype=np.uint8))
+        won = self.won()
+        game_records = []
+        for n in range(0, len(self.seeds)):
+            codes = all_codes[n][all_codes[n] != 255]
+            game_records.append(GameRecord(
+                int(self.seeds[n]), self.draw_count, decode_moves(codes.tobytes()),
+                bool(won[n]), home_counts(self.compact_state(n).to_location_list())))
+        return game_records
+
+
+def simulate_batch(first_seed, count, max_moves=1000, draw_count=3):
+    """
+    Plays count deals, numbered from first_seed, all at once with
+        BatchGames.
+    Returns a BatchReport (the time includes dealing the games)
+    """
+    start = time.perf_counter()
+    report = BatchGames(range(first_seed, first_seed + count),
+                        draw_count).run(max_moves)
+    report.seconds = time.perf_counter() - start
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Play many Solitaire games at once.")
+    parser.add_argument("first_seed", type=int)
+    parser.add_argument("count", type=int)
+    parser.add_argument("--draw-count", type=int, default=3)
+    parser.add_argument("--max-moves", type=int, default=1000)
+    args = parser.parse_args(argv)
+    print(simulate_batch(args.first_seed, args.count, args.max_moves,
+                         args.draw_count))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
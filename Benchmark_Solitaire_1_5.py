@@ -0,0 +1,232 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Welcome to the Solitaire Benchmark Module.
+
+Times the hot paths of the game engine:
+    create_deck, shuffle_deck, deal_new_hand, SpareCards.advance,
+    Column.move_cards, Location.move_to_home, have_won and whole games
+    played with random_policy.
+
+Every benchmark uses fixed deal numbers, so runs are comparable. Each one
+    is warmed up, then timed several times, and the best and median time
+    per operation are kept.
+
+Usage:
+    python Benchmark_Solitaire_1_5.py --output results.json
+    python Benchmark_Solitaire_1_5.py --compare results.json
+
+With --compare, any benchmark that is more than --threshold (default 10%)
+    slower than in the earlier results file is reported as a regression,
+    and the exit code is 1.
+
+"""
+
+import argparse
+import json
+import platform
+import statistics
+import sys
+import time
+
+from Solitaire_1_5 import *  # import all from module
+
+
+'''
+Each benchmark is a pair of functions:
+    prepare(loops) - builds everything the timed part needs, untimed
+    run(prepared) - does the operation loops times
+'''
+
+
+def prepare_nothing(loops):
+    return range(0, loops)
+
+
+def run_create_deck(prepared):
+    for i in prepared:
+        create_deck()
+
+
+def run_shuffle_deck(prepared):
+    for i in prepared:
+        shuffle_deck(seed=i)
+
+
+def run_deal_new_hand(prepared):
+    for i in prepared:
+        deal_new_hand(seed=i)
+
+
+def prepare_advance(loops):
+    # a new dealt hand every 24 advances, so the recycling is timed too
+    prepared = []
+    for i in range(0, loops):
+        if i % 24 == 0:
+            bench_location_list = deal_new_hand(seed=i)
+        prepared.append(bench_location_list)
+    return prepared
+
+
+def run_advance(prepared):
+    for bench_location_list in prepared:
+        bench_location_list[11].advance(bench_location_list)
+
+
+def prepare_move_cards(loops):
+    # a 3 card run (Queen, Jack, 10) on 2 face-down cards, moving onto a King
+    prepared = []
+    for i in range(0, loops):
+        deck = create_deck()
+        column_1 = Column(1, [deck[30], deck[31], deck[11], deck[36], deck[9]],
+                          face_up_start=2)
+        column_2 = Column(2, [deck[25]], face_up_start=0)
+        prepared.append((column_1, column_2))
+    return prepared
+
+
+def run_move_cards(prepared):
+    for column_1, column_2 in prepared:
+        column_1.move_cards(None, column_2)
+
+
+def prepare_move_to_home(loops):
+    prepared = []
+    for i in range(0, loops):
+        bench_location_list = set_up_locations()
+        deck = create_deck()
+        # Ace of Spades - home pile is last
+        bench_location_list[0].add_cards([deck[2], deck[13]])
+        bench_location_list[0].face_up_start = 1
+        prepared.append(bench_location_list)
+    return prepared
+
+
+def run_move_to_home(prepared):
+    for bench_location_list in prepared:
+        bench_location_list[0].move_to_home(bench_location_list)
+
+
+def prepare_have_won(loops):
+    return [deal_new_hand(seed=1)] * loops
+
+
+def run_have_won(prepared):
+    for bench_location_list in prepared:
+        have_won(bench_location_list)
+
+
+def run_random_games(prepared):
+    for i in prepared:
+        play_one_game(i, random_policy, max_moves=500)
+
+
+# name: (prepare, run, loops per timing)
+BENCHMARKS = {
+    "create_deck": (prepare_nothing, run_create_deck, 2000),
+    "shuffle_deck": (prepare_nothing, run_shuffle_deck, 2000),
+    "deal_new_hand": (prepare_nothing, run_deal_new_hand, 1000),
+    "SpareCards.advance": (prepare_advance, run_advance, 4800),
+    "Column.move_cards": (prepare_move_cards, run_move_cards, 4000),
+    "Location.move_to_home": (prepare_move_to_home, run_move_to_home, 4000),
+    "have_won": (prepare_have_won, run_have_won, 20000),
+    "random_policy_game": (prepare_nothing, run_random_games, 10),
+}
+
+
+def time_benchmark(prepare, run, loops, repeat=5, warmup=1):
+    """
+    Runs a benchmark warmup times untimed, then repeat times timed, with
+        freshly prepared data each time.
+    Returns a dict of the best and median seconds per operation.
+    """
+    timings = []
+    for i in range(0, warmup + repeat):
+        prepared = prepare(loops)
+        start = time.perf_counter()
+        run(prepared)
+        elapsed = time.perf_counter() - start
+        if i >= warmup:
+            timings.append(elapsed / loops)
+    return {
+        "best": min(timings),
+        "median": statistics.median(timings),
+        "loops": loops,
+        "repeat": repeat,
+    }
+
+
+def run_benchmarks(names=None, repeat=5, warmup=1, scale=1.0):
+    """
+    Runs the benchmarks called names (all of them if not given), with the
+        loops of each multiplied by scale.
+    Returns the results as a dict that can be saved with json.
+    """
+    if names is None:
+        names = list(BENCHMARKS)
+    results = {}
+    for name in names:
+        prepare, run, loops = BENCHMARKS[name]
+        loops = max(1, int(loops * scale))
+        results[name] = time_benchmark(prepare, run, loops, repeat, warmup)
+    return {
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "created": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "benchmarks": results,
+    }
+
+
+def compare_results(old_results, new_results, threshold=0.10):
+    """
+    Compares the best times of two sets of results from run_benchmarks.
+    Returns a list of (name, old seconds, new seconds) for every
+        benchmark that is more than threshold (a fraction) slower.
+    """
+    regressions = []
+    for name, new in new_results["benchmarks"].items():
+        old = old_results["benchmarks"].get(name)
+        if old is None:
+            continue
+        if new["best"] > old["best"] * (1 + threshold):
+            regressions.append((name, old["best"], new["best"]))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Time the Solitaire engine.")
+    parser.add_argument("--output", help="save the results to this JSON file")
+    parser.add_argument("--compare", help="JSON results file to compare against")
+    parser.add_argument("--threshold", type=float, default=0.10,
+                        help="slow-down that counts as a regression (default 0.10)")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--warmup", type=int, default=1)
+    parser.add_argument("--scale", type=float, default=1.0,
+                        help="multiply the number of loops by this")
+    parser.add_argument("names", nargs="*", help="benchmarks to run (default all)")
+    args = parser.parse_args(argv)
+
+    results = run_benchmarks(args.names or None, args.repeat, args.warmup,
+                             args.scale)
+    for name, result in results["benchmarks"].items():
+        print(f"{name:24} best {result['best'] * 1e6:10.2f} us   "
+              f"median {result['median'] * 1e6:10.2f} us")
+
+    if args.output:
+        with open(args.output, "w") as output_file:
+            json.dump(results, output_file, indent=2)
+
+    if args.compare:
+        with open(args.compare) as compare_file:
+            old_results = json.load(compare_file)
+        regressions = compare_results(old_results, results, args.threshold)
+        for name, old_time, new_time in regressions:
+            print(f"REGRESSION {name}: {old_time * 1e6:.2f} us -> "
+                  f"{new_time * 1e6:.2f} us")
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,511 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Welcome to the Solitaire Server.
+
+Hosts many games at once in one process, over a local TCP or Unix socket.
+    Each connection is a session with its own game, and is served by an
+    asyncio task, so idle players cost almost nothing.
+
+The protocol is one command per line, using the same commands as
+    play_game:
+    "M35", "1" -> "7", "S", "SE", "S4" - make a move
+    "U" / "R" - undo / redo the last move
+    "NEW" - deal a new game ("NEW 123" deals deal number 123)
+    "SHOW" - show the game again
+    "QUIT" - end the session
+    "RESUME <id>" - carry on with an earlier session (only when the server
+        keeps its sessions in a store, see SessionStore)
+
+A connection that sends nothing for a while has its session packed into a
+    snapshot (into the store, if there is one) until its next line comes.
+
+Every reply is a status line, then the game as play_game shows it, then a
+    line holding just ".". The status line is one of:
+    "HELLO session <id> deal <deal number>" - when connecting, and after NEW
+    "OK <move>" - the move was made
+    "WON <move>" - the move was made and won the game
+    "ERR <reason>" - nothing was changed
+    "BYE" - after QUIT, with no game and no "." line
+
+Usage:
+    python Server_Solitaire_1_5.py --port 8765
+    python Server_Solitaire_1_5.py --unix /tmp/solitaire.sock
+    python Server_Solitaire_1_5.py --store sessions/ --memory-cap 64
+    python Server_Solitaire_1_5.py --idle-seconds 30
+
+"""
+
+import argparse
+import asyncio
+import collections
+import concurrent.futures
+import os
+import struct
+import sys
+
+from Solitaire_1_5 import *  # import all from module
+
+
+# each snapshot: session id, seed, draw_count, packed CompactState length,
+# moves in the journal, undone moves
+SNAPSHOT_HEADER = struct.Struct("<IIBBII")
+# each MoveResult in a snapshot: move code (see MOVE_CODES), source, 
+# destination, cards, flags (see RESULT_FLAGS)
+RESULT_RECORD = struct.Struct("<BBBBB")
+# MoveResult attribute -> flag bit. returned is kept in the bits above them.
+RESULT_FLAGS = {"revealed": 1, "recycled": 2, "automatic": 4}
+RETURNED_SHIFT = 3
+
+
+def encode_results(result_list):
+    """
+    Returns the applied MoveResults in result_list as bytes, 
+        RESULT_RECORD.size bytes each, so that a Game's journal can be 
+        saved and its moves undone without playing the game again
+    """
+    encoded = bytearray()
+    for result in result_list:
+        flags = result.returned << RETURNED_SHIFT
+        for attribute, flag in RESULT_FLAGS.items():
+            if getattr(result, attribute):
+                flags |= flag
+        encoded += RESULT_RECORD.pack(MOVE_CODES[result.move], result.source,
+                                      result.destination, result.cards, flags)
+    return bytes(encoded)
+
+
+def decode_results(encoded_results):
+    """
+    Returns the list of MoveResults held in bytes from encode_results
+    """
+    result_list = []
+    for code, source, destination, cards, flags in RESULT_RECORD.iter_unpack(
+            encoded_results):
+        result = MoveResult(CODE_MOVES[code], True, source=source,
+                            destination=destination, cards=cards,
+                            returned=flags >> RETURNED_SHIFT)
+        for attribute, flag in RESULT_FLAGS.items():
+            setattr(result, attribute, bool(flags & flag))
+        result_list.append(result)
+    return result_list
+
+
+class Session(object):
+    """
+    One player's game on the server.
+
+    A session can be saved as a snapshot (see to_bytes): a 
+        SNAPSHOT_HEADER, the position as a packed CompactState (at most 
+        67 bytes), then the game's journal and undone moves (see 
+        encode_results), so that the moves can still be undone and 
+        redone after the session is restored.
+
+    Attributes:
+        session_id - the number the server gave the session
+        seed - the deal number being played
+        draw_count - how many spare cards "S" turns over at a time
+        game - the Game being played
+
+    Methods:
+        new_game - deals a new game
+        handle - carries out one command line. Returns the status line,
+            or None if the session should end
+        to_bytes - returns a snapshot of the session
+        from_bytes - (classmethod) restores a session from a snapshot
+    """
+
+    def __init__(self, session_id, draw_count=3, seed=None):
+        self.session_id = session_id
+        self.draw_count = draw_count
+        self.new_game(seed)
+
+    def new_game(self, seed=None):
+        if seed is None:
+            seed = new_deal_number()
+        self.seed = seed
+        self.game = Game(deal_new_hand(seed, self.draw_count))
+
+    def to_bytes(self):
+        packed = CompactState.from_location_list(self.game.location_list).pack()
+        return (SNAPSHOT_HEADER.pack(self.session_id, self.seed,
+                                     self.draw_count, len(packed),
+                                     len(self.game.journal),
+                                     len(self.game.undone))
+                + packed + encode_results(self.game.journal)
+                + encode_results(self.game.undone))
+
+    @classmethod
+    def from_bytes(cls, snapshot):
+        (session_id, seed, draw_count, packed_length, moves_length,
+         undone_length) = SNAPSHOT_HEADER.unpack_from(snapshot)
+        x = SNAPSHOT_HEADER.size
+        session = cls.__new__(cls)
+        session.session_id = session_id
+        session.seed = seed
+        session.draw_count = draw_count
+        session.game = Game(CompactState.unpack(
+            snapshot[x:x + packed_length]).to_location_list())
+        x += packed_length
+        # the results record exactly what each move changed, so undo and 
+        #   redo work on the restored position straight away
+        journal_end = x + moves_length * RESULT_RECORD.size
+        session.game.journal = decode_results(snapshot[x:journal_end])
+        session.game.undone = decode_results(
+            snapshot[journal_end:journal_end + undone_length * RESULT_RECORD.size])
+        return session
+
+    def hello(self):
+        return f"HELLO session {self.session_id} deal {self.seed}"
+
+    def handle(self, line):
+        words = line.split()
+        if len(words) == 0:
+            return "ERR " + NOT_UNDERSTOOD
+        command = words[0].upper()
+
+        if command == "QUIT":
+            return None
+        if command == "SHOW":
+            return f"OK {command}"
+        if command == "NEW":
+            if len(words) > 1:
+                if not words[1].isdigit() or int(words[1]) > MAX_DEAL_NUMBER:
+                    return "ERR That isn't a deal number"
+                self.new_game(int(words[1]))
+            else:
+                self.new_game()
+            return self.hello()
+        if len(words) > 1:
+            return "ERR " + NOT_UNDERSTOOD
+        if command == "U":
+            if self.game.undo() is None:
+                return "ERR There is nothing to undo"
+            return f"OK {command}"
+        if command == "R":
+            if self.game.redo() is None:
+                return "ERR There is nothing to redo"
+            return f"OK {command}"
+
+        result = self.game.move(command)
+        if not result.applied:
+            return "ERR " + result.reason
+        if have_won(self.game.location_list):
+            return f"WON {command}"
+        return f"OK {command}"
+
+
+class SessionStore(object):
+    """
+    Holds sessions as snapshots (see Session.to_bytes), keeping the most 
+        recently used ones in memory and writing the rest to files in 
+        directory, so the server can hold far more games than fit in 
+        memory, and they survive the server being restarted.
+    The methods read and write files, so GameServer only calls them from 
+        its store worker thread (see GameServer.run_store).
+
+    Attributes:
+        directory - where the snapshot files are kept, one per session
+        memory_cap - the most bytes of snapshots to keep in memory
+        snapshots - OrderedDict: session id -> snapshot, least recently 
+            used first
+        memory_used - bytes used by snapshots (as counted by 
+            sys.getsizeof)
+        next_session_id - the id to give the next new session
+
+    Methods:
+        new_session - creates a Session with the next id and stores it
+        put - stores a session, writing the least recently used 
+            snapshots to disk if that takes memory_used over memory_cap
+        get - returns a stored session, reading it back from disk if it 
+            isn't in memory. Raises KeyError if there is no such session
+        remove - forgets a session, in memory and on disk
+        flush - writes every snapshot in memory to disk
+    """
+
+    def __init__(self, directory, memory_cap=64 * 1024 * 1024):
+        self.directory = directory
+        self.memory_cap = memory_cap
+        self.snapshots = collections.OrderedDict()
+        self.memory_used = 0
+        os.makedirs(directory, exist_ok=True)
+        session_ids = [int(name[:-len(".snap")]) for name in os.listdir(directory)
+                       if name.endswith(".snap") and name[:-len(".snap")].isdigit()]
+        self.next_session_id = max(session_ids, default=0) + 1
+
+    def snapshot_path(self, session_id):
+        return os.path.join(self.directory, f"{session_id}.snap")
+
+    def new_session(self, draw_count=3):
+        session = Session(self.next_session_id, draw_count)
+        self.next_session_id += 1
+        self.put(session)
+        return session
+
+    def put(self, session):
+        session_id = session.session_id
+        self.forget(session_id)
+        snapshot = session.to_bytes()
+        self.snapshots[session_id] = snapshot
+        self.memory_used += sys.getsizeof(snapshot)
+        while self.memory_used > self.memory_cap and len(self.snapshots) > 1:
+            self.evict()
+
+    def get(self, session_id):
+        snapshot = self.snapshots.get(session_id)
+        if snapshot is not None:
+            self.snapshots.move_to_end(session_id)
+            return Session.from_bytes(snapshot)
+        try:
+            with open(self.snapshot_path(session_id), "rb") as snapshot_file:
+                snapshot = snapshot_file.read()
+        except FileNotFoundError:
+            raise KeyError(session_id) from None
+        session = Session.from_bytes(snapshot)
+        self.put(session)
+        return session
+
+    def forget(self, session_id):
+        # the snapshot in memory is always the latest, so it replaces any 
+        # file when it is written out
+        snapshot = self.snapshots.pop(session_id, None)
+        if snapshot is not None:
+            self.memory_used -= sys.getsizeof(snapshot)
+
+    def remove(self, session_id):
+        self.forget(session_id)
+        try:
+            os.remove(self.snapshot_path(session_id))
+        except FileNotFoundError:
+            pass
+
+    def evict(self):
+        session_id, snapshot = self.snapshots.popitem(last=False)
+        self.memory_used -= sys.getsizeof(snapshot)
+        self.write_snapshot(session_id, snapshot)
+
+    def write_snapshot(self, session_id, snapshot):
+        # written to a new file first, so a crash never leaves half a file
+        path = self.snapshot_path(session_id)
+        with open(path + ".tmp", "wb") as snapshot_file:
+            snapshot_file.write(snapshot)
+        os.replace(path + ".tmp", path)
+
+    def flush(self):
+        for session_id, snapshot in self.snapshots.items():
+            self.write_snapshot(session_id, snapshot)
+
+    def __contains__(self, session_id):
+        return (session_id in self.snapshots
+                or os.path.exists(self.snapshot_path(session_id)))
+
+
+class GameServer(object):
+    """
+    Serves a Session to every connection.
+    The session being played on a connection is kept unpacked, and goes 
+        into the store when the connection ends or moves to another 
+        session with "RESUME <id>". A connection that sends nothing for 
+        idle_seconds has its session packed (see park_session), so idle 
+        players only hold a snapshot, which counts against the store's 
+        memory_cap.
+
+    Attributes:
+        sessions - dict: session id -> Session, for the open connections 
+            (None while a resumed session is being read from the store, 
+            or while the connection is idle)
+        store - a SessionStore to keep the sessions in, or None to keep 
+            each one in memory only while its connection is open
+        idle_seconds - how long a connection can send nothing before its 
+            session is packed, or None to never pack it
+        store_executor - the one worker thread that does all of the 
+            store's work, in the order it was asked for (None if there 
+            is no store)
+        draw_count - how many spare cards "S" turns over at a time in new
+            sessions
+
+    Methods:
+        start - (coroutine) starts listening on a TCP port, or on a Unix
+            socket if path is given. Returns the asyncio Server
+        run_store - (coroutine) calls a store method in the store worker 
+            thread, so reading and writing snapshot files never holds up 
+            the event loop. Returns what the method returns
+        handle_connection - (coroutine) plays one session until the
+            client quits or disconnects
+        handle_line - (coroutine) carries out one command line, including 
+            "RESUME <id>", which carries on with a session from the store
+        park_session - (coroutine) packs the session of an idle 
+            connection. Returns its snapshot, or None if it went into the 
+            store
+        unpark_session - (coroutine) restores a session packed by 
+            park_session. Returns the Session
+        close - waits for the store worker thread to finish
+    """
+
+    def __init__(self, draw_count=3, store=None, idle_seconds=60):
+        self.sessions = {}
+        self.store = store
+        self.idle_seconds = idle_seconds
+        self.store_executor = None
+        if store is not None:
+            self.store_executor = concurrent.futures.ThreadPoolExecutor(
+                max_workers=1)
+        self.draw_count = draw_count
+        self.next_session_id = 1
+
+    async def start(self, host="127.0.0.1", port=8765, path=None):
+        if path is not None:
+            return await asyncio.start_unix_server(self.handle_connection,
+                                                   path)
+        return await asyncio.start_server(self.handle_connection, host, port)
+
+    async def run_store(self, method, *args):
+        return await asyncio.get_running_loop().run_in_executor(
+            self.store_executor, method, *args)
+
+    async def open_session(self):
+        if self.store is not None:
+            session = await self.run_store(self.store.new_session,
+                                           self.draw_count)
+        else:
+            session = Session(self.next_session_id, self.draw_count)
+            self.next_session_id += 1
+        self.sessions[session.session_id] = session
+        return session
+
+    async def close_session(self, session):
+        # sessions in the store are kept, so they can be resumed later
+        self.sessions.pop(session.session_id, None)
+        if self.store is not None:
+            await self.run_store(self.store.put, session)
+
+    async def handle_line(self, session, line):
+        """
+        Returns a tuple: (status line, the session to carry on with)
+        """
+        words = line.split()
+        if len(words) == 0 or words[0].upper() != "RESUME":
+            return session.handle(line), session
+        if self.store is None or len(words) != 2 or not words[1].isdigit():
+            return "ERR There is no session with that number", session
+        session_id = int(words[1])
+        if session_id in self.sessions:
+            return "ERR That session is already being played", session
+
+        self.sessions[session_id] = None  # so no one else can resume it
+        try:
+            resumed = await self.run_store(self.store.get, session_id)
+        except KeyError:
+            del self.sessions[session_id]
+            return "ERR There is no session with that number", session
+        except BaseException:  # cancelled, or the snapshot couldn't be read
+            del self.sessions[session_id]
+            raise
+        self.sessions[session_id] = resumed
+
+        if len(session.game.journal) == 0:
+            self.sessions.pop(session.session_id, None)
+            await self.run_store(self.store.remove, session.session_id)  # nothing to keep
+        else:
+            await self.close_session(session)
+        return resumed.hello(), resumed
+
+    async def park_session(self, session):
+        self.sessions[session.session_id] = None  # still being played
+        if self.store is not None:
+            await self.run_store(self.store.put, session)
+            return None
+        return session.to_bytes()
+
+    async def unpark_session(self, session_id, snapshot):
+        if snapshot is None:
+            session = await self.run_store(self.store.get, session_id)
+        else:
+            session = Session.from_bytes(snapshot)
+        self.sessions[session_id] = session
+        return session
+
+    async def handle_connection(self, reader, writer):
+        session = await self.open_session()
+        session_id = session.session_id
+        try:
+            status = session.hello()
+            while status is not None:
+                writer.write(f"{status}\n{board_frame(session.game.location_list)}"
+                             ".\n".encode())
+                await writer.drain()
+                try:
+                    line = await asyncio.wait_for(reader.readline(),
+                                                  self.idle_seconds)
+                except asyncio.TimeoutError:
+                    # a cancelled readline leaves what it had read in the 
+                    #   reader, so nothing from the client is lost
+                    snapshot = await self.park_session(session)
+                    session = None
+                    line = await reader.readline()
+                    if len(line) > 0:
+                        session = await self.unpark_session(session_id,
+                                                            snapshot)
+                if len(line) == 0:  # the client has gone
+                    return None
+                status, session = await self.handle_line(
+                    session, line.decode(errors="replace"))
+                session_id = session.session_id
+            writer.write(b"BYE\n")
+            await writer.drain()
+        except (ConnectionError, ValueError):
+            # ValueError - a line longer than the reader's limit
+            pass
+        finally:
+            if session is not None:
+                await self.close_session(session)
+            else:  # packed by park_session, so already in any store
+                self.sessions.pop(session_id, None)
+            writer.close()
+
+    def close(self):
+        if self.store_executor is not None:
+            self.store_executor.shutdown()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Host Solitaire games.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--unix", help="listen on this Unix socket instead")
+    parser.add_argument("--draw-count", type=int, default=3,
+                        help="spare cards turned over at a time (1 or 3)")
+    parser.add_argument("--store",
+                        help="keep sessions in this directory, so they can be "
+                             "resumed")
+    parser.add_argument("--memory-cap", type=int, default=64,
+                        help="megabytes of sessions to keep in memory (default 64)")
+    parser.add_argument("--idle-seconds", type=float, default=60,
+                        help="seconds a connection can send nothing before its "
+                             "session is packed (default 60)")
+    args = parser.parse_args(argv)
+
+    store = None
+    if args.store:
+        store = SessionStore(args.store, args.memory_cap * 1024 * 1024)
+
+    game_server = GameServer(args.draw_count, store, args.idle_seconds)
+
+    async def serve():
+        server = await game_server.start(args.host, args.port, args.unix)
+        async with server:
+            await server.serve_forever()
+
+    try:
+        asyncio.run(serve())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        game_server.close()
+        if store is not None:
+            store.flush()
+    return 0
+
+
+if __name__ == '__main__':
+    main()
@@ -38,33 +38,97 @@ There are a few tweaks that I would like to make:
 
 """
 
+import argparse
+import collections
+import contextlib
+import functools
+import json
+import mmap
+import multiprocessing
+import os
+import queue
+import random
+import shutil
+import struct
+import sys
+import time
+import warnings
+
+
+# Suits in the order create_deck uses them. A card's code is 
+#   suit index * 13 + value - 1, so the codes 0-51 follow the deck order.
+SUIT_LIST = ["Hearts", "Spades", "Clubs", "Diamonds"]
+SUIT_INDEX = {"Hearts": 0, "Spades": 1, "Clubs": 2, "Diamonds": 3}
+SUIT_COLOURS = {"Hearts": "red", "Spades": "black", "Clubs": "black",
+                "Diamonds": "red"}
+VALUE_NAMES = {1: "Ace", 11: "Jack", 12: "Queen", 13: "King"}
+
+
+def card_label(suit, value):
+    """
+    Returns the name of a card, i.e. "Queen of Diamonds"
+    """
+    return f"{VALUE_NAMES.get(value, value)} of {suit}"
+
 
 class Card(object):
     """
     Attributes:
         suit (string)
         value (int, 1-13)
-        side (string, default = "face-down")
+        colour (string, "red" or "black")
+        label (string, i.e. "Queen of Diamonds")
+        card_id (int, 0-51, see card_to_code)
+        suit_index (int, the suit's place in SUIT_LIST)
     Methods:
-        set_side - change side from face-down to face-up. Input should 
-                   be string.
-        __str__ - returns value and suit only if card is not face-down 
-                  (otherwise returns "x")
+        from_id - (classmethod) returns the card with a card id from 
+                  CARD_FACES
+        zero - (classmethod) returns the value 0 card of a suit from 
+               ZERO_CARDS
+        set_side - deprecated and does nothing: whether a card is 
+                   face-up is kept by the location it is in
+        __str__ - returns the label
+
+    There is one card object for each of the 52 cards (see CARD_FACES), 
+        shared by every deal, so cards can't be changed once made. 
+        __slots__ keeps each card small.
+    Raises ValueError for a suit that isn't in SUIT_LIST.
     """
 
-    def __init__(self, suit, value, side="face-down"):
-        self.suit = suit
-        self.value = value
-        self.side = side
+    __slots__ = ("suit", "value", "colour", "label", "card_id", "suit_index")
 
-        black_suits = ["Spades", "Clubs"]
-        if suit in black_suits:
-            self.colour = "black"
-        else:
-            self.colour = "red"
+    def __init__(self, suit, value):
+        if suit not in SUIT_INDEX:
+            raise ValueError(f"unknown suit {suit!r}")
+        suit_index = SUIT_INDEX[suit]
+        for name, attribute in (("suit", suit), ("value", value),
+                                ("colour", SUIT_COLOURS[suit]),
+                                ("label", card_label(suit, value)),
+                                ("card_id", suit_index * 13 + value - 1),
+                                ("suit_index", suit_index)):
+            object.__setattr__(self, name, attribute)
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"cards are shared, so {name} can't be changed")
+
+    def __reduce__(self):
+        # copied and pickled as the shared card, not a new one
+        if self.value == 0:
+            return (Card.zero, (self.suit,))
+        return (Card.from_id, (self.card_id,))
+
+    @classmethod
+    def from_id(cls, card_id):
+        return CARD_FACES[card_id]
+
+    @classmethod
+    def zero(cls, suit):
+        return ZERO_CARDS[suit]
 
     def set_side(self, new_side):
-        self.side = new_side
+        warnings.warn("Card.set_side does nothing, the location a card is "
+                      "in keeps whether it is face-up", DeprecationWarning,
+                      stacklevel=2)
 
     def get_suit(self):
         return self.suit
@@ -72,38 +136,29 @@ class Card(object):
     def get_value(self):
         return self.value
 
-    def get_side(self):
-        return self.side
-
     def get_colour(self):
         return self.colour
 
     def get_suit_and_value(self):
-        i = self.value
-        if i == 1:
-            i = "Ace"
-        if i == 11:
-            i = 'Jack'
-        if i == 12:
-            i = 'Queen'
-        if i == 13:
-            i = 'King'
-        return f"{i} of {self.suit}"
+        return self.label
 
     def __str__(self):
-        if self.side == "face-down":
-            return "X"
-        else:
-            i = self.value
-            if i == 1:
-                i = "Ace"
-            if i == 11:
-                i = 'Jack'
-            if i == 12:
-                i = 'Queen'
-            if i == 13:
-                i = 'King'
-            return f"{i} of {self.suit}"
+        return self.label
+
+
+def create_card_faces():
+    """
+    Returns a tuple of the 52 cards, each at the index of its card id 
+        (see card_to_code)
+    """
+    return tuple(Card(suit, value)
+                 for suit in SUIT_LIST for value in range(1, 14))
+
+
+# the only card objects there are: every deal hands out these same cards
+CARD_FACES = create_card_faces()
+# the value 0 card at the bottom of each home pile
+ZERO_CARDS = {suit: Card(suit, 0) for suit in SUIT_LIST}
 
 
 def create_deck():
@@ -112,61 +167,80 @@ def create_deck():
     Returns the list 'deck' of card objects (un-shuffled)
     Card objects are numbered 1-13. When card values need to be printed,
         the special values (AJQK) are substituted for number 1, 11, 12 & 13.
+    The deck is in card id order (see card_to_code), and is made of the 
+        shared cards in CARD_FACES.
     """
-    suits = ["Hearts", "Spades", "Clubs", "Diamonds"]
-    deck = []
-
-    for i in range(1, 53):
-        if i < 14:
-            i = Card(suits[0], i)
-            deck.append(i)
-        elif i < 27:
-            i -= 13
-            i = Card(suits[1], i)
-            deck.append(i)
-        elif i < 40:
-            i -= 26
-            i = Card(suits[2], i)
-            deck.append(i)
-        else:
-            i -= 39
-            i = Card(suits[3], i)
-            deck.append(i)
-    return deck
+    return list(CARD_FACES)
+
+
+# Deal numbers run from 0 to MAX_DEAL_NUMBER, like Microsoft FreeCell's 
+#   numbered deals
+MAX_DEAL_NUMBER = 0x7FFFFFFF
+
+# private generator used only to pick a deal number when none is given, 
+#   so that seeded deals never depend on the global random state
+_deal_number_random = random.Random()
+
+
+def new_deal_number():
+    """
+    Returns a random deal number, for when a game is dealt without one
+    """
+    return _deal_number_random.randint(0, MAX_DEAL_NUMBER)
+
+
+def deal_order(seed):
+    """
+    Input - a deal number (int, 0 -> MAX_DEAL_NUMBER)
+    
+    Shuffles the positions 0-51 of an un-shuffled deck with a 
+        Fisher-Yates shuffle driven by the linear congruential generator 
+        from Microsoft FreeCell. This only depends on the deal number, so 
+        a deal number gives the same order on any machine or Python 
+        version.
+    Returns a list of the 52 deck positions in dealing order.
+    """
+    if not 0 <= seed <= MAX_DEAL_NUMBER:
+        raise ValueError(
+            f"deal number must be between 0 and {MAX_DEAL_NUMBER}, got {seed}")
+
+    order = list(range(0, 52))
+    state = seed
+    for remaining in range(52, 1, -1):
+        state = (state * 214013 + 2531011) & 0x7FFFFFFF
+        j = (state >> 16) % remaining
+        order[j], order[remaining - 1] = order[remaining - 1], order[j]
+    return order
 
 
-def shuffle_deck():
+def shuffle_deck(seed=None):
     """
     Uses the function create_deck to create a deck. Then randomises the
         list.
+    seed - the deal number to use (see deal_order). If it isn't given, a 
+        random deal number is picked.
     Returns a list of card objects in a random order.
     """
-    import random
+    if seed is None:
+        seed = new_deal_number()
 
-    unshuffled_deck = create_deck()
-    shuffled_deck = []
+    # deal_order gives positions in create_deck's order, which are card ids
+    return [CARD_FACES[card_id] for card_id in deal_order(seed)]
 
-    for i in range(0, 52):
-        x = random.choice(unshuffled_deck)
-        shuffled_deck.append(x)
-        unshuffled_deck.remove(x)
 
-    return shuffled_deck
-
-
-def set_up_locations():
+def set_up_locations(draw_count=3):
     """
     Returns a list of all the location classes that the game needs:
         column_1 -> column_7
         home_clubs, home_diamonds, home_hearts, home_spades
         spare_pile_face_down - unused remains of deck.
-        spare_pile_visible - 3 cards get drawn into this list from 
-            spare_pile_face_down, and displayed
+        spare_pile_visible - 3 cards (or draw_count) get drawn into this 
+            list from spare_pile_face_down, and displayed
         spare_pile_discard - when a new set of 3 cards are drawn, any 
             remaining in the spare_visible move here.
     
     The home card_lists have a non-existent card object in that can't
-        be used in the game.
+        be used in the game (from ZERO_CARDS).
     This allows them to check for valid moves later in the game.
 
     The other locations are empty.
@@ -186,18 +260,17 @@ def set_up_locations():
         "Spades"
     ]
     zero_card_list = []
-    for suit in suit_list:  # create a zero card for each suit
-        zero_card = Card(suit, 0)
-        zero_card_list.append(zero_card)
+    for suit in suit_list:  # the zero card for each suit
+        zero_card_list.append(ZERO_CARDS[suit])
 
     home_clubs = Home("Clubs home pile", [zero_card_list[0]])
     home_diamonds = Home("Diamonds home pile", [zero_card_list[1]])
     home_hearts = Home("Hearts home pile", [zero_card_list[2]])
     home_spades = Home("Spades home pile", [zero_card_list[3]])
 
-    spare_pile_face_down = SpareCards("Spare cards", [])
+    spare_pile_face_down = SpareCards("Spare cards", [], draw_count)
     spare_pile_discard = SpareCards("Discard pile", [])
-    spare_pile_visible = SpareCards("Visible pile", [])
+    spare_pile_visible = SpareCards("Visible pile", [], face_up=True)
 
     set_up_location_list = [
         column_1,
@@ -219,9 +292,30 @@ def set_up_locations():
     return set_up_location_list
 
 
-def deal_new_hand():
+def winnable_deal_number(solve_index, draw_count=3):
+    """
+    Returns a deal number that solve_index (a SolveIndex) says can be 
+        won with draw_count
+    Raises ValueError if the index was made with a different draw_count 
+        or has no winnable deals
+    """
+    if solve_index.draw_count != draw_count:
+        raise ValueError(f"the solvability index is for a draw count of "
+                         f"{solve_index.draw_count}, not {draw_count}")
+    seed = solve_index.winnable_deal()
+    if seed is None:
+        raise ValueError("the solvability index has no winnable deals")
+    return seed
+
+
+def deal_new_hand(seed=None, draw_count=3, solve_index=None):
     """
-    Creates a deck, shuffles deck
+    Creates a deck, shuffles deck (using the deal number seed if given, 
+        so the same seed always gives the same hand)
+    draw_count - how many spare cards are turned over at a time
+    solve_index - a SolveIndex. If it is given and seed isn't, the deal 
+        is one the index says can be won. Raises ValueError if the index 
+        was made with a different draw_count or has no winnable deals.
     creates the location_list using function "set_up_locations"
     Deals cards into the 7 columns of increasing number, revealing top 
         card of each
@@ -232,35 +326,53 @@ def deal_new_hand():
     """
 
     # 1.0 create and shuffle deck
-    deck = shuffle_deck()
+    if seed is None and solve_index is not None:
+        seed = winnable_deal_number(solve_index, draw_count)
+    deck = shuffle_deck(seed)
 
     # 2.0 deal the cards into the columns
-    deal_location_list = set_up_locations()
+    deal_location_list = set_up_locations(draw_count)
 
-    x = 1
+    dealt = 0
     for i in range(0, 7):
-        new_cards = deck[:x]
-        deal_location_list[x - 1].add_cards(new_cards)
-        deck = deck[x:]
-        x += 1
+        deal_location_list[i].add_cards(deck[dealt:dealt + i + 1])
+        dealt += i + 1
 
-    # 3.0 reveal the top card of each column
+    # 3.0 only the top card of each column is face-up
     for x in range(0, 7):
-        deal_location_list[x].reveal_card()
+        deal_location_list[x].face_up_start = x
 
-    # 4.add the remaining deck cards into spare_pile_face_down
-    deal_location_list[11].add_cards(deck)
+    # 4.add the remaining deck cards into spare_pile_face_down, the next 
+    #   card to be turned over first
+    deal_location_list[11].add_cards(deck[dealt:])
 
     return deal_location_list
 
 
+def generate_deals(first_seed, count, draw_count=3):
+    """
+    Deals count hands with consecutive deal numbers, starting at 
+        first_seed.
+    Hands are made one at a time as they are asked for, so any number 
+        of deals can be looped over without holding them all in memory.
+    Yields (deal number, location_list) tuples.
+    """
+    for seed in range(first_seed, first_seed + count):
+        yield seed, deal_new_hand(seed, draw_count)
+
+
 class Location(object):
     """
     Locations are lists designed to hold card objects
+    Cards are shared between deals, so a location keeps which of its 
+        cards are face-up. The face-down cards are always at the start 
+        of the card_list.
     
     Attributes:
         location_id - name of location (string or int)
         card_list - a list of card objects
+        face_up - True if the cards in the location are face-up (True 
+            for every location apart from the spares and discard piles)
     
     Methods:
         get_card_list - returns a list of all the cards objects in 
@@ -269,9 +381,15 @@ class Location(object):
         add_cards - takes a list of cards (new_cards) and appends them 
             to the existing card_list
         remove_cards - removes all cards after and including the given 
-            card from card_list
-        display_cards - prints the location ID followed by a list of 
-            all the cards in the location
+            card from card_list (its position can be given to save 
+            looking for it)
+        face_down_count - returns how many cards at the start of 
+            card_list are face-down
+        is_face_up - returns True if the card at a position in card_list 
+            is face-up
+        display_text - returns the location ID followed by all the 
+            cards in the location ("x" for a face-down card)
+        display_cards - prints display_text
         can_move_cards - see info below
         can_move_home - see info below
         move_to_home - Move last/top card in column_1 to it's 
@@ -280,6 +398,8 @@ class Location(object):
 
     """
 
+    face_up = True
+
     def __init__(self, location_id, card_list):
         self.location_id = location_id
         self.card_list = card_list
@@ -297,28 +417,33 @@ class Location(object):
         for card in new_cards:
             self.card_list.append(card)
 
-    def remove_cards(self, card):
-        temp_list = []
-        for i in self.card_list:
-            if i != card:
-                temp_list.append(i)
-            elif i == card:  # breaks when it reaches the given card
-                break
-        self.card_list = temp_list  # updates card_list
+    def remove_cards(self, card, position=None):
+        # position - where card is in card_list, if already known
+        if position is None or self.card_list[position] is not card:
+            try:
+                position = self.card_list.index(card)
+            except ValueError:  # card isn't here, so nothing to remove
+                return None
+        self.card_list = self.card_list[:position]  # updates card_list
+
+    def face_down_count(self):
+        return 0 if self.face_up else len(self.card_list)
+
+    def is_face_up(self, position):
+        if position < 0:
+            position += len(self.card_list)
+        return position >= self.face_down_count()
+
+    def display_text(self):
+        if len(self.card_list) == 0:
+            return f"{self.location_id}: No cards"
+        face_down = self.face_down_count()
+        return f"{self.location_id}: " + ", ".join(
+            ["x"] * face_down + [card.get_suit_and_value()
+                                 for card in list(self.card_list)[face_down:]])
 
     def display_cards(self):
-        c_list = []
-        x = 1
-        for card in self.card_list:
-            if card.side == "face-down":
-                c_list.append("x")
-            else:
-                c_list.append(card.get_suit_and_value())
-            x += 1
-        if len(c_list) > 0:
-            print(f"{self.location_id}: {c_list}")
-        else:
-            print(f"{self.location_id}: No cards")
+        print(self.display_text())
 
     def can_move_cards(self, card_1, card_2):
         """
@@ -364,38 +489,63 @@ class Location(object):
             return False
 
     def move_to_home(self, move_home_location_list):
+        """
+        Moves the last card in the location onto its home pile.
+
+        Returns updated location_list if possible
+        Returns False if not possible
+        """
         if len(self.card_list) == 0:
-            print("Invalid move")
-            return None
+            return False
         card_1 = self.card_list[-1]
-        for i in range(7, 11):  # To select each of the home piles in turn
-            possible_home_pile = move_home_location_list[i]
-            card_2 = possible_home_pile.get_card_list()[-1]
+        i = find_home(move_home_location_list, card_1.suit)
+        card_2 = move_home_location_list[i].card_list[-1]
 
-            if self.can_move_home(card_1, card_2):
-                temp_list = [card_1]  # card needs to be in a list
-                move_home_location_list[i].add_cards(temp_list)
-                self.remove_cards(card_1)
-                return move_home_location_list
+        if self.can_move_home(card_1, card_2):
+            move_home_location_list[i].card_list.append(card_1)
+            self.remove_cards(card_1, len(self.card_list) - 1)
+            return move_home_location_list
+        return False
 
 
 class Column(Location):
     """
     Subclass of location for the 7 main card columns.
+
+    Attributes:
+        face_up_start - index in card_list of the first face-up card 
+            (the number of face-down cards). Cards added to the column 
+            are face-up. If it isn't given, every card starts face-down.
     
     Methods:
         len - returns the length of the card_list
         show_column - prints all the cards in the column (face-down is 
             displayed as 'X'). Displays on new lines        
-        reveal_card - sets the side of the top card to face-up
+        reveal_card - turns the top card face-up
+        remove_cards - as for Location, leaving any face-down cards left 
+            face-down
         move_cards - See details below
     """
 
+    def __init__(self, location_id, card_list, face_up_start=None):
+        super().__init__(location_id, card_list)
+        if face_up_start is None:
+            face_up_start = len(card_list)
+        self.face_up_start = face_up_start
+
     def len(self):
         return len(self.card_list)
 
+    def face_down_count(self):
+        return self.face_up_start
+
     def reveal_card(self):
-        self.card_list[-1].set_side("face-up")
+        self.face_up_start = min(self.face_up_start, len(self.card_list) - 1)
+
+    def remove_cards(self, card, position=None):
+        super().remove_cards(card, position)
+        if self.face_up_start > len(self.card_list):
+            self.face_up_start = len(self.card_list)
 
     def move_cards(self, move_cards_location_list, column_2):  # move from self to other
         """
@@ -404,47 +554,26 @@ class Column(Location):
             moved.
         Move from self to column_2
         (move is the largest possible stack of cards)
-        Checks whether a move is possible, if not an error message is 
-            printed and returns False
+        Checks whether a move is possible, if not returns False
         If move possible: carries out move and returns updated location_list
         """
+        column_1_card_list = self.card_list
+        column_2_card_list = column_2.card_list
 
-        column_2_card_list = column_2.get_card_list()
-
-        if column_2.len() == 0:  # if moving to an empty column
-            pass
-        else:
-            card_2 = column_2_card_list[-1]  # last card in column 2
-
-        column_1_card_list = self.get_card_list()
-
-        x = 0
-        for card_1 in column_1_card_list:
-
-            if card_1.get_side() == "face-down":
-                x += 1
-            else:
+        for x in range(self.face_up_start, len(column_1_card_list)):
+            card_1 = column_1_card_list[x]
+            if len(column_2_card_list) == 0:
                 # king moving to empty column
-                if card_1.get_value() == 13 and column_2.len() == 0:
-                    column_2.add_cards(column_1_card_list[x:])
-                    self.remove_cards(card_1)
-                    if self.len() > 0:
-                        self.reveal_card()
-                    return move_cards_location_list
-
-                elif (column_2.len() > 0
-                      and self.can_move_cards(card_1, card_2)
-                      is True):
-                    column_2.add_cards(column_1_card_list[x:])
-                    self.remove_cards(card_1)
-                    if self.len() > 0:
-                        self.reveal_card()
-
-                    return move_cards_location_list
-                else:
-                    x += 1
-        print("Hmm, That move isn't allowed")
-        input("Hit Enter to continue...")
+                can_move = card_1.value == 13
+            else:
+                can_move = self.can_move_cards(card_1, column_2_card_list[-1])
+
+            if can_move:
+                column_2.add_cards(column_1_card_list[x:])
+                self.remove_cards(card_1, x)
+                if self.len() > 0:
+                    self.reveal_card()
+                return move_cards_location_list
         return False
 
 
@@ -473,10 +602,22 @@ class SpareCards(Location):
     """
     A location the contains the remaining cards not on the table after 
         the deal.
+    The spares and discard piles keep their cards in a 
+        collections.deque, both in the order they will be turned over: 
+        the discard pile grows at its end, and the spares pile is drawn 
+        from its start. So when the spares run out the discard pile's 
+        deque simply becomes the spares pile, and drawing or recycling 
+        only touches the cards that move.
         
+    Attributes:
+        draw_count - how many cards advance turns over at a time 
+            (default 3; 1 makes a win much more likely)
+        face_up - False for the spares and discard piles, True for the 
+            visible pile, which keeps a list with its top card last
+
     Methods:
         len - returns length of card_list
-        advance - moves the 1st 3 cards into the card_list of 
+        advance - moves the next draw_count cards into the card_list of 
             spare_pile_visible. Returns updated location_list
         move_to_column - See information below
     
@@ -486,47 +627,48 @@ class SpareCards(Location):
     
     """
 
+    def __init__(self, location_id, card_list, draw_count=3, face_up=False):
+        if draw_count < 1:
+            raise ValueError(f"draw_count must be at least 1, got {draw_count}")
+        if not face_up:
+            card_list = collections.deque(card_list)
+        super().__init__(location_id, card_list)
+        self.draw_count = draw_count
+        self.face_up = face_up
+
     def len(self):
         return len(self.card_list)
 
     def advance(self, adv_location_list):
-        # 1.0 reset visible pile: move cards from visible pile to discard pile
-        cards_to_move = []
+        """
+        Only the cards that actually move are touched: the visible cards 
+            going to the discard pile and the newly drawn cards, which 
+            are taken off the start of the spares pile. When the discard 
+            pile is recycled its deque is handed to the spares pile as 
+            it is, as its cards are already in the order they will be 
+            turned over.
+        """
+        discard_pile = adv_location_list[12]
+        visible_pile = adv_location_list[13]
 
-        for card in adv_location_list[13].card_list:
-            card.set_side("face-down")
-            cards_to_move.append(card)
-        adv_location_list[12].add_cards(cards_to_move)
+        # 1.0 reset visible pile: move cards from visible pile to discard pile
+        discard_pile.add_cards(visible_pile.card_list)
 
         # 2.0 removes the cards from the visible pile
-        adv_location_list[13].card_list = []  # updates card_list
-
-        # 3.0 If spares pile has no more cards, move from discard
-        if len(adv_location_list[11].card_list) == 0:
-            adv_location_list[11].add_cards(adv_location_list[12].get_card_list())
-
-            # 3.1 Clean out discard pile:
-            adv_location_list[12].card_list = []
-
-        # 4.0 add 3 new cards to visible pile
-        cards_to_move = []
-        if len(self.card_list) < 3:
-            for card in self.card_list:
-                card.set_side("face-up")
-                cards_to_move.append(card)
-            adv_location_list[13].add_cards(cards_to_move)
-        else:
-            for card in self.card_list[0:3]:
-                card.set_side("face-up")
-                cards_to_move.append(card)
-            adv_location_list[13].add_cards(cards_to_move)
-
-        # 5.0 removes the cards from the original spare pile
-        temp_list = []
-        for i in self.card_list:
-            if i not in cards_to_move:
-                temp_list.append(i)
-        self.card_list = temp_list
+        visible_pile.card_list = []  # updates card_list
+
+        # 3.0 If spares pile has no more cards, the discard pile is turned 
+        #   over to become the spares pile
+        if len(self.card_list) == 0:
+            self.card_list = discard_pile.card_list
+            discard_pile.card_list = collections.deque()
+
+        # 4.0 take up to draw_count cards off the spares pile onto the 
+        #   visible pile
+        card_list = self.card_list
+        visible_card_list = visible_pile.card_list
+        for x in range(0, min(self.draw_count, len(card_list))):
+            visible_card_list.append(card_list.popleft())
 
         return adv_location_list
 
@@ -537,23 +679,16 @@ class SpareCards(Location):
         input column is target to move to
         
         Returns updated location_list if possible
-        Prints error message if not possible + returns False
+        Returns False if not possible
         """
         visible_card_list = self.get_card_list()  # card_list for visible_pile
         if len(visible_card_list) == 0:
-            print(
-                "Hmm, there are no cards to move yet - hit "
-                "\"S\" to get going"
-            )
-            input("Hit Enter to continue...")
             return False
 
         card_1 = visible_card_list[-1]  # card to move is the last in the list
 
         if column.len() == 0 and card_1.get_value() != 13:
             # can only move a king onto a blank column
-            print("Hmm, That move isn't allowed")
-            input("Hit Enter to continue...")
             return False
 
         elif column.len() == 0 and card_1.get_value() == 13:
@@ -573,11 +708,339 @@ class SpareCards(Location):
 
             return move_column_location_list
 
-        print("Hmm, That move isn't allowed")
-        input("Hit Enter to continue...")
         return False
 
 
+FACE_UP = 64  # bit added to a card code when the card is face-up
+
+# index of each suit's home pile in the location_list from set_up_locations
+HOME_INDEX = {"Clubs": 7, "Diamonds": 8, "Hearts": 9, "Spades": 10}
+
+
+def create_playable_on_list():
+    """
+    Returns a list with an entry for each card id (0-51): a tuple of the 
+        ids of the 2 cards that can be put onto that card in a column 
+        (one lower in value, opposite colour). Aces get an empty tuple.
+    """
+    red_suits = ["Hearts", "Diamonds"]
+    playable_on_list = []
+    for card_id in range(0, 52):
+        value = card_id % 13 + 1
+        is_red = SUIT_LIST[card_id // 13] in red_suits
+        if value == 1:
+            playable_on_list.append(())
+        else:
+            playable_on_list.append(tuple(
+                suit_index * 13 + value - 2
+                for suit_index in range(0, 4)
+                if (SUIT_LIST[suit_index] in red_suits) != is_red
+            ))
+    return playable_on_list
+
+
+CARDS_PLAYABLE_ON = create_playable_on_list()
+
+
+def card_to_code(card, face_up=False):
+    """
+    Returns the small int (0-51, plus FACE_UP if face_up) for a card 
+        object. Cards don't know whether they are face-up, so that comes 
+        from the location the card is in.
+    """
+    if face_up:
+        return card.card_id | FACE_UP
+    return card.card_id
+
+
+def code_to_card(code):
+    """
+    Returns the shared card object for a code made by card_to_code
+    """
+    return CARD_FACES[code & ~FACE_UP]
+
+
+class CompactState(object):
+    """
+    A compact copy of a whole game, for when many games need to be held 
+        in memory at once.
+    Cards are stored as codes from card_to_code, and each pile is a 
+        bytearray of codes in the same order as its card_list.
+    The discard, visible and spares piles are kept together in one 
+        bytearray, in that order. Advancing never changes the order of 
+        those cards, only where the piles start and end, so the piles are 
+        marked out by two cursors.
+
+    Attributes:
+        columns - list of 7 bytearrays, one per column
+        homes - bytearray of 4 counts of cards on each home pile, in 
+            SUIT_LIST order
+        spares - bytearray: discard pile (location 12), then visible pile 
+            (location 13), then spares pile (location 11) in the order 
+            its cards will be turned over
+        visible_start - index in spares of the first visible card
+        stock_start - index in spares of the next card to be turned over
+        draw_count - how many cards advance turns over at a time
+
+    Methods:
+        from_location_list - (classmethod) builds a CompactState from a 
+            location_list
+        to_location_list - returns a new location_list
+        advance - the same as SpareCards.advance, by moving the cursors
+        pack - returns the state as bytes (at most 67 bytes)
+        canonical_key - like pack, but ignores the order of the columns
+        unpack - (classmethod) builds a CompactState from pack's bytes
+        copy - returns an independent CompactState
+    """
+
+    __slots__ = ("columns", "homes", "spares", "visible_start", "stock_start",
+                 "draw_count")
+
+    def __init__(self, columns, homes, spares, visible_start, stock_start,
+                 draw_count=3):
+        self.columns = columns
+        self.homes = homes
+        self.spares = spares
+        self.visible_start = visible_start
+        self.stock_start = stock_start
+        self.draw_count = draw_count
+
+    @classmethod
+    def from_location_list(cls, compact_location_list):
+        columns = []
+        for location in compact_location_list[0:7]:
+            card_list = location.card_list
+            face_up_start = location.face_up_start
+            columns.append(bytearray(
+                card_to_code(card_list[x], x >= face_up_start)
+                for x in range(0, len(card_list))))
+
+        homes = bytearray(4)
+        for location in compact_location_list[7:11]:
+            # the zero card at the bottom of each home pile gives its suit
+            homes[location.card_list[0].suit_index] = len(location.card_list) - 1
+
+        spares = bytearray()
+        for i in (12, 13, 11):
+            card_list = compact_location_list[i].card_list
+            face_up = compact_location_list[i].face_up
+            if i == 11:
+                stock_start = len(spares)
+            elif i == 13:
+                visible_start = len(spares)
+            spares += bytearray(card_to_code(card, face_up) for card in card_list)
+        return cls(columns, homes, spares, visible_start, stock_start,
+                   compact_location_list[11].draw_count)
+
+    def to_location_list(self):
+        new_location_list = set_up_locations(self.draw_count)
+
+        for x in range(0, 7):
+            column = self.columns[x]
+            new_location_list[x].add_cards(
+                [code_to_card(code) for code in column])
+            face_up_start = 0
+            while face_up_start < len(column) and not column[face_up_start] & FACE_UP:
+                face_up_start += 1
+            new_location_list[x].face_up_start = face_up_start
+
+        for home in new_location_list[7:11]:
+            suit_index = home.card_list[0].suit_index
+            first_code = suit_index * 13 | FACE_UP
+            home.add_cards([code_to_card(first_code + i)
+                            for i in range(0, self.homes[suit_index])])
+
+        spares = self.spares
+        new_location_list[12].add_cards(
+            [code_to_card(c) for c in spares[:self.visible_start]])
+        new_location_list[13].add_cards(
+            [code_to_card(c) for c in spares[self.visible_start:self.stock_start]])
+        new_location_list[11].add_cards(
+            [code_to_card(c) for c in spares[self.stock_start:]])
+        return new_location_list
+
+    def advance(self):
+        """
+        Turns over the next draw_count spare cards. Only the cursors move 
+            and the face-up bit of the cards that change pile, so this 
+            costs the same however many spare cards there are, including 
+            when the discard pile is recycled.
+        """
+        spares = self.spares
+        # 1.0 visible cards join the discard pile, face-down
+        for x in range(self.visible_start, self.stock_start):
+            spares[x] &= ~FACE_UP
+        # 2.0 recycle: everything is back in the spares pile
+        if self.stock_start == len(spares):
+            self.stock_start = 0
+        self.visible_start = self.stock_start
+        # 3.0 turn over the next cards
+        self.stock_start = min(len(spares), self.stock_start + self.draw_count)
+        for x in range(self.visible_start, self.stock_start):
+            spares[x] |= FACE_UP
+
+    def pack(self):
+        """
+        Layout: the 4 home counts, then for each of the 7 columns and the 
+            spares a length byte followed by that many card codes, then 
+            visible_start, stock_start and draw_count.
+        """
+        packed = bytearray(self.homes)
+        for pile in self.columns + [self.spares]:
+            packed.append(len(pile))
+            packed += pile
+        packed.append(self.visible_start)
+        packed.append(self.stock_start)
+        packed.append(self.draw_count)
+        return bytes(packed)
+
+    @classmethod
+    def unpack(cls, packed):
+        homes = bytearray(packed[0:4])
+        piles = []
+        x = 4
+        for i in range(0, 8):
+            length = packed[x]
+            piles.append(bytearray(packed[x + 1:x + 1 + length]))
+            x += 1 + length
+        return cls(piles[0:7], homes, piles[7], packed[x], packed[x + 1],
+                   packed[x + 2])
+
+    def canonical_key(self):
+        """
+        Returns bytes that are the same for any two states that only 
+            differ in which column holds which pile of cards (the order 
+            of the columns doesn't matter when deciding if a game can be 
+            won).
+        """
+        key = bytearray(self.homes)
+        for pile in sorted(self.columns) + [self.spares]:
+            key.append(len(pile))
+            key += pile
+        key.append(self.visible_start)
+        key.append(self.stock_start)
+        key.append(self.draw_count)
+        return bytes(key)
+
+    def copy(self):
+        return CompactState(
+            [bytearray(column) for column in self.columns],
+            bytearray(self.homes),
+            bytearray(self.spares),
+            self.visible_start,
+            self.stock_start,
+            self.draw_count,
+        )
+
+    def __eq__(self, other):
+        if not isinstance(other, CompactState):
+            return NotImplemented
+        return self.pack() == other.pack()
+
+
+# Zobrist hashing: every (card, place) pair gets a fixed random 64-bit 
+#   key, and a position's hash combines the keys of where every card is.
+#   The keys come from a fixed seed, so every process and every run gives 
+#   the same hash for the same position.
+ZOBRIST_SEED = 0x5EED
+MASK_64 = 0xFFFFFFFFFFFFFFFF
+
+
+def mix_64(x):
+    """
+    Returns the 64-bit int x scrambled with the splitmix64 finaliser
+    """
+    x = ((x ^ (x >> 30)) * 0xBF58476D1CE4E5B9) & MASK_64
+    x = ((x ^ (x >> 27)) * 0x94D049BB133111EB) & MASK_64
+    return x ^ (x >> 31)
+
+
+def create_zobrist_keys(count, seed=ZOBRIST_SEED):
+    """
+    Returns a list of count pseudo-random 64-bit ints (a splitmix64 
+        sequence starting from seed)
+    """
+    keys = []
+    state = seed
+    for i in range(0, count):
+        state = (state + 0x9E3779B97F4A7C15) & MASK_64
+        keys.append(mix_64(state))
+    return keys
+
+
+# column keys are looked up by (card code * 52 + position); the code 
+#   includes FACE_UP, so a face-down and face-up card have different keys
+COLUMN_KEYS = create_zobrist_keys(128 * 52)
+HOME_KEYS = create_zobrist_keys(52, ZOBRIST_SEED + 1)
+# spares keys: (pile * 52 + card id) * 52 + position, where pile 0 is the
+#   spares pile (counted from its last card, so drawing from its start 
+#   doesn't move the others), 1 the discard pile and 2 the visible pile
+SPARE_KEYS = create_zobrist_keys(3 * 52 * 52, ZOBRIST_SEED + 2)
+
+
+def column_hash(card_list, face_up_start=0):
+    """
+    Returns the Zobrist hash of the cards in one column
+    face_up_start - the column's face_up_start
+    """
+    column_hash_value = 0
+    x = 0
+    for card in card_list:
+        column_hash_value ^= COLUMN_KEYS[card_to_code(card, x >= face_up_start) * 52 + x]
+        x += 1
+    return column_hash_value
+
+
+def spare_key(pile, card_id, position):
+    """
+    Returns the Zobrist key for a card (by id, 0-51) at position in a 
+        spares pile (pile 0 - spares, 1 - discard, 2 - visible)
+    """
+    return SPARE_KEYS[(pile * 52 + card_id) * 52 + position]
+
+
+def spare_hash(hash_location_list):
+    """
+    Returns the Zobrist hash of the spares, discard and visible piles
+    """
+    spare_hash_value = 0
+    stock = hash_location_list[11].card_list
+    x = len(stock) - 1
+    for card in stock:
+        spare_hash_value ^= spare_key(0, card.card_id, x)
+        x -= 1
+    for pile in (1, 2):
+        x = 0
+        for card in hash_location_list[11 + pile].card_list:
+            spare_hash_value ^= spare_key(pile, card.card_id, x)
+            x += 1
+    return spare_hash_value
+
+
+def zobrist_hash(hash_location_list):
+    """
+    Works out the 64-bit hash of a whole position from scratch.
+    Each column's hash is scrambled with mix_64 and the columns are added 
+        together, so two positions that only differ in which column holds 
+        which pile of cards get the same hash. The home piles and spares 
+        are combined in with xor.
+    Game keeps this same value up to date move by move, so this is only 
+        needed for a starting position or for checking.
+    Returns an int.
+    """
+    column_sum = 0
+    for location in hash_location_list[0:7]:
+        column_sum = (column_sum + mix_64(column_hash(
+            location.card_list, location.face_up_start))) & MASK_64
+
+    home_hash_value = 0
+    for location in hash_location_list[7:11]:
+        for card in location.card_list[1:]:  # skip the zero card
+            home_hash_value ^= HOME_KEYS[card.card_id]
+
+    return column_sum ^ home_hash_value ^ spare_hash(hash_location_list)
+
+
 def have_won(won_location_list):
     """
     Returns True if all 4 home locations have 13 cards in.
@@ -593,146 +1056,2710 @@ def have_won(won_location_list):
         return False
 
 
-def decide_move(dec_location_list):
+def create_valid_move_list():
+    """
+    Returns a list of every move string that execute_move understands:
+        "S" - advance the spares pile
+        "SE" - move the top spare card to its home pile
+        "1" -> "7" - move the top card of a column to its home pile
+        "S1" -> "S7" - move the top spare card to a column
+        "M12" -> "M76" - move cards between two different columns
+    """
+    valid_move_list = ["S", "SE"]
+    for x in range(1, 8):
+        valid_move_list.append(str(x))
+        valid_move_list.append(f"S{x}")
+        for y in range(1, 8):
+            if y == x:
+                pass
+            else:
+                valid_move_list.append(f"M{x}{y}")
+    return valid_move_list
+
+
+VALID_MOVES = frozenset(create_valid_move_list())
+
+# Reasons given by execute_move when a move can't be carried out
+NOT_UNDERSTOOD = "Oops, I don't understand that command - please try again!"
+NOT_ALLOWED = "Hmm, That move isn't allowed"
+NO_SPARE_CARDS = "Hmm, there are no cards to move yet - hit \"S\" to get going"
+
+
+class MoveResult(object):
+    """
+    The outcome of a single call to execute_move.
+    An applied move also records exactly what changed, so that 
+        undo_move can reverse it without copying any locations.
+
+    Attributes:
+        move - the move that was attempted (string, i.e. "M35")
+        applied - True if the move was carried out, else False
+        reason - message explaining why the move wasn't carried out 
+            (None if the move was applied)
+        source - index in the location_list the cards came from
+        destination - index in the location_list the cards went to
+        cards - how many cards were moved to destination
+        revealed - True if a face-down card at source was turned over
+        returned - (advancing the spares only) how many cards went from 
+            the visible pile back to the discard pile
+        recycled - (advancing the spares only) True if the discard pile 
+            was turned back over into the spares pile
+        automatic - True if the move was made by the game rather than 
+            asked for (see Game), so it is undone and redone along with 
+            the move before it
+        rule_seconds - the seconds spent in the rule method that decided 
+            the move, when move hooks are registered (see apply_move), 
+            else None
+
+    Methods:
+        __bool__ - returns applied, so a result can be used directly in 
+            an if statement
+    """
+
+    def __init__(self, move, applied, reason=None, source=None,
+                 destination=None, cards=0, revealed=False, returned=0,
+                 recycled=False, automatic=False):
+        self.move = move
+        self.applied = applied
+        self.reason = reason
+        self.source = source
+        self.destination = destination
+        self.cards = cards
+        self.revealed = revealed
+        self.returned = returned
+        self.recycled = recycled
+        self.automatic = automatic
+        self.rule_seconds = None
+
+    def __bool__(self):
+        return self.applied
+
+    def __repr__(self):
+        if self.applied:
+            return f"MoveResult({self.move!r}, applied)"
+        return f"MoveResult({self.move!r}, illegal: {self.reason})"
+
+
+# commands decide_move accepts as well as VALID_MOVES, for play_game
+GAME_COMMANDS = ["NEW", "RESTART", "U", "R", "H", "A"]
+
+
+# the instructions decide_move shows when "?" is typed
+MOVE_HELP = ("To move between columns, type \"M\" followed by the two "
+             "column numbers (i.e. \"M35\")\nIf you would like to move "
+             "from a column to a home pile, just enter a single column "
+             "number.\nIf you would like to advance the spares pile, press "
+             "\"S\".\nIf you would like to move the top card of the spares "
+             "to a column, press \"S\" followed by the column number (i.e. "
+             "\"S4\").\nTo move from the spares to the end pile, type "
+             "\"SE\"\nTo undo your last move type \"U\", or \"R\" to "
+             "redo it.\nStuck? Type \"H\" for a hint.\nOnce every card "
+             "is face up and the spares are used up, type \"A\" to "
+             "finish the game.\nGive up? Type \"New\" to start a new game, "
+             "or \"Restart\" to play this one again from the beginning.")
+
+
+def decide_move(dec_location_list, renderer=None):
     """
     As the user what move they would like to make
+    The question takes one line, so it fits below the board on a small 
+        terminal (see BoardRenderer). Typing "?" shows MOVE_HELP.
     If input isn't a valid move, the function loops until the user 
         enters a valid move
+    renderer - the BoardRenderer drawing the board, if there is one
     """
     is_move_valid = False
     while not is_move_valid:
 
-        print("\nWhat move would you like to make?\n\nTo move between "
-              "columns, type \"M\" followed by the two column numbers "
-              "(i.e. \"M35\")\nIf you would like to move from a column "
-              "to a home pile, just enter a single column number.\nIf "
-              "you would like to advance the spares pile, press \"S\".\n"
-              "If you would like to move the top card of the spares to a"
-              " column, press \"S\" followed by the column number (i.e. "
-              "\"S4\").\nTo move from the spares to the end pile, type "
-              "\"SE\"\nGive up? Type \"New\" to start a new game."
-              )
+        print("\nWhat move would you like to make? (\"?\" for help)")
         move = input("->")
         uppercase_move = move.upper()
 
-        valid_move_list = ["S", 'SE', "NEW"]
-        for x in range(1, 8):
-            valid_move_list.append(str(x))
-            valid_move_list.append(f"S{x}")
-            for y in range(1, 8):
-                if y == x:
-                    pass
-                else:
-                    valid_move_list.append(f"M{x}{y}")
-
-        if uppercase_move in valid_move_list:
+        if uppercase_move in VALID_MOVES or uppercase_move in GAME_COMMANDS:
             is_move_valid = True
         else:
-            print(
-                "\nOops, I don't understand that command - "
-                "please try again!"
-            )
+            if uppercase_move == "?":
+                print("\n" + MOVE_HELP)
+                if renderer is not None:
+                    renderer.mark_all()  # the help may scroll the board
+            else:
+                print("\n" + NOT_UNDERSTOOD)
             input("Hit Enter to continue...")
-            update_display(dec_location_list)
+            if renderer is not None:
+                renderer.render(dec_location_list)
+            else:
+                update_display(dec_location_list)
     return uppercase_move
 
 
+'''
+Move hooks - objects told about every move that goes through execute_move, 
+    and about each game that play_game, play_position or play_script plays
+'''
+
+
+class MoveHook(object):
+    """
+    Base class for move hooks. Subclass it and override any of the 
+        methods, then register an instance with add_move_hook.
+
+    Methods:
+        game_start - called with the location_list before the first move 
+            of a game
+        before_move - called with the location_list and the move before 
+            the move is made
+        after_move - called with the location_list, the move, its 
+            MoveResult and the seconds execute_move took
+        after_undo - called with the location_list and the MoveResult of 
+            a move Game.undo has just reversed
+        game_end - called with the location_list and whether the game 
+            was won, once it is over
+    """
+
+    def game_start(self, hook_location_list):
+        pass
+
+    def before_move(self, hook_location_list, uppercase_move):
+        pass
+
+    def after_move(self, hook_location_list, uppercase_move, result, seconds):
+        pass
+
+    def after_undo(self, hook_location_list, result):
+        pass
+
+    def game_end(self, hook_location_list, won):
+        pass
+
+
+MOVE_HOOKS = []  # registered MoveHook objects, in the order they were added
+
+
+def add_move_hook(hook):
+    """
+    Registers hook, so it is told about every move from now on
+    Returns hook, so it can be created and added in one line
+    """
+    MOVE_HOOKS.append(hook)
+    return hook
+
+
+def remove_move_hook(hook):
+    """
+    Stops hook being told about moves. Does nothing if it wasn't added.
+    Returns None
+    """
+    if hook in MOVE_HOOKS:
+        MOVE_HOOKS.remove(hook)
+
+
+def start_game_hooks(hook_location_list):
+    """
+    Tells every registered move hook that a game is starting
+    Returns None
+    """
+    for hook in list(MOVE_HOOKS):  # a hook may remove itself
+        hook.game_start(hook_location_list)
+
+
+def end_game_hooks(hook_location_list):
+    """
+    Tells every registered move hook that a game is over, and whether it 
+        was won
+    Returns None
+    """
+    if MOVE_HOOKS:
+        won = have_won(hook_location_list)
+        for hook in list(MOVE_HOOKS):
+            hook.game_end(hook_location_list, won)
+
+
+def move_type(uppercase_move):
+    """
+    Returns the kind of move uppercase_move is:
+        "column to column", "column to home", "spares to home", 
+        "spares to column", "advance" or "not understood"
+    """
+    if uppercase_move not in VALID_MOVES:
+        return "not understood"
+    if uppercase_move[0] == "M":
+        return "column to column"
+    if uppercase_move == "S":
+        return "advance"
+    if uppercase_move == "SE":
+        return "spares to home"
+    if uppercase_move[0] == "S":
+        return "spares to column"
+    return "column to home"
+
+
+# the rule method that execute_move calls for each kind of move
+RULE_METHODS = {
+    "column to column": "Column.move_cards",
+    "column to home": "Location.move_to_home",
+    "spares to home": "Location.move_to_home",
+    "spares to column": "SpareCards.move_to_column",
+    "advance": "SpareCards.advance",
+}
+
+
+class MoveCounters(MoveHook):
+    """
+    A MoveHook that counts games and moves and adds up how long the 
+        moves took, so the time spent in a game can be broken down 
+        without a profiler.
+    The time for each rule method (see RULE_METHODS) is measured around 
+        just that method, by apply_move.
+
+    Attributes:
+        games - how many games were started
+        wins - how many games were won
+        moves - dict: move type (see move_type) -> moves applied
+        illegal - dict: move type -> moves that were not allowed
+        recycles - how many times the discard pile was turned back over
+        rule_seconds - dict: rule method -> total seconds
+        rule_calls - dict: rule method -> times called
+
+    Methods:
+        game_start / game_end - count one game
+        after_move - records one move
+        summary - returns the counts and times as a printable string
+    """
+
+    def __init__(self):
+        self.games = 0
+        self.wins = 0
+        self.moves = {}
+        self.illegal = {}
+        self.recycles = 0
+        self.rule_seconds = {}
+        self.rule_calls = {}
+
+    def game_start(self, hook_location_list):
+        self.games += 1
+
+    def game_end(self, hook_location_list, won):
+        self.wins += won
+
+    def after_move(self, hook_location_list, uppercase_move, result, seconds):
+        kind = move_type(uppercase_move)
+        if result.applied:
+            self.moves[kind] = self.moves.get(kind, 0) + 1
+            if result.recycled:
+                self.recycles += 1
+        else:
+            self.illegal[kind] = self.illegal.get(kind, 0) + 1
+        if result.rule_seconds is not None:  # the rule method was called
+            method = RULE_METHODS[kind]
+            self.rule_seconds[method] = (self.rule_seconds.get(method, 0)
+                                         + result.rule_seconds)
+            self.rule_calls[method] = self.rule_calls.get(method, 0) + 1
+
+    def summary(self):
+        lines = [f"Games: {self.games}, won {self.wins}", "Moves made:"]
+        for kind in sorted(self.moves):
+            lines.append(f"    {kind:20} {self.moves[kind]:8}")
+        lines.append(f"Illegal attempts: {sum(self.illegal.values())}")
+        for kind in sorted(self.illegal):
+            lines.append(f"    {kind:20} {self.illegal[kind]:8}")
+        lines.append(f"Stock recycles: {self.recycles}")
+        lines.append("Time per rule method:")
+        for method in sorted(self.rule_seconds):
+            seconds = self.rule_seconds[method]
+            calls = self.rule_calls[method]
+            lines.append(f"    {method:26} {calls:8} calls {seconds:10.6f} s "
+                         f"{seconds / calls * 1e6:8.2f} us each")
+        return "\n".join(lines)
+
+
 def execute_move(ex_location_list, uppercase_move):
     """
-    Input - the users valid move and the location_list
+    Input - a move from VALID_MOVES and the location_list
     (move was made uppercase in "decide_move" function)
     
-    Executes the move
-    Returns location_list
+    Executes the move if it is allowed. Nothing is printed and no input 
+        is asked for, so this can be called by bots and simulations as 
+        well as by play_game.
+    Any registered move hooks are told about the move before and after 
+        it is made, with the time it took and, in the MoveResult, the 
+        time spent in its rule method. With no hooks the move isn't 
+        timed at all.
+    Returns a MoveResult saying whether the move was applied, and if not 
+        why not
     """
-    move_list = list(uppercase_move)
-    x = 0
-    for char in move_list:
-        if char in ["1", "2", "3", "4", "5", "6", "7"]:
-            char = int(char)
-            char -= 1
-            move_list[x] = (str(char))
-            x += 1
-        else:
-            x += 1
-    uppercase_move = ''.join(move_list)
+    if not MOVE_HOOKS:
+        return apply_move(ex_location_list, uppercase_move)
 
-    if uppercase_move[0] == "M":
-        col_1 = int(uppercase_move[1])
-        col_2 = int(uppercase_move[2])
-        ex_location_list[col_1].move_cards(ex_location_list, ex_location_list[col_2])
+    hooks = list(MOVE_HOOKS)  # a hook may remove itself
+    for hook in hooks:
+        hook.before_move(ex_location_list, uppercase_move)
+    start = time.perf_counter()
+    result = apply_move(ex_location_list, uppercase_move, timed=True)
+    seconds = time.perf_counter() - start
+    for hook in hooks:
+        hook.after_move(ex_location_list, uppercase_move, result, seconds)
+    return result
+
+
+def apply_move(ex_location_list, uppercase_move, timed=False):
+    """
+    Makes the move for execute_move, without telling any move hooks
+    timed - if True, the seconds spent in the rule method that decides 
+        the move (see RULE_METHODS) are kept in the MoveResult's 
+        rule_seconds
+    Returns a MoveResult
+    """
+    if uppercase_move not in VALID_MOVES:
+        return MoveResult(uppercase_move, False, NOT_UNDERSTOOD)
 
-    elif uppercase_move in ["0", "1", "2", "3", "4", "5", "6", "7"]:
-        num = int(uppercase_move)
-        ex_location_list[num].move_to_home(ex_location_list)
-        l_card = ex_location_list[num]
-        if len(l_card.card_list) > 0:
-            ex_location_list[num].reveal_card()
+    if uppercase_move[0] == "M":
+        col_1 = int(uppercase_move[1]) - 1
+        col_2 = int(uppercase_move[2]) - 1
+        column_1 = ex_location_list[col_1]
+        column_2 = ex_location_list[col_2]
+
+        face_up_start = column_1.face_up_start
+        column_2_length = len(column_2.card_list)
+
+        rule_start = time.perf_counter() if timed else 0
+        moved = column_1.move_cards(ex_location_list, column_2)
+        rule_end = time.perf_counter() if timed else 0
+        if moved is False:
+            result = MoveResult(uppercase_move, False, NOT_ALLOWED)
+        else:
+            # only cards from the face-up run move, so a card was turned 
+            # over if the column now ends where the face-down cards used 
+            # to end
+            revealed = 0 < face_up_start == len(column_1.card_list)
+            result = MoveResult(uppercase_move, True, source=col_1,
+                                destination=col_2,
+                                cards=len(column_2.card_list) - column_2_length,
+                                revealed=revealed)
 
     elif uppercase_move == "S":  # advance spare pile
+        returned = len(ex_location_list[13].card_list)
+        recycled = len(ex_location_list[11].card_list) == 0
+        rule_start = time.perf_counter() if timed else 0
         ex_location_list[11].advance(ex_location_list)
+        rule_end = time.perf_counter() if timed else 0
+        result = MoveResult(uppercase_move, True, source=11, destination=13,
+                            cards=len(ex_location_list[13].card_list),
+                            returned=returned, recycled=recycled)
+
+    elif uppercase_move[0] == "S":  # "SE" or "S" + column number
+        if len(ex_location_list[13].card_list) == 0:
+            return MoveResult(uppercase_move, False, NO_SPARE_CARDS)
+        if uppercase_move == "SE":
+            suit = ex_location_list[13].card_list[-1].suit
+            rule_start = time.perf_counter() if timed else 0
+            moved = ex_location_list[13].move_to_home(ex_location_list)
+            rule_end = time.perf_counter() if timed else 0
+            destination = find_home(ex_location_list, suit)
+        else:
+            destination = int(uppercase_move[1]) - 1
+            rule_start = time.perf_counter() if timed else 0
+            moved = ex_location_list[13].move_to_column(
+                ex_location_list, ex_location_list[destination])
+            rule_end = time.perf_counter() if timed else 0
+        if moved is False:
+            result = MoveResult(uppercase_move, False, NOT_ALLOWED)
+        else:
+            result = MoveResult(uppercase_move, True, source=13,
+                                destination=destination, cards=1)
+
+    else:  # single column number - move to home pile
+        num = int(uppercase_move) - 1
+        column = ex_location_list[num]
+        if len(column.card_list) == 0:
+            return MoveResult(uppercase_move, False, NOT_ALLOWED)
+        suit = column.card_list[-1].suit
+        rule_start = time.perf_counter() if timed else 0
+        moved = column.move_to_home(ex_location_list)
+        rule_end = time.perf_counter() if timed else 0
+        if moved is False:
+            result = MoveResult(uppercase_move, False, NOT_ALLOWED)
+        else:
+            revealed = False
+            if 0 < len(column.card_list) == column.face_up_start:
+                column.reveal_card()
+                revealed = True
+            result = MoveResult(uppercase_move, True, source=num,
+                                destination=find_home(ex_location_list, suit),
+                                cards=1, revealed=revealed)
 
-    elif uppercase_move == "SE":
-        ex_location_list[13].move_to_home(ex_location_list)
-
-    elif uppercase_move[0] == "S":
-        col = int(uppercase_move[1])
-        ex_location_list[13].move_to_column(ex_location_list, ex_location_list[col])
+    if timed:
+        result.rule_seconds = rule_end - rule_start
+    return result
 
 
-def update_display(update_location_list):
+def undo_move(undo_location_list, result):
     """
-    provides the latest visual representation of the location_list
-    input: location_list
-    
-    prints the visuals
+    Input - the location_list and the MoveResult of the last move that 
+        was applied to it
     
-    output: None
+    Reverses the move using only what the MoveResult recorded, so 
+        undoing a move costs about the same as making it. Moves must be 
+        undone in the opposite order to the order they were made.
+    Returns None
     """
-    print("\n" + "- " * 50 + "\n")
-
-    for x in range(0, 14):  # change to iterate through values, not dict.
-        if x == 6:
-            update_location_list[x].display_cards()
-            print("\n")
-        elif x == 7 or x == 8 or x == 9 or x == 10:
-            c = update_location_list[x].get_card_list()
-            if len(c) > 1:
-                print(
-                    f"{update_location_list[x].get_card_list()[0].get_suit()} home - "
-                    f"{c[-1].get_suit_and_value()}"
-                )
-            else:
-                print(
-                    f"{update_location_list[x].get_card_list()[0].get_suit()} home - "
-                    "...Empty"
-                )
-        elif x == 11:
-            print(f"\nSpares pile: {update_location_list[x].len()} cards")
-        elif x == 12:
-            print(f"Spares discard pile: {update_location_list[x].len()} cards")
-        else:
-            update_location_list[x].display_cards()
-    print("\n")
+    source = undo_location_list[result.source]
+    destination = undo_location_list[result.destination]
+
+    if result.move == "S":
+        # 1.0 the drawn cards go back on top of the spares pile
+        visible_card_list = destination.card_list
+        for x in range(0, result.cards):
+            source.card_list.appendleft(visible_card_list.pop())
+
+        # 2.0 un-recycle: the spares pile was the discard pile before
+        discard = undo_location_list[12]
+        if result.recycled:
+            discard.card_list = source.card_list
+            source.card_list = collections.deque()
+
+        # 3.0 the cards that were visible come back from the discard pile
+        if result.returned > 0:
+            returned = [discard.card_list.pop()
+                        for x in range(0, result.returned)]
+            returned.reverse()
+            destination.card_list = returned
+        return None
+
+    moved = destination.card_list[-result.cards:]
+    del destination.card_list[-result.cards:]
+    if result.revealed:
+        source.face_up_start = len(source.card_list)
+    source.add_cards(moved)
+    return None
+
+
+def find_home(home_location_list, suit):
+    """
+    Returns the index in the location_list of the home pile for suit
+    Looks in the usual place from HOME_INDEX first, and only searches 
+        the home piles if they have been put in a different order.
+    """
+    i = HOME_INDEX[suit]
+    if home_location_list[i].card_list[0].suit == suit:
+        return i
+    for i in range(7, 11):
+        if home_location_list[i].card_list[0].suit == suit:
+            return i
+
+
+'''
+Safe home moves and autocomplete - home pile moves the game can make itself
+'''
 
 
-def play_game():
+def safe_home_move(safe_location_list, spares=True):
     """
-    Run this function to begin a game.
+    Input - the location_list
+
+    Looks for a card that can go onto its home pile and can never be
+        needed in the columns again: an ace or a two, or a card whose
+        value is at most one more than both home piles of the other
+        colour (so every card that could be put onto it is already home).
+    Columns are checked from left to right, then the visible pile.
+    spares - if False, the visible pile is left out. Taking a card out 
+        of it changes which cards are turned over together on later 
+        passes through the spares, so it isn't always safe when more 
+        than one card is turned over at a time.
+    Returns the move ("1" -> "7" or "SE"), or None if there isn't one.
+    """
+    home_values = {}
+    lowest_home = {"red": 13, "black": 13}
+    for home in safe_location_list[7:11]:
+        suit = home.card_list[0].suit
+        value = home.card_list[-1].value
+        home_values[suit] = value
+        colour = SUIT_COLOURS[suit]
+        lowest_home[colour] = min(lowest_home[colour], value)
+
+    for x in range(0, 8 if spares else 7):
+        i = x if x < 7 else 13
+        card_list = safe_location_list[i].card_list
+        if len(card_list) == 0 or not safe_location_list[i].is_face_up(-1):
+            continue
+        card = card_list[-1]
+        if home_values.get(card.suit) != card.value - 1:
+            continue
+        other_colour = "black" if card.colour == "red" else "red"
+        if card.value <= 2 or lowest_home[other_colour] >= card.value - 1:
+            return str(x + 1) if x < 7 else "SE"
+    return None
+
+
+def play_safe_home_moves(safe_location_list, spares=True):
+    """
+    Makes safe_home_move's moves with execute_move until there are none
+        left (one card going home can make another safe).
+    spares - as in safe_home_move
+    Yields the MoveResult of each move, marked automatic, straight after 
+        it is made and before the next one is looked for
     """
-    game_location_list = deal_new_hand()
+    move = safe_home_move(safe_location_list, spares)
+    while move is not None:
+        result = execute_move(safe_location_list, move)
+        result.automatic = True
+        yield result
+        move = safe_home_move(safe_location_list, spares)
+
+
+def autocomplete_moves(auto_location_list):
+    """
+    Input - the location_list
+
+    Once every card in the columns is face-up and the spares, discard
+        and visible piles are all empty, the game is won by moving the
+        columns' cards home, lowest first. Works this out without
+        changing the location_list.
+    Returns the list of moves that wins the game ([] if it is already
+        won), or None if the game can't be finished this way yet.
+    """
+    for i in range(11, 14):
+        if len(auto_location_list[i].card_list) > 0:
+            return None
+    card_lists = []
+    for column in auto_location_list[0:7]:
+        if column.face_up_start > 0:
+            return None
+        card_lists.append(list(column.card_list))
+
+    home_values = {}
+    for home in auto_location_list[7:11]:
+        home_values[home.card_list[0].suit] = home.card_list[-1].value
+
+    auto_move_list = []
+    moved = True
+    while moved:
+        moved = False
+        for x in range(0, 7):
+            card_list = card_lists[x]
+            if len(card_list) == 0:
+                continue
+            card = card_list[-1]
+            if home_values[card.suit] == card.value - 1:
+                home_values[card.suit] += 1
+                card_list.pop()
+                auto_move_list.append(str(x + 1))
+                moved = True
+
+    for card_list in card_lists:
+        if len(card_list) > 0:  # a column that wasn't built in order
+            return None
+    return auto_move_list
 
-    while not have_won(game_location_list):
-        update_display(game_location_list)
-        uppercase_move = decide_move(game_location_list)
-        if uppercase_move == "NEW":
-            print("\nGiving up?")
-            input("Hit enter to re-shuffle the deck and start again.")
-            play_game()
-            break
-        execute_move(game_location_list, uppercase_move)
 
-    print("\n" + "- " * 50 + "\nCongratulations, you have won!")
+class CardIndex(object):
+    """
+    Keeps track of where every card is in a location_list, so that moves 
+        can be checked with a few lookups rather than by searching 
+        through the locations.
+    It is kept up to date by being told about each move (see update), 
+        and assumes the position was reached by playing the game: the 
+        face-up cards in a column always form one run.
+
+    Attributes:
+        places - dict: card -> (location index, position in that 
+            location's card_list). In the spares pile (location 11) 
+            positions are counted from its last card, since cards are 
+            drawn from its start.
+        ids - dict: card -> card id (0-51, see card_to_code)
+        cards - list: card id -> card
+        homes - dict: suit -> location index of that suit's home pile
+        face_up_starts - list of 7 ints, the index of the first face-up 
+            card in each column (the number of face-down cards)
+
+    Methods:
+        index_location - (re)records every card in one location
+        update - records the effect of a move that was just made or 
+            undone. Only the moved cards are looked at, apart from when 
+            the discard pile is recycled.
+    """
+
+    def __init__(self, index_location_list):
+        self.places = {}
+        self.ids = {}
+        self.cards = [None] * 52
+        self.homes = {}
+        self.face_up_starts = [0] * 7
+
+        for i in range(0, 14):
+            if 7 <= i <= 10:
+                self.homes[index_location_list[i].card_list[0].suit] = i
+                card_list = index_location_list[i].card_list[1:]  # no zero card
+            else:
+                card_list = index_location_list[i].card_list
+            for card in card_list:
+                card_id = card.card_id
+                self.ids[card] = card_id
+                self.cards[card_id] = card
+            self.index_location(index_location_list, i)
+
+    def index_location(self, index_location_list, i):
+        card_list = index_location_list[i].card_list
+        places = self.places
+        if i == 11:
+            x = len(card_list) - 1
+            for card in card_list:
+                places[card] = (11, x)
+                x -= 1
+        else:
+            for x, card in enumerate(card_list):
+                places[card] = (i, x)
+        if i < 7:
+            self.face_up_starts[i] = index_location_list[i].face_up_start
+
+    def update(self, index_location_list, result, undone=False):
+        places = self.places
+        if result.move == "S":
+            stock = index_location_list[11].card_list
+            discard = index_location_list[12].card_list
+            visible = index_location_list[13].card_list
+            if result.recycled:
+                for i in range(11, 14):
+                    self.index_location(index_location_list, i)
+                return None
+            if undone:  # drawn cards are back at the start of the spares
+                for x in range(0, result.cards):
+                    places[stock[x]] = (11, len(stock) - 1 - x)
+            else:  # the returned cards are at the end of the discard pile
+                for x in range(len(discard) - result.returned, len(discard)):
+                    places[discard[x]] = (12, x)
+            for x in range(0, len(visible)):
+                places[visible[x]] = (13, x)
+            return None
+
+        # the moved cards are at the end of the location they are now in
+        i = result.source if undone else result.destination
+        card_list = index_location_list[i].card_list
+        for x in range(len(card_list) - result.cards, len(card_list)):
+            places[card_list[x]] = (i, x)
+        if result.revealed:
+            self.face_up_starts[result.source] += 1 if undone else -1
+        return None
+
+
+class Game(object):
+    """
+    A game in progress: a location_list plus a journal of the moves 
+        made on it, so that moves can be undone and redone.
+
+    Attributes:
+        location_list - the locations holding the cards
+        journal - list of the MoveResults of the moves made, oldest first
+        undone - list of MoveResults that have been undone and can be 
+            redone, most recently undone last
+        hash - the zobrist_hash of the current position, kept up to date 
+            as each move is made or undone by only looking at the cards 
+            that moved
+        column_hashes - the column_hash of each of the 7 columns
+        column_sum - the columns' share of hash (see zobrist_hash)
+        pile_hash - the home piles' and spares' share of hash
+        index - a CardIndex of where every card is, kept up to date as 
+            each move is made or undone
+        auto_home - if True, every card that safe_home_move finds is 
+            moved home straight after each move
+        auto_home_spares - if False, auto_home leaves the visible pile's 
+            card alone (see safe_home_move)
+        last_results - the MoveResults of every move made or undone by 
+            the last call to move, undo, redo or autocomplete, including 
+            automatic ones
+
+    Methods:
+        move - executes a move and records it in the journal. Returns 
+            the MoveResult
+        undo - reverses the last move, along with any automatic moves 
+            made after it. Returns its MoveResult, or None if there is 
+            nothing to undo
+        redo - makes the last undone move again, along with the 
+            automatic moves that followed it. Returns its MoveResult, or 
+            None if there is nothing to redo
+        autocomplete - wins the game with autocomplete_moves. Returns the 
+            list of MoveResults, or None if the game can't be finished 
+            that way yet. The whole autocomplete is undone in one go.
+        record - brings the index, hash and journal up to date after a 
+            move
+        get_moves - returns the list of moves made so far
+        find_legal_moves - the same as the find_legal_moves function, 
+            but checks each move with the CardIndex
+    """
+
+    def __init__(self, location_list, auto_home=False, auto_home_spares=True):
+        self.location_list = location_list
+        self.journal = []
+        self.undone = []
+        self.auto_home = auto_home
+        self.auto_home_spares = auto_home_spares
+        self.last_results = []
+        self.index = CardIndex(location_list)
+        self.column_hashes = [column_hash(location.card_list,
+                                          location.face_up_start)
+                              for location in location_list[0:7]]
+        self.column_sum = 0
+        for column_hash_value in self.column_hashes:
+            self.column_sum = (self.column_sum + mix_64(column_hash_value)) & MASK_64
+        self.hash = zobrist_hash(location_list)
+        self.pile_hash = self.hash ^ self.column_sum
+
+    def move(self, uppercase_move):
+        result = execute_move(self.location_list, uppercase_move)
+        self.last_results = [result]
+        if result.applied:
+            self.record(result)
+            self.undone = []  # a new move replaces anything undone
+            if self.auto_home:
+                # each one is recorded before the next is made, as 
+                #   update_hash needs the position straight after a move
+                for auto_result in play_safe_home_moves(
+                        self.location_list, self.auto_home_spares):
+                    self.record(auto_result)
+                    self.last_results.append(auto_result)
+        return result
+
+    def undo(self):
+        self.last_results = []
+        if len(self.journal) == 0:
+            return None
+        while True:
+            result = self.journal.pop()
+            self.update_hash(result)  # before the move is reversed - see update_hash
+            undo_move(self.location_list, result)
+            for hook in list(MOVE_HOOKS):  # a hook may remove itself
+                hook.after_undo(self.location_list, result)
+            self.index.update(self.location_list, result, undone=True)
+            self.undone.append(result)
+            self.last_results.append(result)
+            if not result.automatic or len(self.journal) == 0:
+                return result
+
+    def redo(self):
+        self.last_results = []
+        if len(self.undone) == 0:
+            return None
+        first_result = None
+        while len(self.undone) > 0:
+            undone_result = self.undone[-1]
+            if first_result is not None and not undone_result.automatic:
+                break
+            self.undone.pop()
+            result = execute_move(self.location_list, undone_result.move)
+            result.automatic = undone_result.automatic
+            self.record(result)
+            self.last_results.append(result)
+            if first_result is None:
+                first_result = result
+        return first_result
+
+    def autocomplete(self):
+        auto_move_list = autocomplete_moves(self.location_list)
+        self.last_results = []
+        if auto_move_list is None:
+            return None
+        for move in auto_move_list:
+            result = execute_move(self.location_list, move)
+            # after the first, so that undo takes them all back together
+            result.automatic = len(self.last_results) > 0
+            self.record(result)
+            self.last_results.append(result)
+        if len(auto_move_list) > 0:
+            self.undone = []
+        return list(self.last_results)
+
+    def record(self, result):
+        self.index.update(self.location_list, result)
+        self.update_hash(result)
+        self.journal.append(result)
+
+    def update_column_hash(self, column, change):
+        """
+        xors change into one column's hash, and swaps that column's 
+            share of column_sum for its new one
+        """
+        old_share = mix_64(self.column_hashes[column])
+        self.column_hashes[column] ^= change
+        new_share = mix_64(self.column_hashes[column])
+        self.column_sum = (self.column_sum - old_share + new_share) & MASK_64
+
+    def update_hash(self, result):
+        """
+        Updates self.hash for the move in result, using the position 
+            straight after the move was made.
+        A move and its undo swap the same two positions, so this is 
+            called after making a move and before undoing it, and only 
+            has to look at the cards that moved.
+        """
+        update_location_list = self.location_list
+        ids = self.index.ids
+        source = result.source
+        destination = result.destination
+        other_change = 0
+
+        if result.move == "S":
+            stock = update_location_list[11].card_list
+            discard = update_location_list[12].card_list
+            visible = update_location_list[13].card_list
+            if result.recycled:
+                # before: discard pile + visible pile, afterwards 
+                #   visible pile + spares pile, all in the same order
+                all_cards = visible + list(stock)
+                returned_start = len(all_cards) - result.returned
+                for x in range(0, len(all_cards)):
+                    if x < returned_start:
+                        other_change ^= spare_key(1, ids[all_cards[x]], x)
+                    else:
+                        other_change ^= spare_key(2, ids[all_cards[x]], x - returned_start)
+                for x in range(0, len(visible)):
+                    other_change ^= spare_key(2, ids[visible[x]], x)
+                x = len(stock) - 1
+                for card in stock:
+                    other_change ^= spare_key(0, ids[card], x)
+                    x -= 1
+            else:
+                returned_start = len(discard) - result.returned
+                for x in range(0, result.returned):
+                    card = discard[returned_start + x]
+                    other_change ^= spare_key(2, ids[card], x)
+                    other_change ^= spare_key(1, ids[card], returned_start + x)
+                for x in range(0, len(visible)):
+                    other_change ^= spare_key(0, ids[visible[x]], len(stock) + len(visible) - 1 - x)
+                    other_change ^= spare_key(2, ids[visible[x]], x)
+            self.pile_hash ^= other_change
+            self.hash = self.column_sum ^ self.pile_hash
+            return None
+
+        # 1.0 the cards at the destination
+        destination_cards = update_location_list[destination].card_list
+        first = len(destination_cards) - result.cards
+        moved = destination_cards[first:]
+        if destination < 7:
+            change = 0
+            for x in range(0, result.cards):
+                change ^= COLUMN_KEYS[(ids[moved[x]] | FACE_UP) * 52 + first + x]
+            self.update_column_hash(destination, change)
+        else:  # home pile
+            other_change ^= HOME_KEYS[ids[moved[0]]]
+
+        # 2.0 where those cards were at the source
+        source_cards = update_location_list[source].card_list
+        first = len(source_cards)
+        if source < 7:
+            change = 0
+            for x in range(0, result.cards):
+                change ^= COLUMN_KEYS[(ids[moved[x]] | FACE_UP) * 52 + first + x]
+            if result.revealed:
+                card_id = ids[source_cards[-1]]
+                change ^= COLUMN_KEYS[(card_id | FACE_UP) * 52 + first - 1]
+                change ^= COLUMN_KEYS[card_id * 52 + first - 1]
+            self.update_column_hash(source, change)
+        else:  # visible pile
+            other_change ^= spare_key(2, ids[moved[0]], first)
+
+        self.pile_hash ^= other_change
+        self.hash = self.column_sum ^ self.pile_hash
+        return None
+
+    def get_moves(self):
+        return [result.move for result in self.journal]
+
+    def find_legal_moves(self):
+        game_location_list = self.location_list
+        places = self.index.places
+        ids = self.index.ids
+        cards = self.index.cards
+        face_up_starts = self.index.face_up_starts
+        legal_move_list = []
+
+        # 1.0 value of the top card on each home pile, looked up by suit
+        home_values = {}
+        for suit, i in self.index.homes.items():
+            home_values[suit] = game_location_list[i].card_list[-1].value
+
+        # 2.0 column to home pile
+        for x in range(0, 7):
+            card_list = game_location_list[x].card_list
+            if len(card_list) > 0:
+                card = card_list[-1]
+                if home_values[card.suit] == card.value - 1:
+                    legal_move_list.append(str(x + 1))
+
+        # 3.0 column to column: look up where the cards that could go 
+        #   onto each column's top card are, rather than searching
+        column_moves = []
+        for y in range(0, 7):
+            card_list_2 = game_location_list[y].card_list
+            if len(card_list_2) == 0:
+                for x in range(0, 7):
+                    card_list_1 = game_location_list[x].card_list
+                    # a king can only be at the start of the face-up run
+                    if (x != y and len(card_list_1) > 0
+                            and card_list_1[face_up_starts[x]].value == 13):
+                        column_moves.append((x, y))
+            else:
+                for card_id in CARDS_PLAYABLE_ON[ids[card_list_2[-1]]]:
+                    x, position = places[cards[card_id]]
+                    if x < 7 and x != y and position >= face_up_starts[x]:
+                        column_moves.append((x, y))
+        column_moves.sort()
+        for x, y in column_moves:
+            legal_move_list.append(f"M{x + 1}{y + 1}")
+
+        # 4.0 spares to home pile / column
+        visible_card_list = game_location_list[13].card_list
+        if len(visible_card_list) > 0:
+            card_1 = visible_card_list[-1]
+            if home_values[card_1.suit] == card_1.value - 1:
+                legal_move_list.append("SE")
+            card_id = ids[card_1]
+            for y in range(0, 7):
+                card_list_2 = game_location_list[y].card_list
+                if len(card_list_2) == 0:
+                    if card_1.value == 13:
+                        legal_move_list.append(f"S{y + 1}")
+                elif card_id in CARDS_PLAYABLE_ON[ids[card_list_2[-1]]]:
+                    legal_move_list.append(f"S{y + 1}")
+
+        # 5.0 advancing only changes anything if there are cards to turn over
+        if (len(game_location_list[11].card_list) > 0
+                or len(game_location_list[12].card_list) > 0):
+            legal_move_list.append("S")
+
+        return legal_move_list
+
+
+def find_legal_moves(legal_location_list):
+    """
+    Input - the location_list
+    
+    Works out every move that execute_move would carry out right now, 
+        without changing the location_list.
+    Returns a list of moves in the same notation as VALID_MOVES, in the 
+        order:
+        column to home pile ("1" -> "7")
+        column to column ("M12" -> "M76")
+        spares to home pile ("SE")
+        spares to column ("S1" -> "S7")
+        advance the spares pile ("S")
+    """
+    legal_move_list = []
+
+    # 1.0 value of the top card on each home pile, looked up by suit
+    home_values = {}
+    for home in legal_location_list[7:11]:
+        home_values[home.card_list[0].suit] = home.card_list[-1].value
+
+    # 2.0 column to home pile, collecting the face-up cards of each column
+    face_up_lists = []
+    for x in range(0, 7):
+        card_list = legal_location_list[x].card_list
+        face_up_list = card_list[legal_location_list[x].face_up_start:]
+        face_up_lists.append(face_up_list)
+        if len(card_list) > 0:
+            card = card_list[-1]
+            if home_values.get(card.suit) == card.value - 1:
+                legal_move_list.append(str(x + 1))
+
+    # 3.0 column to column
+    for x in range(0, 7):
+        face_up_list = face_up_lists[x]
+        if len(face_up_list) == 0:
+            continue
+        for y in range(0, 7):
+            if y == x:
+                continue
+            card_list_2 = legal_location_list[y].card_list
+            if len(card_list_2) == 0:
+                # only a king can move to an empty column
+                for card_1 in face_up_list:
+                    if card_1.value == 13:
+                        legal_move_list.append(f"M{x + 1}{y + 1}")
+                        break
+            else:
+                card_2 = card_list_2[-1]
+                for card_1 in face_up_list:
+                    if (card_1.value == card_2.value - 1
+                            and card_1.colour != card_2.colour):
+                        legal_move_list.append(f"M{x + 1}{y + 1}")
+                        break
+
+    # 4.0 spares to home pile / column
+    visible_card_list = legal_location_list[13].card_list
+    if len(visible_card_list) > 0:
+        card_1 = visible_card_list[-1]
+        if home_values.get(card_1.suit) == card_1.value - 1:
+            legal_move_list.append("SE")
+        for y in range(0, 7):
+            card_list_2 = legal_location_list[y].card_list
+            if len(card_list_2) == 0:
+                if card_1.value == 13:
+                    legal_move_list.append(f"S{y + 1}")
+            else:
+                card_2 = card_list_2[-1]
+                if (card_1.value == card_2.value - 1
+                        and card_1.colour != card_2.colour):
+                    legal_move_list.append(f"S{y + 1}")
+
+    # 5.0 advancing only changes anything if there are cards to turn over
+    if (len(legal_location_list[11].card_list) > 0
+            or len(legal_location_list[12].card_list) > 0):
+        legal_move_list.append("S")
+
+    return legal_move_list
+
+
+class SolveResult(object):
+    """
+    The outcome of a call to solve_game.
+
+    Attributes:
+        winnable - True if a winning sequence of moves was found
+                   False if every reachable position was tried without 
+                       a win
+                   None if the search ran out of nodes before deciding
+        moves - list of moves (VALID_MOVES notation) that wins the game 
+            from the starting position, or None if no win was found
+        nodes - the number of distinct positions that were explored
+    """
+
+    def __init__(self, winnable, moves, nodes):
+        self.winnable = winnable
+        self.moves = moves
+        self.nodes = nodes
+
+    def __repr__(self):
+        return (f"SolveResult(winnable={self.winnable}, "
+                f"moves={len(self.moves) if self.moves else 0}, "
+                f"nodes={self.nodes})")
+
+
+def order_moves(order_location_list, legal_move_list, useful_only=False):
+    """
+    Sorts a list from find_legal_moves so that the moves most likely to 
+        lead to a win come first:
+        1 - moves to a home pile
+        2 - column to column moves that turn over a face-down card
+        3 - spares to column moves
+        4 - other column to column moves
+        5 - advancing the spares pile
+    Moving a king that is already at the bottom of its column into an 
+        empty column can never help, so those moves are left out.
+    If useful_only is True, the "other" column to column moves (which 
+        can be played back and forth forever) are left out too.
+    Returns a new list of moves.
+    """
+    home_moves = []
+    reveal_moves = []
+    spare_moves = []
+    other_moves = []
+    advance_moves = []
+    for move in legal_move_list:
+        if move == "S":
+            advance_moves.append(move)
+        elif move[0] == "S" and move != "SE":
+            spare_moves.append(move)
+        elif move[0] != "M":
+            home_moves.append(move)
+        else:
+            column_1 = order_location_list[int(move[1]) - 1]
+            card_list_1 = column_1.card_list
+            card_list_2 = order_location_list[int(move[2]) - 1].card_list
+            face_up_start = column_1.face_up_start
+            if face_up_start > 0:
+                # the moved cards must come from above a face-down card
+                card_2_value = card_list_2[-1].value if card_list_2 else 14
+                if card_list_1[face_up_start].value == card_2_value - 1:
+                    reveal_moves.append(move)
+                else:
+                    other_moves.append(move)
+            elif len(card_list_2) > 0:
+                other_moves.append(move)
+            elif card_list_1[0].value != 13:
+                other_moves.append(move)
+    if useful_only:
+        other_moves = []
+    return home_moves + reveal_moves + spare_moves + other_moves + advance_moves
+
+
+def solve_game(solve_location_list, max_nodes=200000, auto_home=False):
+    """
+    Input - a location_list (i.e. from deal_new_hand) and the most 
+        positions to explore before giving up
+    auto_home - if True, the safe home moves after each move are made as 
+        part of it (see Game), so they don't add to the search depth. 
+        They are still in the moves returned. Cards on the visible pile 
+        are left for the search to decide, as taking one out changes 
+        how the spares turn over later, so auto_home never rules out a 
+        win.
+    
+    Decides whether the game can be won, using a depth-first search over 
+        find_legal_moves. Moves are made on a Game and backed out with 
+        Game.undo, so no positions are copied. Every position reached is 
+        remembered by its Game.hash (which ignores the order of the 
+        columns), so a position that can be reached by different orders 
+        of moves is only explored once.
+    The location_list given is left as it was.
+    Returns a SolveResult.
+    """
+    game = Game(solve_location_list, auto_home, auto_home_spares=False)
+    seen_hashes = {game.hash}
+    nodes = 1
+
+    # one list of moves still to try for each position on the current path
+    start_moves = order_moves(solve_location_list, game.find_legal_moves())
+    stack = [start_moves[::-1]]
+
+    try:
+        while stack:
+            untried_moves = stack[-1]
+            if not untried_moves:
+                stack.pop()
+                if stack:
+                    game.undo()  # back out of the exhausted position
+                continue
+
+            game.move(untried_moves.pop())
+            if game.hash in seen_hashes:
+                game.undo()
+                continue
+            seen_hashes.add(game.hash)
+            nodes += 1
+
+            if have_won(solve_location_list):
+                return SolveResult(True, game.get_moves(), nodes)
+            if nodes >= max_nodes:
+                return SolveResult(None, None, nodes)
+
+            child_moves = order_moves(solve_location_list,
+                                      game.find_legal_moves())
+            stack.append(child_moves[::-1])
+
+        return SolveResult(False, None, nodes)
+    finally:
+        # put the starting position back
+        while game.undo() is not None:
+            pass
+
+
+'''
+Parallel solving - one deal's search shared out between worker processes
+'''
+
+
+class SharedHashSet(object):
+    """
+    A set of position hashes (see Game.hash) in shared memory, that the 
+        worker processes of parallel_solve_game all add to without any 
+        locking.
+    It is an open addressing hash table with linear probing. Two 
+        processes adding at the same moment can lose one of the hashes, 
+        and a hash that can't find a free slot close to its own isn't 
+        added. Both only mean that a position may be explored twice.
+
+    Attributes:
+        table - RawArray of 64 bit hashes, 0 for an empty slot. Its size 
+            is a power of two, at least twice capacity.
+
+    Methods:
+        add - adds a hash. Returns True if it wasn't already in the set
+    """
+
+    PROBES = 16  # slots looked at before giving up on adding a hash
+
+    def __init__(self, capacity):
+        size = 1 << max(10, (2 * capacity - 1).bit_length())
+        self.table = multiprocessing.RawArray("Q", size)
+        self.mask = size - 1
+
+    def add(self, value):
+        value = value or 1  # 0 marks an empty slot
+        table = self.table
+        i = value & self.mask
+        for probe in range(0, self.PROBES):
+            slot = table[i]
+            if slot == value:
+                return False
+            if slot == 0:
+                table[i] = value
+                return True
+            i = (i + 1) & self.mask
+        return True
+
+
+# indexes into the shared counts of parallel_solve_game
+PENDING = 0  # tasks queued or being searched
+QUEUED = 1  # tasks waiting in the queue
+IDLE = 2  # workers waiting for a task
+NODES = 3  # positions explored, added in batches
+OUT_OF_BUDGET = 4  # 1 once the node or time budget has run out
+
+SOLVE_BATCH = 256  # positions a worker explores between checks
+
+
+def search_task(packed, prefix, auto_home, seen, counts, lock, tasks,
+                stop, max_nodes, deadline):
+    """
+    Searches the subtree of one parallel_solve_game task for a win: the 
+        position reached by playing the moves in prefix from the packed 
+        starting position.
+    Works like solve_game, but every batch of positions it adds to the 
+        shared node count, stops if stop is set or the budget has run 
+        out, and gives away work if other workers are idle. The untried 
+        moves nearest the top of its search (so the largest subtrees) 
+        are put in the tasks queue for other workers to take.
+    Returns the winning moves from the starting position, or None
+    """
+    game = Game(CompactState.unpack(packed).to_location_list(),
+                auto_home_spares=False)
+    for move in prefix[:-1]:  # these already include any automatic moves
+        game.move(move)
+    game.auto_home = auto_home
+    if len(prefix) > 0:
+        game.move(prefix[-1])
+        if not seen.add(game.hash):
+            return None
+    task_location_list = game.location_list
+    if have_won(task_location_list):
+        return game.get_moves()
+
+    # one list of moves still to try for each position on the current 
+    #   path, and the length of the journal at that position
+    stack = [order_moves(task_location_list, game.find_legal_moves())[::-1]]
+    journal_lengths = [len(game.journal)]
+    nodes = 0
+
+    while stack:
+        if nodes == SOLVE_BATCH:
+            with lock:
+                counts[NODES] += nodes
+                if counts[NODES] >= max_nodes or (
+                        deadline is not None and time.time() > deadline):
+                    counts[OUT_OF_BUDGET] = 1
+            nodes = 0
+            if counts[OUT_OF_BUDGET]:
+                stop.set()
+            if stop.is_set():
+                return None
+            if counts[IDLE] > counts[QUEUED]:
+                for level in range(0, len(stack)):
+                    if len(stack[level]) > 0:
+                        moves_so_far = game.get_moves()[0:journal_lengths[level]]
+                        with lock:
+                            counts[PENDING] += len(stack[level])
+                            counts[QUEUED] += len(stack[level])
+                        for move in stack[level]:
+                            tasks.put(moves_so_far + [move])
+                        stack[level] = []
+                        break
+
+        untried_moves = stack[-1]
+        if not untried_moves:
+            stack.pop()
+            journal_lengths.pop()
+            if stack:
+                game.undo()  # back out of the exhausted position
+            continue
+
+        game.move(untried_moves.pop())
+        if not seen.add(game.hash):
+            game.undo()
+            continue
+        nodes += 1
+
+        if have_won(task_location_list):
+            with lock:
+                counts[NODES] += nodes
+            return game.get_moves()
+
+        stack.append(order_moves(task_location_list,
+                                 game.find_legal_moves())[::-1])
+        journal_lengths.append(len(game.journal))
+
+    with lock:
+        counts[NODES] += nodes
+    return None
+
+
+def solve_worker(packed, auto_home, seen, counts, lock, tasks, results,
+                 stop, max_nodes, deadline):
+    """
+    The work of one parallel_solve_game process: takes tasks from the 
+        tasks queue and searches them with search_task, until a win is 
+        found, the budget runs out, or there are no tasks left anywhere.
+    A win is put in the results queue.
+    If searching a task raises an exception, the task is still counted 
+        as done and stop is set, so the other workers don't wait for it, 
+        and the exception is raised again to end this process with an 
+        error.
+    """
+    # tasks may be left in the queue when the search stops, and needn't 
+    #   be sent before this process ends
+    tasks.cancel_join_thread()
+    while not stop.is_set():
+        try:
+            prefix = tasks.get(timeout=0.05)
+        except queue.Empty:
+            if counts[PENDING] == 0:
+                return None
+            continue
+        with lock:
+            counts[QUEUED] -= 1
+            counts[IDLE] -= 1
+        try:
+            winning_moves = search_task(packed, prefix, auto_home, seen,
+                                        counts, lock, tasks, stop, max_nodes,
+                                        deadline)
+            if winning_moves is not None:
+                results.put(winning_moves)
+                stop.set()
+        except BaseException:
+            stop.set()
+            raise
+        finally:
+            with lock:
+                counts[PENDING] -= 1
+                counts[IDLE] += 1
+    return None
+
+
+def parallel_solve_game(solve_location_list, max_nodes=1000000,
+                        time_budget=None, processes=None, auto_home=True):
+    """
+    Input - a location_list (i.e. from deal_new_hand), the most positions 
+        to explore and the most seconds to take (no limit if None), 
+        across all the worker processes
+    
+    Decides whether the game can be won like solve_game, but for deals 
+        that take a long time to solve: the search is shared out between 
+        processes worker processes (all the CPU cores if not given). 
+        Work is stolen rather than split up in advance - a worker with 
+        nothing to do takes an unexplored subtree that a busy worker has 
+        put in the shared queue for it. The workers share one 
+        SharedHashSet of the positions already reached.
+    auto_home - as in solve_game
+    With processes=1 the search is done in this process.
+    The location_list given is left as it was.
+    Returns a SolveResult. The moves are in VALID_MOVES notation, from 
+        the position given.
+    Raises RuntimeError if a worker process ends with an error before a 
+        win is found, as the search can't be finished without it.
+    """
+    if processes is None:
+        processes = os.cpu_count() or 1
+    packed = CompactState.from_location_list(solve_location_list).pack()
+    deadline = None if time_budget is None else time.time() + time_budget
+
+    seen = SharedHashSet(max_nodes)
+    seen.add(Game(solve_location_list).hash)
+    counts = multiprocessing.RawArray("q", 5)
+    counts[PENDING] = counts[QUEUED] = 1
+    counts[IDLE] = processes
+    lock = multiprocessing.Lock()
+    tasks = multiprocessing.Queue()
+    results = multiprocessing.Queue()
+    stop = multiprocessing.Event()
+    tasks.put([])  # the whole search, from the starting position
+    worker_args = (packed, auto_home, seen, counts, lock, tasks, results,
+                   stop, max_nodes, deadline)
+
+    winning_moves = None
+    failed_exitcode = None
+    if processes == 1:
+        solve_worker(*worker_args)
+    else:
+        workers = [multiprocessing.Process(target=solve_worker,
+                                           args=worker_args, daemon=True)
+                   for i in range(0, processes)]
+        for worker in workers:
+            worker.start()
+        try:
+            while winning_moves is None:
+                # a worker that ended with an error may not have finished 
+                #   its task (i.e. if it was killed), so there is no point 
+                #   waiting for the others
+                running = False
+                for worker in workers:
+                    if worker.exitcode is None:
+                        running = True
+                    elif worker.exitcode != 0:
+                        failed_exitcode = worker.exitcode
+                if not running or failed_exitcode is not None:
+                    break
+                try:
+                    winning_moves = results.get(timeout=0.05)
+                except queue.Empty:
+                    if deadline is not None and time.time() > deadline:
+                        counts[OUT_OF_BUDGET] = 1
+                        stop.set()
+        finally:
+            stop.set()
+            for worker in workers:
+                worker.join(1)
+                if worker.is_alive():
+                    worker.terminate()
+    if winning_moves is None:
+        try:
+            winning_moves = results.get(timeout=0.05)
+        except queue.Empty:
+            pass
+
+    nodes = counts[NODES] + 1  # and the starting position
+    if winning_moves is not None:
+        return SolveResult(True, winning_moves, nodes)
+    if failed_exitcode is not None:
+        raise RuntimeError(
+            f"a solver worker process failed with exit code {failed_exitcode}")
+    if counts[OUT_OF_BUDGET]:
+        return SolveResult(None, None, nodes)
+    return SolveResult(False, None, nodes)
+
+
+def random_policy(policy_location_list, legal_move_list, rng):
+    """
+    A policy for play_one_game: picks any legal move at random.
+    rng is the random.Random the game was given, so games are repeatable.
+    """
+    return rng.choice(legal_move_list)
+
+
+def greedy_policy(policy_location_list, legal_move_list, rng):
+    """
+    A policy for play_one_game: always plays the first useful move from 
+        order_moves (home moves, then moves that turn a card over, then 
+        spares to column moves), advancing the spares pile when there 
+        isn't one.
+    """
+    ordered_move_list = order_moves(policy_location_list, legal_move_list,
+                                    useful_only=True)
+    if len(ordered_move_list) == 0:
+        return None
+    return ordered_move_list[0]
+
+
+def play_one_game(seed, policy=random_policy, max_moves=1000, draw_count=3,
+                  moves_played=None, auto_home=False):
+    """
+    Plays deal number seed to the end with no user input, asking policy 
+        for each move (see play_position).
+    policy(location_list, legal_move_list, rng) returns one of the legal 
+        moves, or None to give up. It must be a module level function so 
+        it can be sent to worker processes.
+    draw_count - how many spare cards are turned over at a time
+    moves_played - a list that each move is appended to, if given
+    auto_home - if True, safe home moves are made without asking policy
+    Returns a tuple: (seed, won, moves played, stock passes)
+    """
+    rng = random.Random(seed)
+    game_location_list = deal_new_hand(seed, draw_count)
+    won, moves, stock_passes = play_position(game_location_list, policy, rng,
+                                             max_moves, moves_played,
+                                             auto_home)
+    return seed, won, moves, stock_passes
+
+
+def play_position(game_location_list, policy, rng, max_moves=1000,
+                  moves_played=None, auto_home=False):
+    """
+    Plays on from the position in game_location_list with no user 
+        input, asking policy for each move and making it with 
+        execute_move.
+    The game ends when it is won, when the policy gives up, when 
+        max_moves have been played, or when a whole pass through the 
+        spares pile goes by without any move except "S".
+    auto_home - if True, the cards safe_home_move finds are moved home 
+        after each move (and before the first) without asking policy. 
+        They go in moves_played, but aren't counted as moves played.
+    Move hooks are told when the game starts and ends.
+    Returns a tuple: (won, moves played, stock passes)
+    """
+    moves = 0
+    stock_passes = 0
+    progress_this_pass = True
+    start_game_hooks(game_location_list)
+    if auto_home:
+        for result in play_safe_home_moves(game_location_list):
+            if moves_played is not None:
+                moves_played.append(result.move)
+
+    while moves < max_moves and not have_won(game_location_list):
+        legal_move_list = find_legal_moves(game_location_list)
+        if len(legal_move_list) == 0:
+            break
+        move = policy(game_location_list, legal_move_list, rng)
+        if move is None:
+            break
+
+        if move == "S":
+            if len(game_location_list[11].card_list) == 0:  # recycling
+                if not progress_this_pass:
+                    break
+                stock_passes += 1
+                progress_this_pass = False
+        else:
+            progress_this_pass = True
+
+        execute_move(game_location_list, move)
+        moves += 1
+        if moves_played is not None:
+            moves_played.append(move)
+        if auto_home:
+            for result in play_safe_home_moves(game_location_list):
+                progress_this_pass = True
+                if moves_played is not None:
+                    moves_played.append(result.move)
+
+    end_game_hooks(game_location_list)
+    return have_won(game_location_list), moves, stock_passes
+
+
+class BatchReport(object):
+    """
+    Totals for a batch of games played by simulate_games.
+
+    Attributes:
+        games - number of games played
+        wins - number of games won
+        moves - total moves played over all games
+        stock_passes - total times the spares pile was recycled
+        seconds - wall clock time taken to play the batch
+
+    Methods:
+        win_rate - wins / games
+        moves_per_game - average moves played per game
+        stock_passes_per_game - average stock passes per game
+        games_per_second - games played per second of wall clock time
+    """
+
+    def __init__(self, games, wins, moves, stock_passes, seconds):
+        self.games = games
+        self.wins = wins
+        self.moves = moves
+        self.stock_passes = stock_passes
+        self.seconds = seconds
+
+    def win_rate(self):
+        return self.wins / self.games if self.games else 0.0
+
+    def moves_per_game(self):
+        return self.moves / self.games if self.games else 0.0
+
+    def stock_passes_per_game(self):
+        return self.stock_passes / self.games if self.games else 0.0
+
+    def games_per_second(self):
+        return self.games / self.seconds if self.seconds else 0.0
+
+    def __str__(self):
+        return (f"{self.games} games, win rate {self.win_rate():.2%}, "
+                f"{self.moves_per_game():.1f} moves per game, "
+                f"{self.stock_passes_per_game():.2f} stock passes per game, "
+                f"{self.games_per_second():.1f} games per second")
+
+
+def simulate_games(first_seed, count, policy=random_policy, max_moves=1000,
+                   processes=None, draw_count=3, auto_home=False):
+    """
+    Plays count deals, numbered from first_seed, with play_one_game and 
+        adds up the results.
+    The deals are shared out between processes worker processes (all 
+        the CPU cores if not given). With processes=1 the games are 
+        played in this process.
+    draw_count - how many spare cards are turned over at a time
+    auto_home - if True, safe home moves are made without asking policy
+    Returns a BatchReport.
+    """
+    if processes is None:
+        processes = os.cpu_count() or 1
+    play = functools.partial(play_one_game, policy=policy, max_moves=max_moves,
+                             draw_count=draw_count, auto_home=auto_home)
+    seeds = range(first_seed, first_seed + count)
+
+    games = wins = moves = stock_passes = 0
+    start = time.perf_counter()
+    pool = multiprocessing.Pool(processes) if processes > 1 else None
+    try:
+        if pool is None:
+            results = map(play, seeds)
+        else:
+            chunksize = max(1, count // (processes * 16))
+            results = pool.imap_unordered(play, seeds, chunksize)
+        for seed, won, game_moves, game_passes in results:
+            games += 1
+            wins += won
+            moves += game_moves
+            stock_passes += game_passes
+    finally:
+        if pool is not None:
+            pool.terminate()
+
+    return BatchReport(games, wins, moves, stock_passes,
+                       time.perf_counter() - start)
+
+
+'''
+Hints - the move that wins most often when the game is played on at random
+'''
+
+
+def rollout_policy(policy_location_list, legal_move_list, rng):
+    """
+    A policy for playing out hints: usually plays like greedy_policy, 
+        but one move in five is picked at random, so that each playout 
+        of the same position goes a different way.
+    """
+    if rng.random() < 0.2:
+        return rng.choice(legal_move_list)
+    return greedy_policy(policy_location_list, legal_move_list, rng)
+
+
+def shuffle_face_down(state, rng):
+    """
+    Shuffles the face-down cards in the columns of a CompactState among 
+        themselves, since the player can't know what order they are in.
+    The spares are left alone, as the player can see all of them by 
+        going through the spares pile.
+    Returns None
+    """
+    places = []
+    codes = []
+    for column in state.columns:
+        for x in range(0, len(column)):
+            if not column[x] & FACE_UP:
+                places.append((column, x))
+                codes.append(column[x])
+    rng.shuffle(codes)
+    for (column, x), code in zip(places, codes):
+        column[x] = code
+
+
+def run_rollouts(packed, move_list, seconds, seed, max_moves=300):
+    """
+    Plays out the position packed (from CompactState.pack) again and 
+        again for seconds, starting each playout with the next move in 
+        move_list in turn and then playing on with rollout_policy. The 
+        face-down cards are shuffled for every playout (see 
+        shuffle_face_down).
+    The time is given as a length rather than a deadline, as it may be 
+        run in another process, whose time.monotonic() can't be compared 
+        with this one's. It is checked before every playout, so when 
+        time is short the moves late in move_list may get none.
+    Returns a dict: move -> [wins, playouts]
+    """
+    deadline = time.monotonic() + seconds
+    rng = random.Random(seed)
+    state = CompactState.unpack(packed)
+    scores = {move: [0, 0] for move in move_list}
+    x = 0
+    while time.monotonic() < deadline:
+        move = move_list[x % len(move_list)]
+        playout_state = state.copy()
+        shuffle_face_down(playout_state, rng)
+        rollout_location_list = playout_state.to_location_list()
+        execute_move(rollout_location_list, move)
+        won = play_position(rollout_location_list, rollout_policy, rng,
+                            max_moves)[0]
+        scores[move][0] += won
+        scores[move][1] += 1
+        x += 1
+    return scores
+
+
+class Hint(object):
+    """
+    The move suggested by suggest_move.
+
+    Attributes:
+        move - the suggested move (VALID_MOVES notation)
+        win_rate - the fraction of the playouts starting with move that 
+            were won, or None if there was no time for any
+        playouts - the number of playouts made, over all moves
+        scores - dict: move -> (wins, playouts) for every legal move
+    """
+
+    def __init__(self, move, win_rate, playouts, scores):
+        self.move = move
+        self.win_rate = win_rate
+        self.playouts = playouts
+        self.scores = scores
+
+    def __repr__(self):
+        return (f"Hint({self.move!r}, win_rate={self.win_rate!r}, "
+                f"playouts={self.playouts})")
+
+
+def suggest_move(hint_location_list, time_budget=0.2, pool=None,
+                 processes=None, seed=None):
+    """
+    Finds the legal move that leads to a win most often when the game 
+        is played on from it many times (see run_rollouts), taking about 
+        time_budget seconds. Moves there was no time to play out rank 
+        below the rest, in the order order_moves gives them.
+    The playouts are shared out between the processes of pool (a 
+        multiprocessing.Pool), if given, or made in this process.
+    processes - how many worker processes pool has (all the CPU cores 
+        if not given)
+    seed - seeds the playouts, so a hint can be repeated
+    The location_list isn't changed.
+    Returns a Hint, or None if there are no legal moves
+    """
+    move_list = order_moves(hint_location_list,
+                            find_legal_moves(hint_location_list))
+    if len(move_list) == 0:
+        return None
+    if seed is None:
+        seed = random.randrange(0, MAX_DEAL_NUMBER)
+    packed = CompactState.from_location_list(hint_location_list).pack()
+
+    if pool is None:
+        all_scores = [run_rollouts(packed, move_list, time_budget, seed)]
+    else:
+        if processes is None:
+            processes = os.cpu_count() or 1
+        tasks = [(packed, move_list[x:] + move_list[:x], time_budget, seed + x)
+                 for x in range(0, processes)]
+        all_scores = pool.starmap(run_rollouts, tasks)
+
+    scores = {move: (0, 0) for move in move_list}
+    for worker_scores in all_scores:
+        for move, (wins, playouts) in worker_scores.items():
+            scores[move] = (scores[move][0] + wins, scores[move][1] + playouts)
+
+    def win_rate(move):
+        wins, playouts = scores[move]
+        return wins / playouts if playouts else None
+
+    # ties, and moves with no playouts, go to the move order_moves put first
+    best_move = max(move_list, key=lambda move: (scores[move][1] > 0,
+                                                 win_rate(move) or 0))
+    return Hint(best_move, win_rate(best_move),
+                sum(playouts for wins, playouts in scores.values()), scores)
+
+
+'''
+Replay logs - games recorded as a deal number and one byte per move
+'''
+
+# move -> one-byte code, numbered in create_valid_move_list order
+MOVE_CODES = {move: code for code, move in enumerate(create_valid_move_list())}
+CODE_MOVES = create_valid_move_list()  # code -> move
+
+REPLAY_MAGIC = b"SOLREPL1"  # the start of every replay log file
+# each game: seed, draw_count, won, 4 home counts, number of moves
+REPLAY_HEADER = struct.Struct("<IBB4sI")
+
+
+def encode_moves(move_list):
+    """
+    Returns the moves in move_list as bytes, one byte per move
+    Raises KeyError for a move that isn't in VALID_MOVES
+    """
+    return bytes(MOVE_CODES[move] for move in move_list)
+
+
+def decode_moves(encoded_moves):
+    """
+    Returns the list of moves held in bytes from encode_moves
+    """
+    return [CODE_MOVES[code] for code in encoded_moves]
+
+
+def home_counts(count_location_list):
+    """
+    Returns a tuple of how many cards are on each home pile (not 
+        counting the zero cards), in location_list order
+    """
+    return tuple(len(count_location_list[i].card_list) - 1
+                 for i in range(7, 11))
+
+
+class GameRecord(object):
+    """
+    One game from a replay log.
+
+    Attributes:
+        seed - the deal number played (see deal_new_hand)
+        draw_count - how many spare cards were turned over at a time
+        moves - list of the moves played, as move strings
+        won - True if the game was won
+        homes - tuple of the 4 home pile counts at the end (see 
+            home_counts)
+
+    Methods:
+        from_location_list - (classmethod) builds a GameRecord for a 
+            game that ended in location_list
+    """
+
+    def __init__(self, seed, draw_count, moves, won, homes):
+        self.seed = seed
+        self.draw_count = draw_count
+        self.moves = moves
+        self.won = won
+        self.homes = tuple(homes)
+
+    @classmethod
+    def from_location_list(cls, seed, draw_count, moves, record_location_list):
+        return cls(seed, draw_count, moves, have_won(record_location_list),
+                   home_counts(record_location_list))
+
+    def __eq__(self, other):
+        if not isinstance(other, GameRecord):
+            return NotImplemented
+        return (self.seed, self.draw_count, self.moves, self.won,
+                self.homes) == (other.seed, other.draw_count, other.moves,
+                                other.won, other.homes)
+
+    def __repr__(self):
+        return (f"GameRecord(seed={self.seed}, {len(self.moves)} moves, "
+                f"won={self.won})")
+
+
+class ReplayLogWriter(object):
+    """
+    Appends GameRecords to a replay log file. The file is created if it 
+        doesn't exist, and games already in it are kept.
+    Can be used in a with statement, which closes the file at the end.
+    Raises ValueError if the file isn't empty and isn't a replay log.
+
+    Methods:
+        write - appends one GameRecord
+        close - closes the file
+    """
+
+    def __init__(self, path):
+        # opened for reading as well, to check the start of the file; 
+        #   writes still go on the end
+        self.log_file = open(path, "a+b")
+        if self.log_file.tell() == 0:
+            self.log_file.write(REPLAY_MAGIC)
+        else:
+            self.log_file.seek(0)
+            if self.log_file.read(len(REPLAY_MAGIC)) != REPLAY_MAGIC:
+                self.log_file.close()
+                raise ValueError(f"{path} is not a replay log")
+
+    def write(self, record):
+        encoded_moves = encode_moves(record.moves)
+        self.log_file.write(REPLAY_HEADER.pack(
+            record.seed, record.draw_count, record.won, bytes(record.homes),
+            len(encoded_moves)))
+        self.log_file.write(encoded_moves)
+
+    def close(self):
+        self.log_file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def read_replay_log(path):
+    """
+    Yields the GameRecords in a replay log file one at a time, in the 
+        order they were written, reading only one game into memory at 
+        once.
+    Raises ValueError if the file isn't a replay log, ends part way 
+        through a game, or has a move code that isn't in CODE_MOVES.
+    """
+    with open(path, "rb") as log_file:
+        if log_file.read(len(REPLAY_MAGIC)) != REPLAY_MAGIC:
+            raise ValueError(f"{path} is not a replay log")
+        game_index = 0
+        while True:
+            header = log_file.read(REPLAY_HEADER.size)
+            if len(header) == 0:
+                return
+            if len(header) < REPLAY_HEADER.size:
+                raise ValueError(f"{path} ends part way through game {game_index}")
+            seed, draw_count, won, homes, length = REPLAY_HEADER.unpack(header)
+            encoded_moves = log_file.read(length)
+            if len(encoded_moves) < length:
+                raise ValueError(f"{path} ends part way through game {game_index}")
+            try:
+                move_list = decode_moves(encoded_moves)
+            except IndexError:
+                raise ValueError(f"game {game_index} in {path} has an unknown "
+                                 "move code") from None
+            yield GameRecord(seed, draw_count, move_list, bool(won), homes)
+            game_index += 1
+
+
+def replay_game(record):
+    """
+    Deals record's deal again and plays its moves with execute_move, 
+        stopping at the first move that isn't allowed.
+    Returns a tuple: (location_list, index in record.moves of the move 
+        that wasn't allowed, or None if they all were)
+    """
+    replay_location_list = deal_new_hand(record.seed, record.draw_count)
+    for i, move in enumerate(record.moves):
+        if not execute_move(replay_location_list, move).applied:
+            return replay_location_list, i
+    return replay_location_list, None
+
+
+def play_and_record(seed, policy=random_policy, max_moves=1000, draw_count=3):
+    """
+    Plays deal number seed in the same way as play_one_game, but calls 
+        play_position itself so the end position is at hand for the 
+        home pile counts, rather than replaying the moves to find it
+    Returns the game as a GameRecord
+    """
+    moves_played = []
+    record_location_list = deal_new_hand(seed, draw_count)
+    play_position(record_location_list, policy, random.Random(seed),
+                  max_moves, moves_played)
+    return GameRecord.from_location_list(seed, draw_count, moves_played,
+                                         record_location_list)
+
+
+def record_games(path, first_seed, count, policy=random_policy,
+                 max_moves=1000, processes=None, draw_count=3):
+    """
+    Plays count deals, numbered from first_seed, and appends them to the 
+        replay log at path, in deal number order.
+    The games are shared out between processes worker processes, as in 
+        simulate_games. Only this process writes to the file.
+    Returns the number of games written
+    """
+    if processes is None:
+        processes = os.cpu_count() or 1
+    play = functools.partial(play_and_record, policy=policy,
+                             max_moves=max_moves, draw_count=draw_count)
+    seeds = range(first_seed, first_seed + count)
+
+    games = 0
+    with ReplayLogWriter(path) as writer:
+        if processes == 1:
+            for record in map(play, seeds):
+                writer.write(record)
+                games += 1
+        else:
+            chunksize = max(1, count // (processes * 16))
+            with multiprocessing.Pool(processes) as pool:
+                for record in pool.imap(play, seeds, chunksize):
+                    writer.write(record)
+                    games += 1
+    return games
+
+
+def verify_game(record):
+    """
+    Plays record's moves again through the rules engine, and checks that 
+        every move is allowed and that the game ends as recorded.
+    Returns a string saying what doesn't match, or None if it all does
+    """
+    if record.draw_count < 1:
+        return f"draw count {record.draw_count} isn't allowed"
+    if not 0 <= record.seed <= MAX_DEAL_NUMBER:
+        return f"deal number {record.seed} isn't allowed"
+    verify_location_list, illegal_at = replay_game(record)
+    if illegal_at is not None:
+        return (f"move {illegal_at} ({record.moves[illegal_at]}) "
+                "isn't allowed")
+    won = have_won(verify_location_list)
+    if won != record.won:
+        return (f"recorded as {'won' if record.won else 'lost'}, but was "
+                f"{'won' if won else 'lost'}")
+    homes = home_counts(verify_location_list)
+    if homes != record.homes:
+        return f"home piles recorded as {record.homes}, but were {homes}"
+    return None
+
+
+class VerifyReport(object):
+    """
+    The result of checking a replay log with verify_replay_log.
+
+    Attributes:
+        games - number of games checked
+        mismatches - list of (game index in the log, seed, what doesn't 
+            match), in log order. A game index of games with seed None 
+            means the log itself couldn't be read past that point.
+        seconds - wall clock time taken
+
+    Methods:
+        ok - True if there were no mismatches
+    """
+
+    def __init__(self, games, mismatches, seconds):
+        self.games = games
+        self.mismatches = mismatches
+        self.seconds = seconds
+
+    def ok(self):
+        return len(self.mismatches) == 0
+
+    def __str__(self):
+        return (f"{self.games} games checked, {len(self.mismatches)} "
+                f"mismatches, {self.seconds:.1f} seconds")
+
+
+def verify_replay_log(path, processes=None, batch_size=4096):
+    """
+    Checks every game in the replay log at path with verify_game.
+    The log is read batch_size games at a time, and each batch is shared 
+        out between processes worker processes (all the CPU cores if not 
+        given), so logs of any size can be checked in the same memory. 
+        With processes=1 the games are checked in this process.
+    Returns a VerifyReport
+    """
+    if processes is None:
+        processes = os.cpu_count() or 1
+    records = read_replay_log(path)
+    games = 0
+    mismatches = []
+    start = time.perf_counter()
+
+    pool = multiprocessing.Pool(processes) if processes > 1 else None
+    try:
+        while True:
+            batch = []
+            try:
+                for record in records:
+                    batch.append(record)
+                    if len(batch) == batch_size:
+                        break
+                bad_log = None
+            except ValueError as error:
+                bad_log = str(error)
+
+            if pool is None:
+                results = map(verify_game, batch)
+            else:
+                chunksize = max(1, len(batch) // (processes * 4))
+                results = pool.imap(verify_game, batch, chunksize)
+            for record, mismatch in zip(batch, results):
+                if mismatch is not None:
+                    mismatches.append((games, record.seed, mismatch))
+                games += 1
+
+            if bad_log is not None:
+                mismatches.append((games, None, bad_log))
+                break
+            if len(batch) < batch_size:
+                break
+    finally:
+        if pool is not None:
+            pool.terminate()
+
+    return VerifyReport(games, mismatches, time.perf_counter() - start)
+
+
+'''
+Solvability index - which deal numbers can be won, worked out in advance
+'''
+
+SOLVE_INDEX_MAGIC = b"SOLINDX1"  # the start of every solvability index file
+# first deal number, number of deals, draw_count, 1 if lengths are stored
+SOLVE_INDEX_HEADER = struct.Struct("<IIBBxx")
+
+# what a solvability index knows about each deal, in 2 bits
+DEAL_UNKNOWN = 0  # not in the index, or the search ran out of nodes
+DEAL_WINNABLE = 1
+DEAL_UNWINNABLE = 2
+DEAL_STATUS_NAMES = {DEAL_UNKNOWN: "unknown", DEAL_WINNABLE: "winnable",
+                     DEAL_UNWINNABLE: "unwinnable"}
+
+MAX_SOLUTION_LENGTH = 0xFFFF  # longer solutions are stored as this
+
+
+def solve_deal(seed, max_nodes=200000, draw_count=3):
+    """
+    Solves deal number seed with solve_game, for build_solve_index
+    Returns a tuple: (DEAL_WINNABLE, DEAL_UNWINNABLE or DEAL_UNKNOWN, 
+        number of moves in the solution found, or 0 if there isn't one)
+    """
+    result = solve_game(deal_new_hand(seed, draw_count), max_nodes,
+                        auto_home=True)
+    if result.winnable:
+        return DEAL_WINNABLE, min(len(result.moves), MAX_SOLUTION_LENGTH)
+    if result.winnable is False:
+        return DEAL_UNWINNABLE, 0
+    return DEAL_UNKNOWN, 0
+
+
+def build_solve_index(path, first_seed, count, max_nodes=200000,
+                      processes=None, draw_count=3, lengths=True,
+                      retry_nodes=None):
+    """
+    Solves count deals, numbered from first_seed, with solve_deal and 
+        writes a solvability index (see SolveIndex) to path.
+    The deals are shared out between processes worker processes (all 
+        the CPU cores if not given), one at a time since some take much 
+        longer than others. With processes=1 they are solved in this 
+        process.
+    lengths - if True, the length of each solution is stored as well
+    retry_nodes - if given, the deals that are still unknown afterwards 
+        are solved again one at a time, with parallel_solve_game using 
+        every process and up to retry_nodes positions. This stops a few 
+        hard deals from holding up the whole job on single cores.
+    The index is written to path + ".tmp" and then renamed, so an index 
+        that is being read is never half written.
+    Returns a dict of how many deals were found to be "winnable", 
+        "unwinnable" and "unknown"
+    """
+    if processes is None:
+        processes = os.cpu_count() or 1
+    solve = functools.partial(solve_deal, max_nodes=max_nodes,
+                              draw_count=draw_count)
+    seeds = range(first_seed, first_seed + count)
+    statuses = bytearray((count + 3) // 4)
+    solution_lengths = bytearray(2 * count if lengths else 0)
+    counts = {name: 0 for name in DEAL_STATUS_NAMES.values()}
+    unknown = []  # indexes of the deals that weren't decided
+
+    pool = multiprocessing.Pool(processes) if processes > 1 else None
+    try:
+        if pool is None:
+            results = map(solve, seeds)
+        else:
+            results = pool.imap(solve, seeds)
+        for i, (status, length) in enumerate(results):
+            statuses[i // 4] |= status << (2 * (i % 4))
+            if lengths:
+                struct.pack_into("<H", solution_lengths, 2 * i, length)
+            counts[DEAL_STATUS_NAMES[status]] += 1
+            if status == DEAL_UNKNOWN:
+                unknown.append(i)
+    finally:
+        if pool is not None:
+            pool.terminate()
+
+    if retry_nodes is not None:
+        for i in unknown:
+            result = parallel_solve_game(
+                deal_new_hand(first_seed + i, draw_count), retry_nodes,
+                processes=processes)
+            if result.winnable is None:
+                continue
+            status = DEAL_WINNABLE if result.winnable else DEAL_UNWINNABLE
+            statuses[i // 4] |= status << (2 * (i % 4))  # unknown is 0
+            if lengths and result.winnable:
+                struct.pack_into("<H", solution_lengths, 2 * i,
+                                 min(len(result.moves), MAX_SOLUTION_LENGTH))
+            counts["unknown"] -= 1
+            counts[DEAL_STATUS_NAMES[status]] += 1
+
+    with open(path + ".tmp", "wb") as index_file:
+        index_file.write(SOLVE_INDEX_MAGIC)
+        index_file.write(SOLVE_INDEX_HEADER.pack(first_seed, count,
+                                                 draw_count, lengths))
+        index_file.write(statuses)
+        index_file.write(solution_lengths)
+    os.replace(path + ".tmp", path)
+    return counts
+
+
+class SolveIndex(object):
+    """
+    A solvability index file written by build_solve_index. The file is 
+        memory-mapped, so looking up a deal only reads the bytes it needs 
+        and the file is never read into memory as a whole.
+    The file is SOLVE_INDEX_MAGIC, then SOLVE_INDEX_HEADER, then 2 bits 
+        for each deal (4 deals a byte, the first in the lowest bits), 
+        then if lengths are stored, a 2 byte little-endian solution 
+        length for each deal.
+    Can be used in a with statement, which closes the file at the end.
+
+    Attributes:
+        first_seed - the first deal number in the index
+        count - how many deals are in the index
+        draw_count - how many spare cards were turned over at a time
+        has_lengths - True if solution lengths are stored
+
+    Methods:
+        status - returns DEAL_WINNABLE, DEAL_UNWINNABLE or DEAL_UNKNOWN 
+            for a deal number (DEAL_UNKNOWN if it isn't in the index)
+        solution_length - returns the number of moves in the solution 
+            found for a deal, or None if there isn't one stored
+        winnable_deal - returns a random deal number that can be won, or 
+            None if the index doesn't have one
+        close - closes the file
+    """
+
+    def __init__(self, path):
+        self.index_file = open(path, "rb")
+        self.map = None
+        try:
+            header_end = len(SOLVE_INDEX_MAGIC) + SOLVE_INDEX_HEADER.size
+            if os.fstat(self.index_file.fileno()).st_size < header_end:
+                raise ValueError(f"{path} is not a solvability index")
+            self.map = mmap.mmap(self.index_file.fileno(), 0,
+                                 access=mmap.ACCESS_READ)
+            if self.map[:len(SOLVE_INDEX_MAGIC)] != SOLVE_INDEX_MAGIC:
+                raise ValueError(f"{path} is not a solvability index")
+            (self.first_seed, self.count, self.draw_count,
+             has_lengths) = SOLVE_INDEX_HEADER.unpack_from(
+                self.map, len(SOLVE_INDEX_MAGIC))
+            self.has_lengths = bool(has_lengths)
+            self.statuses_start = header_end
+            self.lengths_start = header_end + (self.count + 3) // 4
+            if len(self.map) < self.lengths_start + 2 * self.count * has_lengths:
+                raise ValueError(f"{path} is shorter than its header says")
+        except BaseException:
+            self.close()
+            raise
+
+    def status(self, seed):
+        i = seed - self.first_seed
+        if not 0 <= i < self.count:
+            return DEAL_UNKNOWN
+        return (self.map[self.statuses_start + i // 4] >> (2 * (i % 4))) & 3
+
+    def solution_length(self, seed):
+        if not self.has_lengths or self.status(seed) != DEAL_WINNABLE:
+            return None
+        position = self.lengths_start + 2 * (seed - self.first_seed)
+        return self.map[position] | self.map[position + 1] << 8
+
+    def winnable_deal(self, rng=None):
+        # deal numbers picked at random are tried first, so usually only a 
+        #   few bytes are read. If none of those can be won, the index is 
+        #   searched on from a random place.
+        if self.count == 0:
+            return None
+        if rng is None:
+            rng = _deal_number_random
+        for attempt in range(0, 64):
+            seed = self.first_seed + rng.randrange(self.count)
+            if self.status(seed) == DEAL_WINNABLE:
+                return seed
+        start = rng.randrange(self.count)
+        for x in range(0, self.count):
+            seed = self.first_seed + (start + x) % self.count
+            if self.status(seed) == DEAL_WINNABLE:
+                return seed
+        return None
+
+    def close(self):
+        if self.map is not None:
+            self.map.close()
+        self.index_file.close()
+
+    def __len__(self):
+        return self.count
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+# what is on each line of the board: a location_list index, or None for 
+# a blank line. The first line is the row of dashes.
+BOARD_ROWS = ["-", None, 0, 1, 2, 3, 4, 5, 6, None, 7, 8, 9, 10, None,
+              11, 12, 13, None]
+
+
+def pile_line(pile_location_list, i):
+    """
+    Returns the line of the board showing location i of the location_list
+    """
+    location = pile_location_list[i]
+    if 7 <= i <= 10:
+        card_list = location.card_list
+        if len(card_list) > 1:
+            return f"{card_list[0].suit} home - {card_list[-1].get_suit_and_value()}"
+        return f"{card_list[0].suit} home - ...Empty"
+    if i == 11:
+        return f"Spares pile: {len(location.card_list)} cards"
+    if i == 12:
+        return f"Spares discard pile: {len(location.card_list)} cards"
+    return location.display_text()
+
+
+def board_lines(board_location_list):
+    """
+    Returns the lines of the board, one per entry of BOARD_ROWS
+    """
+    lines = []
+    for row in BOARD_ROWS:
+        if row is None:
+            lines.append("")
+        elif row == "-":
+            lines.append("- " * 50)
+        else:
+            lines.append(pile_line(board_location_list, row))
+    return lines
+
+
+def board_frame(board_location_list):
+    """
+    Returns the whole board as one string, ready to be written out
+    """
+    return "\n" + "\n".join(board_lines(board_location_list)) + "\n\n"
+
+
+def update_display(update_location_list):
+    """
+    provides the latest visual representation of the location_list
+    input: location_list
+    
+    writes the whole board in one go (play_game uses a BoardRenderer, 
+        which only redraws what has changed)
+    
+    output: None
+    """
+    sys.stdout.write(board_frame(update_location_list))
+    sys.stdout.flush()
+
+
+def screen_rows(line, width):
+    """
+    Returns how many rows of a terminal width characters wide line takes 
+        up once it has wrapped
+    """
+    return max(1, -(-len(line) // width))
+
+
+class BoardRenderer(MoveHook):
+    """
+    Draws the board for play_game, redrawing only the lines of the piles 
+        that a move changed.
+    It is a MoveHook, so once it is registered with add_move_hook and 
+        told which location_list to follow, every move made or undone on 
+        it marks the piles it changed, whoever makes it.
+    Each frame is built as one string and written with a single write. 
+        On a terminal, changed lines are overwritten in place using ANSI 
+        cursor movement, and everything below the board (the prompt and 
+        messages) is cleared. Otherwise, the whole board is written each 
+        time, as update_display does.
+    Lines wider than the terminal wrap onto more than one row, so the 
+        row each line starts on is worked out from the rows the lines 
+        above it take up. If a line needs a different number of rows, or 
+        the terminal changes width, the whole board is drawn again. So 
+        is it if the board and prompt_rows don't fit on the terminal, as 
+        the prompt would scroll the board to different rows.
+
+    Attributes:
+        output - the file the board is written to
+        ansi - True to redraw in place, False to write whole boards
+        prompt_rows - the rows the prompt and messages below the board 
+            can take, including the row the cursor is left on
+        location_list - the location_list whose moves are followed, or 
+            None. Moves on any other location_list, such as the copies 
+            suggest_move plays on, are ignored.
+        lines - the lines on screen now, one per entry of BOARD_ROWS, or 
+            None before the first frame
+        width - the width of the terminal when lines were drawn
+        dirty - set of location_list indexes whose lines need making 
+            again
+
+    Methods:
+        follow - marks the whole board, and follows the moves made on a 
+            location_list from now on, i.e. for a new game
+        after_move / after_undo - mark the piles a move changed
+        mark_moved - marks the piles a MoveResult says were changed
+        mark_all - marks the whole board
+        render - writes a frame. Returns the number of lines redrawn
+    """
+
+    def __init__(self, output=None, ansi=None, prompt_rows=7):
+        self.output = sys.stdout if output is None else output
+        if ansi is None:
+            ansi = self.output.isatty()
+        self.ansi = ansi
+        self.prompt_rows = prompt_rows
+        self.location_list = None
+        self.lines = None
+        self.width = None
+        self.dirty = set(range(0, 14))
+
+    def follow(self, follow_location_list):
+        self.location_list = follow_location_list
+        self.mark_all()
+
+    def after_move(self, hook_location_list, uppercase_move, result, seconds):
+        if hook_location_list is self.location_list:
+            self.mark_moved(result)
+
+    def after_undo(self, hook_location_list, result):
+        if hook_location_list is self.location_list:
+            self.mark_moved(result)
+
+    def mark_moved(self, result):
+        if result is None or not result.applied:
+            return None
+        if result.move == "S":
+            self.dirty.update((11, 12, 13))  # recycling changes all three
+        else:
+            self.dirty.add(result.source)
+            self.dirty.add(result.destination)
+
+    def mark_all(self):
+        self.lines = None
+        self.dirty = set(range(0, 14))
+
+    def render(self, render_location_list):
+        width = None
+        if self.ansi:
+            terminal_size = shutil.get_terminal_size()
+            width = terminal_size.columns
+        if width != self.width:
+            self.lines = None  # every wrapped line has moved
+            self.width = width
+        if self.ansi and self.lines is not None and (
+                sum(screen_rows(line, width) for line in self.lines)
+                + self.prompt_rows > terminal_size.lines):
+            self.lines = None  # the prompt scrolls the board up the screen
+
+        if self.lines is None:
+            self.lines = board_lines(render_location_list)
+            self.dirty = set()
+            if self.ansi:
+                frame = "\x1b[H\x1b[2J" + "\n".join(self.lines) + "\n"
+            else:
+                frame = board_frame(render_location_list)
+            self.output.write(frame)
+            self.output.flush()
+            return len(self.lines)
+
+        changed = []
+        for row, i in enumerate(BOARD_ROWS):
+            if i in self.dirty:
+                line = pile_line(render_location_list, i)
+                if line != self.lines[row]:
+                    if self.ansi and (screen_rows(line, width)
+                                      != screen_rows(self.lines[row], width)):
+                        # the lines below it would move up or down
+                        self.mark_all()
+                        return self.render(render_location_list)
+                    self.lines[row] = line
+                    changed.append(row)
+        self.dirty = set()
+
+        if self.ansi:
+            # screen rows count from 1; then clear everything below the board
+            first_rows = []
+            next_row = 1
+            for line in self.lines:
+                first_rows.append(next_row)
+                next_row += screen_rows(line, width)
+            frame = "".join(
+                f"\x1b[{first_rows[row]};1H{self.lines[row]}\x1b[K"
+                for row in changed)
+            frame += f"\x1b[{next_row};1H\x1b[J"
+        else:
+            frame = "\n" + "\n".join(self.lines) + "\n\n"
+        self.output.write(frame)
+        self.output.flush()
+        return len(changed)
+
+
+def play_game(draw_count=3, auto_home=True, solve_index=None, seed=None):
+    """
+    Run this function to begin a game.
+    draw_count - how many spare cards "S" turns over at a time (1 or 3)
+    auto_home - if True, cards that are safe to put on their home piles 
+        (see safe_home_move) go there by themselves after each move
+    solve_index - a SolveIndex, to only deal games that can be won
+    seed - the deal number of the first game. "NEW" deals a random one.
+    "NEW" deals a new game and "RESTART" starts the current deal again, 
+        both in the same loop, so a session can go on for any number of 
+        games. The deal is kept as a packed CompactState, so restarting 
+        doesn't need to shuffle and deal again.
+    Move hooks are told when each game starts and when it is won or 
+        left for a new deal or a restart.
+    """
+    hint_pool = None  # worker processes for hints
+    start_position = None  # the current deal, from CompactState.pack
+    renderer = BoardRenderer()
+
+    try:
+        # started before the first game, so the workers are ready by the 
+        #   first "H" rather than starting up inside its time budget
+        if (os.cpu_count() or 1) > 1:
+            hint_pool = multiprocessing.Pool()
+        add_move_hook(renderer)  # after the pool starts, so its workers don't have it
+        while True:
+            if start_position is None:
+                start_position = CompactState.from_location_list(
+                    deal_new_hand(seed, draw_count=draw_count,
+                                  solve_index=solve_index)).pack()
+                seed = None
+            game_location_list = CompactState.unpack(
+                start_position).to_location_list()
+            game = Game(game_location_list, auto_home)
+            renderer.follow(game_location_list)
+            start_game_hooks(game_location_list)
+
+            while not have_won(game_location_list):
+                renderer.render(game_location_list)
+                uppercase_move = decide_move(game_location_list, renderer)
+                if uppercase_move == "NEW":
+                    print("\nGiving up?")
+                    input("Hit enter to re-shuffle the deck and start again.")
+                    end_game_hooks(game_location_list)
+                    start_position = None
+                    break
+                if uppercase_move == "RESTART":
+                    print("\nStarting this deal again from the beginning.")
+                    end_game_hooks(game_location_list)
+                    break
+                if uppercase_move == "U":
+                    result = game.undo()
+                    if result is None:
+                        print("There is nothing to undo")
+                        input("Hit Enter to continue...")
+                    continue
+                if uppercase_move == "R":
+                    result = game.redo()
+                    if result is None:
+                        print("There is nothing to redo")
+                        input("Hit Enter to continue...")
+                    continue
+                if uppercase_move == "A":
+                    if game.autocomplete() is None:
+                        print("Every card in the columns needs to be face up"
+                              ", with no spare cards left, to finish the "
+                              "game")
+                        input("Hit Enter to continue...")
+                    continue
+                if uppercase_move == "H":
+                    hint = suggest_move(game_location_list, pool=hint_pool)
+                    if hint is None:
+                        print("There are no moves left - type \"New\" to "
+                              "start again")
+                    elif hint.win_rate is None:
+                        print(f"Try \"{hint.move}\"")
+                    else:
+                        print(f"Try \"{hint.move}\" - it won "
+                              f"{hint.win_rate:.0%} of "
+                              f"{hint.scores[hint.move][1]} games played on "
+                              "from here")
+                    input("Hit Enter to continue...")
+                    continue
+                result = game.move(uppercase_move)
+                if not result.applied:
+                    print(result.reason)
+                    input("Hit Enter to continue...")
+            else:  # the game was won, rather than given up or restarted
+                end_game_hooks(game_location_list)
+                print("\n" + "- " * 50 + "\nCongratulations, you have won!")
+                return None
+    finally:
+        remove_move_hook(renderer)
+        if hint_pool is not None:
+            hint_pool.terminate()
+
+
+def play_script(move_lines, seed=None, draw_count=3, solve_index=None):
+    """
+    Plays a game with no prompts, taking its moves from move_lines (any 
+        iterable of strings, such as an open file or sys.stdin, which is 
+        read as the game goes).
+    Each line may hold several moves separated by spaces. Blank lines 
+        and anything after a "#" are ignored. As well as the moves in 
+        VALID_MOVES, "U" and "R" undo and redo, and "A" finishes the 
+        game with Game.autocomplete.
+    Moves that can't be made are skipped and recorded as errors.
+    Move hooks are told when the game starts and when the moves run out.
+    solve_index - a SolveIndex. If it is given and seed isn't, the deal 
+        is one the index says can be won (see winnable_deal_number)
+    Returns a tuple: (deal number, the Game, list of (line number, 
+        move, reason) for each move that couldn't be made)
+    """
+    if seed is None and solve_index is not None:
+        seed = winnable_deal_number(solve_index, draw_count)
+    elif seed is None:
+        seed = new_deal_number()
+    game = Game(deal_new_hand(seed, draw_count))
+    start_game_hooks(game.location_list)
+    errors = []
+    for line_number, line in enumerate(move_lines, 1):
+        for move in line.split("#")[0].split():
+            uppercase_move = move.upper()
+            if uppercase_move == "U":
+                if game.undo() is None:
+                    errors.append((line_number, move, "There is nothing to undo"))
+            elif uppercase_move == "R":
+                if game.redo() is None:
+                    errors.append((line_number, move, "There is nothing to redo"))
+            elif uppercase_move == "A":
+                if game.autocomplete() is None:
+                    errors.append((line_number, move, NOT_ALLOWED))
+            else:
+                result = game.move(uppercase_move)
+                if not result.applied:
+                    errors.append((line_number, move, result.reason))
+    end_game_hooks(game.location_list)
+    return seed, game, errors
+
+
+def script_summary(seed, game, errors):
+    """
+    Returns a dict describing the end of a game from play_script, ready 
+        to be written out as JSON
+    """
+    script_location_list = game.location_list
+    return {
+        "seed": seed,
+        "draw_count": script_location_list[11].draw_count,
+        "moves": game.get_moves(),
+        "won": have_won(script_location_list),
+        "homes": {script_location_list[i].card_list[0].suit:
+                  len(script_location_list[i].card_list) - 1
+                  for i in range(7, 11)},
+        "state": CompactState.from_location_list(script_location_list).pack().hex(),
+        "errors": [{"line": line_number, "move": move, "reason": reason}
+                   for line_number, move, reason in errors],
+    }
+
+
+def main(argv=None):
+    """
+    The command line: with no moves file, starts play_game. Given one 
+        (or "-" for stdin), plays the moves in it with play_script and 
+        prints the final position, or a JSON summary with --json.
+    Returns the exit code: 1 if any scripted move couldn't be made
+    """
+    parser = argparse.ArgumentParser(description="Play Solitaire.")
+    parser.add_argument("moves", nargs="?",
+                        help="file of moves to play without prompts "
+                             "(\"-\" for stdin)")
+    parser.add_argument("--seed", type=int, help="deal number to play")
+    parser.add_argument("--draw-count", type=int, default=3, choices=(1, 3),
+                        help="spare cards turned over at a time")
+    parser.add_argument("--json", action="store_true",
+                        help="print a JSON summary instead of the cards")
+    parser.add_argument("--winnable", metavar="INDEX",
+                        help="only deal games that this solvability index "
+                             "(see Solvability_Solitaire_1_5.py) says can "
+                             "be won")
+    args = parser.parse_args(argv)
+
+    if args.moves is None:
+        if args.winnable:
+            with SolveIndex(args.winnable) as solve_index:
+                play_game(args.draw_count, solve_index=solve_index,
+                          seed=args.seed)
+        else:
+            play_game(args.draw_count, seed=args.seed)
+        return 0
+
+    with contextlib.ExitStack() as stack:
+        solve_index = None
+        if args.winnable:
+            solve_index = stack.enter_context(SolveIndex(args.winnable))
+        if args.moves == "-":
+            move_lines = sys.stdin
+        else:
+            move_lines = stack.enter_context(open(args.moves))
+        seed, game, errors = play_script(move_lines, args.seed,
+                                         args.draw_count, solve_index)
+
+    if args.json:
+        print(json.dumps(script_summary(seed, game, errors)))
+    else:
+        update_display(game.location_list)
+        for line_number, move, reason in errors:
+            print(f"line {line_number}: {move}: {reason}")
+        print(f"Deal {seed}: {len(game.journal)} moves, "
+              f"{'won' if have_won(game.location_list) else 'not won'}")
+    return 1 if errors else 0
 
 
 '''
@@ -740,5 +3767,4 @@ The below code initiates a game:
 '''
 
 if __name__ == '__main__':
-    location_list = set_up_locations()
-    play_game()
+    sys.exit(main())
@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Welcome to the Solitaire Solvability Indexer.
+
+Solves a range of deal numbers ahead of time and writes which of them can
+    be won to a solvability index file (see build_solve_index and
+    SolveIndex). The game can then deal only winnable games straight
+    away, without solving anything while the player waits:
+    python Solitaire_1_5.py --winnable deals.idx
+
+Each deal takes 2 bits, plus 2 bytes for its solution length unless
+    --no-lengths is given. Deals the solver can't decide within
+    --max-nodes positions are stored as unknown. With --retry-nodes, those
+    deals are then solved again one at a time, each shared out between all
+    the worker processes (see parallel_solve_game).
+
+Usage:
+    python Solvability_Solitaire_1_5.py deals.idx --first 0 --count 100000
+
+"""
+
+import argparse
+import sys
+import time
+
+from Solitaire_1_5 import *  # import all from module
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Write a Solitaire solvability index.")
+    parser.add_argument("path", help="index file to write")
+    parser.add_argument("--first", type=int, default=0,
+                        help="first deal number to solve (default 0)")
+    parser.add_argument("--count", type=int, required=True,
+                        help="how many deal numbers to solve")
+    parser.add_argument("--max-nodes", type=int, default=200000,
+                        help="positions to try before a deal is unknown")
+    parser.add_argument("--processes", type=int, default=None,
+                        help="worker processes to use (default all CPU cores)")
+    parser.add_argument("--draw-count", type=int, default=3,
+                        help="spare cards turned over at a time (1 or 3)")
+    parser.add_argument("--no-lengths", action="store_true",
+                        help="don't store the solution lengths")
+    parser.add_argument("--retry-nodes", type=int, default=None,
+                        help="solve unknown deals again in parallel, with "
+                             "this many positions each")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    counts = build_solve_index(args.path, args.first, args.count,
+                               args.max_nodes, args.processes,
+                               args.draw_count, not args.no_lengths,
+                               args.retry_nodes)
+    print(f"{args.path}: {args.count} deals, {counts['winnable']} winnable, "
+          f"{counts['unwinnable']} unwinnable, {counts['unknown']} unknown, "
+          f"{time.perf_counter() - start:.1f} seconds")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -11,7 +11,19 @@ Welcome to the Solitaire Test Module.
 
 """
 
+import asyncio
+import copy
+import importlib.util
+import io
+import json
+import multiprocessing
+import os
+import pickle
+import random
+import sys
+import tempfile
 import unittest
+from unittest import mock
 from Solitaire_1_5 import *  # import all from module
 
 
@@ -23,10 +35,6 @@ class TestSolitaireClass(unittest.TestCase):
     
         self.deck = create_deck()
         
-        self.deck_2 = create_deck()  # deck 2 is all face-up
-        for card in self.deck_2:
-            card.set_side('face-up')
-        
         self.shuffled_deck_1 = shuffle_deck()
         self.shuffled_deck_2 = shuffle_deck()
     
@@ -50,10 +58,11 @@ class TestSolitaireClass(unittest.TestCase):
         self.assertEqual(self.deck[0].get_suit(), "Hearts")
         self.assertEqual(self.deck[39].get_suit(), "Diamonds")
 
-    def test_card_get_set_side(self):
-        self.assertEqual(self.deck[0].get_side(), "face-down")
-        self.deck[0].set_side("face_up")
-        self.assertEqual(self.deck[0].get_side(), "face_up")
+    def test_card_set_side(self):
+        # cards are shared, so their location keeps whether they're face-up
+        with self.assertWarns(DeprecationWarning):
+            self.deck[0].set_side("face-up")
+        self.assertFalse(hasattr(self.deck[0], "side"))
 
     def test_card_get_suit_and_value(self):
         self.assertEqual(self.deck[31].get_suit_and_value(), "6 of Clubs")
@@ -62,6 +71,22 @@ class TestSolitaireClass(unittest.TestCase):
         self.assertEqual(self.deck[50].get_suit_and_value(), "Queen of Diamonds")
         self.assertEqual(self.deck[49].get_suit_and_value(), "Jack of Diamonds")
 
+    def test_card_from_id(self):
+        for card_id, card in enumerate(self.deck):
+            self.assertEqual(card.card_id, card_id)
+            made = Card(card.suit, card.value)
+            self.assertEqual((made.colour, made.label, made.card_id),
+                             (card.colour, card.label, card.card_id))
+        card = Card.from_id(50)
+        self.assertIs(card, CARD_FACES[50])
+        self.assertEqual(str(card), "Queen of Diamonds")
+        self.assertEqual(card_to_code(card, face_up=True), 50 | FACE_UP)
+        with self.assertRaises(AttributeError):
+            card.nickname = "Q"  # __slots__, so no extra attributes
+        with self.assertRaises(AttributeError):
+            card.value = 1  # shared, so can't be changed
+        self.assertRaises(ValueError, Card, "Stars", 1)
+
     '''
     Create_deck function test cases
     '''
@@ -75,6 +100,15 @@ class TestSolitaireClass(unittest.TestCase):
                 no_dups_list.append(card)
         self.assertEqual(len(no_dups_list), 52)
 
+    def test_deck_shared_cards(self):
+        # every deck is made of the same 52 cards, so dealing makes none
+        self.assertEqual(list(map(id, self.deck)), list(map(id, create_deck())))
+        self.assertEqual(set(map(id, self.deck)), set(map(id, self.shuffled_deck_1)))
+        # copying or pickling a card, the zero cards too, gives the shared one
+        for card in (self.deck[5], ZERO_CARDS["Clubs"]):
+            self.assertIs(copy.deepcopy(card), card)
+            self.assertIs(pickle.loads(pickle.dumps(card)), card)
+
     '''
     shuffle_deck function test cases
     '''
@@ -89,6 +123,21 @@ class TestSolitaireClass(unittest.TestCase):
     def test_shuffle_deck_diff(self):
         self.assertNotEqual(self.shuffled_deck_1, self.shuffled_deck_2)
 
+    # test that a deal number always gives the same order
+    def test_shuffle_deck_seed(self):
+        deck_1 = [card.get_suit_and_value() for card in shuffle_deck(seed=1)]
+        deck_2 = [card.get_suit_and_value() for card in shuffle_deck(seed=1)]
+        deck_3 = [card.get_suit_and_value() for card in shuffle_deck(seed=2)]
+        self.assertEqual(deck_1, deck_2)
+        self.assertNotEqual(deck_1, deck_3)
+        self.assertEqual(len(set(deck_1)), 52)  # no duplicates
+
+    def test_deal_order(self):
+        self.assertEqual(sorted(deal_order(MAX_DEAL_NUMBER)), list(range(0, 52)))
+        self.assertEqual(deal_order(11982), deal_order(11982))
+        self.assertRaises(ValueError, deal_order, -1)
+        self.assertRaises(ValueError, deal_order, MAX_DEAL_NUMBER + 1)
+
     '''
     location class test cases
     '''
@@ -182,33 +231,37 @@ class TestSolitaireClass(unittest.TestCase):
     def test_reveal_card(self):
         column_1 = Column("test", self.deck)
         
-        self.assertEqual(column_1.card_list[-1].get_side(), "face-down")  # face-down as default
+        self.assertFalse(column_1.is_face_up(-1))  # face-down as default
         column_1.reveal_card()
-        self.assertEqual(column_1.card_list[-1].get_side(), "face-up")  # face-up when revealed default
-        self.assertEqual(column_1.card_list[0].get_side(), "face-down")  # 1st card in list not affected
+        self.assertTrue(column_1.is_face_up(-1))  # face-up when revealed default
+        self.assertFalse(column_1.is_face_up(0))  # 1st card in list not affected
+        self.assertEqual(column_1.face_up_start, 51)
 
     def test_move_cards(self):
         test_card_list_1 = [
             self.deck[4], 
             self.deck[6], 
-            self.deck_2[16], 
-            self.deck_2[41], 
-            self.deck_2[27],
+            self.deck[16], 
+            self.deck[41], 
+            self.deck[27],
         ]  # Cards: 5HeartsFace-down, 7HeartsFaceDown, 4SpadesFace-Up, 3DiamondsFace-up, 2ClubsFace-Up
-        test_card_list_2 = [self.deck[7], self.deck_2[4]]  # Ends with 5HeartsFace-Up
-        test_card_list_3 = [self.deck[7], self.deck_2[12]]  # Ends with KingHeartsFace-up
+        test_card_list_2 = [self.deck[7], self.deck[4]]  # Ends with 5HeartsFace-Up
+        test_card_list_3 = [self.deck[7], self.deck[12]]  # Ends with KingHeartsFace-up
 
-        column_1 = Column("test", test_card_list_1)
-        column_2 = Column("test", test_card_list_2)
+        column_1 = Column("test", test_card_list_1, face_up_start=2)
+        column_2 = Column("test", test_card_list_2, face_up_start=1)
         column_3 = Column("test", [])
-        column_4 = Column("test", test_card_list_3)
+        column_4 = Column("test", test_card_list_3, face_up_start=1)
 
         column_1.move_cards(self.location_list, column_2)  # valid move
         self.assertEqual(len(column_1.card_list), 2)  # after move, 2 cards in column_1
         self.assertEqual(len(column_2.card_list), 5)  # after move, 5 cards in column_2
+        self.assertEqual(column_1.face_up_start, 1)  # 7 of Hearts turned over
+        self.assertEqual(column_2.face_up_start, 1)
                 
         column_4.move_cards(self.location_list, column_3)  # valid move - King to blank
         self.assertEqual(len(column_4.card_list), 1)
+        self.assertTrue(column_3.is_face_up(0))
 
     '''
     home subclass test cases
@@ -235,8 +288,8 @@ class TestSolitaireClass(unittest.TestCase):
             self.deck[27],
         ]  # 5 cards
         test_card_list_2 = [self.deck[7], self.deck[4]]  # 2 cards
-        self.location_list[11] = SpareCards("Spare cards", test_card_list_1)
-        self.location_list[13] = SpareCards("Visible pile", [])
+        self.location_list[11] = SpareCards("Spare cards", list(test_card_list_1))
+        self.location_list[13] = SpareCards("Visible pile", [], face_up=True)
         
         x = len(self.location_list[11].card_list)  # x=5
         self.location_list[11].advance(self.location_list)  # advance 3 cards from [11] to [13]
@@ -244,7 +297,7 @@ class TestSolitaireClass(unittest.TestCase):
         self.assertEqual(len(self.location_list[13].card_list), 3)  # new length of [13] == 3
 
         self.location_list[11] = SpareCards("Spare cards", test_card_list_2)
-        self.location_list[13] = SpareCards("Visible pile", [])
+        self.location_list[13] = SpareCards("Visible pile", [], face_up=True)
 
         self.location_list[11].advance(self.location_list)  # try to advance 3 cards from [11] to [13]
         # (only 2 available)
@@ -253,7 +306,7 @@ class TestSolitaireClass(unittest.TestCase):
 
         self.location_list[11] = SpareCards("Spare cards", [])
         self.location_list[12] = SpareCards("Discard pile", test_card_list_1)  # 5 cards
-        self.location_list[13] = SpareCards("Visible pile", [])
+        self.location_list[13] = SpareCards("Visible pile", [], face_up=True)
 
         self.location_list[11].advance(self.location_list)  # try to advance 3 cards from [11] to [13] None available
         self.assertEqual(len(self.location_list[11].card_list), 2)  # moves 5 cards from discard to spare
@@ -261,12 +314,36 @@ class TestSolitaireClass(unittest.TestCase):
         self.assertEqual(len(self.location_list[13].card_list), 3)  # new length of [13] == 3
         self.assertEqual(len(self.location_list[12].card_list), 0)  # new length of [12] == 0
 
+    def test_advance_draw_count(self):
+        self.location_list = set_up_locations(draw_count=1)
+        self.location_list[11].add_cards(self.deck[0:5])  # deck[0] on top
+
+        self.location_list[11].advance(self.location_list)  # turn over 1 card
+        self.assertEqual(self.location_list[13].card_list[0], self.deck[0])
+        self.assertEqual(len(self.location_list[11].card_list), 4)
+        self.assertEqual(len(self.location_list[13].card_list), 1)
+        self.assertTrue(self.location_list[13].is_face_up(0))
+
+        for i in range(0, 4):
+            self.location_list[11].advance(self.location_list)
+        self.assertEqual(len(self.location_list[11].card_list), 0)
+        self.assertEqual(len(self.location_list[12].card_list), 4)  # turned back face-down
+        self.assertFalse(self.location_list[12].is_face_up(0))
+
+        discard = self.location_list[12].card_list
+        self.location_list[11].advance(self.location_list)  # recycle, then turn over 1
+        self.assertIs(self.location_list[11].card_list, discard)  # not copied or turned over
+        self.assertEqual(len(self.location_list[11].card_list), 4)
+        self.assertEqual(self.location_list[13].card_list[0], self.deck[0])
+
+        self.assertRaises(ValueError, SpareCards, "Spare cards", [], 0)
+
     def test_move_to_column(self):
-        test_card_list_1 = [self.deck[4], self.deck[6], self.deck_2[16]]  # Top card = 4SpadesFace-Up
+        test_card_list_1 = [self.deck[4], self.deck[6], self.deck[16]]  # Top card = 4SpadesFace-Up
 
-        self.location_list[13] = SpareCards("Visible pile", test_card_list_1)
+        self.location_list[13] = SpareCards("Visible pile", test_card_list_1, face_up=True)
         self.location_list[0] = Column(1, [])  # no cards in column
-        self.location_list[1] = Column(2, [self.deck_2[4]])  # for possible move
+        self.location_list[1] = Column(2, [self.deck[4]], face_up_start=0)  # for possible move
         self.location_list[2] = Column(3, [self.deck[17]])  # for impossible move
         
         self.location_list[13].move_to_column(
@@ -275,7 +352,7 @@ class TestSolitaireClass(unittest.TestCase):
         self.assertEqual(self.location_list[1].card_list[-1].get_suit_and_value(), "4 of Spades")
         # 4Spades is now in location_list[1]
         
-        self.location_list[13] = SpareCards("Visible pile", [])  # 0 cards in location_list[13]
+        self.location_list[13] = SpareCards("Visible pile", [], face_up=True)  # 0 cards in location_list[13]
         # self.assertFalse(self.location_list[13].move_to_column(self.location_list, self.location_list[0]))
 
     '''
@@ -284,9 +361,9 @@ class TestSolitaireClass(unittest.TestCase):
     def test_deal_new_hand(self):
         test_location_list = deal_new_hand()
         for test_list in test_location_list[0:7]:
-            self.assertEqual(test_list.card_list[-1].get_side(), "face-up")  # end card is always face-up
+            self.assertTrue(test_list.is_face_up(-1))  # end card is always face-up
         for test_list in test_location_list[1:7]:
-            self.assertEqual(test_list.card_list[-2].get_side(), "face-down")  # penultimate card always face-down
+            self.assertFalse(test_list.is_face_up(-2))  # penultimate card always face-down
 
         for i in range(0, 7):
             self.assertEqual(len(test_location_list[i].card_list), i+1)  # correct number of cards in each column
@@ -296,20 +373,33 @@ class TestSolitaireClass(unittest.TestCase):
         self.assertEqual(len(test_location_list[12].card_list), 0)  # 0 cards in visible pile
         self.assertEqual(len(test_location_list[13].card_list), 0)  # 0 cards in discard pile
 
-        for card in test_location_list[11].card_list:
-            self.assertEqual(card.get_side(), "face-down")  # all cards in spares pile are face-down
+        self.assertEqual(test_location_list[11].face_down_count(), 24)  # all cards in spares pile are face-down
+
+    def test_deal_new_hand_seed(self):
+        location_list_1 = deal_new_hand(seed=42)
+        location_list_2 = deal_new_hand(seed=42)
+        self.assertEqual(
+            CompactState.from_location_list(location_list_1),
+            CompactState.from_location_list(location_list_2))
+
+    def test_generate_deals(self):
+        deals = list(generate_deals(100, 3))
+        self.assertEqual([seed for seed, deal in deals], [100, 101, 102])
+        self.assertEqual(
+            CompactState.from_location_list(deals[1][1]),
+            CompactState.from_location_list(deal_new_hand(seed=101)))
 
     '''
     Have won function test cases
     '''
     def test_have_won(self):
-        test_card_list_1 = self.deck_2[0:13]  # Complete set of Hearts
+        test_card_list_1 = self.deck[0:13]  # Complete set of Hearts
         test_card_list_1.append(Card("Hearts", 0))
-        test_card_list_2 = self.deck_2[13:26]  # Complete set of Spades
+        test_card_list_2 = self.deck[13:26]  # Complete set of Spades
         test_card_list_2.append(Card("Spades", 0))
-        test_card_list_3 = self.deck_2[26:39]  # Complete set of Clubs
+        test_card_list_3 = self.deck[26:39]  # Complete set of Clubs
         test_card_list_3.append(Card("Clubs", 0))
-        test_card_list_4 = self.deck_2[39:]  # Complete set of Diamonds
+        test_card_list_4 = self.deck[39:]  # Complete set of Diamonds
         test_card_list_4.append(Card("Diamonds", 0))
         
         self.location_list[7] = Home("Clubs home pile", test_card_list_1)
@@ -319,13 +409,13 @@ class TestSolitaireClass(unittest.TestCase):
         
         self.assertTrue(have_won(self.location_list))  # Returns True with current number of cards in each home list
 
-        test_card_list_1 = self.deck_2[0:12]  # Complete set of Hearts
+        test_card_list_1 = self.deck[0:12]  # Complete set of Hearts
         test_card_list_1.append(Card("Hearts", 0))
-        test_card_list_2 = self.deck_2[13:25]  # Complete set of Spades
+        test_card_list_2 = self.deck[13:25]  # Complete set of Spades
         test_card_list_2.append(Card("Spades", 0))
-        test_card_list_3 = self.deck_2[26:38]  # Complete set of Clubs
+        test_card_list_3 = self.deck[26:38]  # Complete set of Clubs
         test_card_list_3.append(Card("Clubs", 0))
-        test_card_list_4 = self.deck_2[39:52]  # Complete set of Diamonds
+        test_card_list_4 = self.deck[39:52]  # Complete set of Diamonds
         test_card_list_4.append(Card("Diamonds", 0))
 
         self.location_list[7] = Home("Clubs home pile", test_card_list_1)
@@ -341,6 +431,1132 @@ class TestSolitaireClass(unittest.TestCase):
         self.location_list[10] = Home("Clubs home pile", [])
         
         self.assertFalse(have_won(self.location_list))  # Returns False with 0 cards in each home list
+
+    '''
+    execute_move function test cases
+    '''
+    def test_execute_move_applied(self):
+        self.location_list[0] = Column(1, [self.deck[16]], face_up_start=0)  # 4 of Spades
+        self.location_list[1] = Column(2, [self.deck[7], self.deck[4]], face_up_start=1)  # ends with 5 of Hearts
+
+        result = execute_move(self.location_list, "M12")
+        self.assertTrue(result.applied)
+        self.assertIsNone(result.reason)
+        self.assertEqual(len(self.location_list[0].card_list), 0)
+        self.assertEqual(self.location_list[1].card_list[-1].get_suit_and_value(), "4 of Spades")
+
+    def test_execute_move_illegal_is_silent(self):
+        self.location_list[0] = Column(1, [self.deck[16]], face_up_start=0)  # 4 of Spades
+        self.location_list[1] = Column(2, [self.deck[2]], face_up_start=0)  # 3 of Hearts
+
+        with mock.patch("builtins.input") as fake_input, mock.patch("builtins.print") as fake_print:
+            result = execute_move(self.location_list, "M12")  # 4 onto 3
+            self.assertFalse(result.applied)
+            self.assertEqual(result.reason, NOT_ALLOWED)
+
+            result = execute_move(self.location_list, "S2")  # no spare cards yet
+            self.assertFalse(result)
+            self.assertEqual(result.reason, NO_SPARE_CARDS)
+
+            result = execute_move(self.location_list, "1")  # 4 of Spades can't go home
+            self.assertFalse(result)
+
+            result = execute_move(self.location_list, "M99")
+            self.assertEqual(result.reason, NOT_UNDERSTOOD)
+
+        fake_input.assert_not_called()
+        fake_print.assert_not_called()
+        self.assertEqual(len(self.location_list[0].card_list), 1)  # nothing moved
+        self.assertEqual(len(self.location_list[1].card_list), 1)
+
+    def test_execute_move_home_reveals_card(self):
+        self.location_list[2] = Column(3, [self.deck[5], self.deck[0]], face_up_start=1)  # ends with Ace of Hearts
+
+        self.assertTrue(execute_move(self.location_list, "3"))
+        self.assertEqual(len(self.location_list[9].card_list), 2)  # Ace now on Hearts home pile
+        self.assertTrue(self.location_list[2].is_face_up(-1))  # 6 of Hearts revealed
+
+    '''
+    find_legal_moves function test cases
+    '''
+    def test_find_legal_moves(self):
+        self.location_list[0] = Column(1, [self.deck[16]], face_up_start=0)  # 4 of Spades
+        self.location_list[1] = Column(2, [self.deck[7], self.deck[4]], face_up_start=1)  # ends with 5 of Hearts
+        self.location_list[2] = Column(3, [self.deck[5], self.deck[0]], face_up_start=1)  # ends with Ace of Hearts
+        self.location_list[3] = Column(4, [self.deck[25]], face_up_start=0)  # King of Spades
+        self.location_list[13] = SpareCards("Visible pile", [self.deck[12]], face_up=True)  # King of Hearts
+
+        legal_move_list = find_legal_moves(self.location_list)
+        self.assertEqual(
+            sorted(legal_move_list),
+            sorted(["3", "M12", "M45", "M46", "M47", "S5", "S6", "S7"]))
+        self.assertEqual(len(self.location_list[0].card_list), 1)  # nothing moved
+
+    def test_find_legal_moves_matches_execute_move(self):
+        import copy
+        import random
+        rng = random.Random(7)
+        for game in range(0, 2):
+            test_location_list = deal_new_hand()
+            for turn in range(0, 25):
+                legal_move_list = find_legal_moves(test_location_list)
+                for move in sorted(VALID_MOVES):
+                    trial_location_list = copy.deepcopy(test_location_list)
+                    result = execute_move(trial_location_list, move)
+                    if move == "S":  # advancing an empty spares pile is harmless
+                        continue
+                    self.assertEqual(result.applied, move in legal_move_list, move)
+                if len(legal_move_list) == 0:
+                    break
+                execute_move(test_location_list, rng.choice(legal_move_list))
+
+    '''
+    CompactState class test cases
+    '''
+    def test_card_codes(self):
+        self.assertEqual(card_to_code(self.deck[0]), 0)  # Ace of Hearts, face-down
+        self.assertEqual(card_to_code(self.deck[51], True), 51 | FACE_UP)  # King of Diamonds, face-up
+        for card in self.deck:
+            self.assertIs(code_to_card(card_to_code(card)), card)
+            self.assertIs(code_to_card(card_to_code(card, True)), card)
+
+    def test_compact_state_round_trip(self):
+        test_location_list = deal_new_hand()
+        execute_move(test_location_list, "S")
+        state = CompactState.from_location_list(test_location_list)
+
+        new_location_list = state.to_location_list()
+        for x in range(0, 14):
+            self.assertEqual(
+                [str(card) for card in new_location_list[x].card_list],
+                [str(card) for card in test_location_list[x].card_list])
+        self.assertEqual(CompactState.from_location_list(new_location_list), state)
+
+    def test_compact_state_pack(self):
+        state = CompactState.from_location_list(deal_new_hand())
+        packed = state.pack()
+        self.assertEqual(len(packed), 67)  # 52 cards + 4 home counts + 8 pile lengths + 2 cursors + draw count
+        self.assertEqual(CompactState.unpack(packed), state)
+
+        self.assertEqual(
+            CompactState.unpack(CompactState.from_location_list(deal_new_hand(draw_count=1)).pack()).draw_count, 1)
+
+        copied_state = state.copy()
+        copied_state.columns[0].pop()
+        self.assertNotEqual(copied_state, state)  # copy doesn't share piles
+
+    '''
+    Game class (undo / redo) test cases
+    '''
+    def test_game_undo_redo(self):
+        import random
+        rng = random.Random(11)
+        game = Game(deal_new_hand(seed=11))
+        states = [CompactState.from_location_list(game.location_list).pack()]
+        for turn in range(0, 300):  # enough to recycle the spares pile several times
+            game.move(rng.choice(find_legal_moves(game.location_list)))
+            states.append(CompactState.from_location_list(game.location_list).pack())
+        self.assertTrue(any(result.recycled for result in game.journal))
+        self.assertTrue(any(result.revealed for result in game.journal))
+
+        while states:  # undo every move, checking each position on the way back
+            self.assertEqual(CompactState.from_location_list(game.location_list).pack(), states.pop())
+            if game.journal:
+                game.undo()
+        self.assertIsNone(game.undo())  # nothing left to undo
+
+        moves = [result.move for result in reversed(game.undone)]
+        while game.redo() is not None:
+            pass
+        self.assertEqual(game.get_moves(), moves)
+        self.assertEqual(len(game.undone), 0)
+
+    def test_game_move_clears_redo(self):
+        game = Game(deal_new_hand(seed=5))
+        game.move("S")
+        game.undo()
+        self.assertEqual(len(game.undone), 1)
+        game.move("S")
+        self.assertIsNone(game.redo())
+        self.assertFalse(game.move("M99").applied)  # illegal moves aren't journalled
+        self.assertEqual(len(game.journal), 1)
+
+    def test_compact_state_advance(self):
+        for draw_count in (1, 3):
+            test_location_list = deal_new_hand(seed=2, draw_count=draw_count)
+            test_location_list[13].add_cards([test_location_list[11].card_list.popleft()])  # a card has been played
+            state = CompactState.from_location_list(test_location_list)
+            for turn in range(0, 60):  # several passes through the spares
+                test_location_list[11].advance(test_location_list)
+                state.advance()
+                self.assertEqual(state, CompactState.from_location_list(test_location_list))
+
+    '''
+    Zobrist hash test cases
+    '''
+    def test_game_hash_incremental(self):
+        import random
+        rng = random.Random(4)
+        game = Game(deal_new_hand(seed=4))
+        hashes = [game.hash]
+        for turn in range(0, 300):
+            game.move(rng.choice(find_legal_moves(game.location_list)))
+            self.assertEqual(game.hash, zobrist_hash(game.location_list))
+            hashes.append(game.hash)
+        while game.journal:
+            game.undo()
+            hashes.pop()
+            self.assertEqual(game.hash, hashes[-1])
+
+    def test_zobrist_hash(self):
+        test_location_list = deal_new_hand(seed=9)
+        self.assertEqual(zobrist_hash(test_location_list), zobrist_hash(deal_new_hand(seed=9)))
+        self.assertNotEqual(zobrist_hash(test_location_list), zobrist_hash(deal_new_hand(seed=10)))
+
+        # swapping two columns gives the same hash
+        hash_value = zobrist_hash(test_location_list)
+        test_location_list[0], test_location_list[3] = test_location_list[3], test_location_list[0]
+        self.assertEqual(zobrist_hash(test_location_list), hash_value)
+
+        # turning a card over changes it
+        test_location_list[1].face_up_start = 0
+        self.assertNotEqual(zobrist_hash(test_location_list), hash_value)
+
+    '''
+    CardIndex class test cases
+    '''
+    def test_card_index(self):
+        import random
+        rng = random.Random(6)
+        game = Game(deal_new_hand(seed=6))
+        self.assertEqual(game.index.face_up_starts, [0, 1, 2, 3, 4, 5, 6])
+        self.assertEqual(game.index.homes, HOME_INDEX)
+
+        for turn in range(0, 300):
+            legal_move_list = find_legal_moves(game.location_list)
+            self.assertEqual(game.find_legal_moves(), legal_move_list)
+            game.move(rng.choice(legal_move_list))
+            if turn % 3 == 0:
+                game.undo()
+            new_index = CardIndex(game.location_list)
+            self.assertEqual(game.index.places, new_index.places)
+            self.assertEqual(game.index.face_up_starts, new_index.face_up_starts)
+
+    def test_find_home(self):
+        self.assertEqual(find_home(self.location_list, "Hearts"), 9)
+        self.location_list[7], self.location_list[9] = self.location_list[9], self.location_list[7]
+        self.assertEqual(find_home(self.location_list, "Hearts"), 7)  # home piles in a different order
+
+    '''
+    solve_game function test cases
+    '''
+    def test_solve_game_winnable(self):
+        test_location_list = deal_new_hand(seed=8)
+        result = solve_game(test_location_list)
+        self.assertTrue(result.winnable)
+        self.assertEqual(len(test_location_list[11].card_list), 24)  # starting hand not changed
+
+        for move in result.moves:
+            self.assertTrue(execute_move(test_location_list, move), move)
+        self.assertTrue(have_won(test_location_list))
+
+    def test_solve_game_unwinnable(self):
+        # everything is home except the Hearts, and the 2 of Hearts is stuck under the 3
+        self.location_list[7].add_cards(self.deck[26:39])  # Clubs
+        self.location_list[8].add_cards(self.deck[39:52])  # Diamonds
+        self.location_list[9].add_cards(self.deck[0:1])  # Ace of Hearts
+        self.location_list[10].add_cards(self.deck[13:26])  # Spades
+        self.location_list[0] = Column(1, [self.deck[1], self.deck[2]], face_up_start=1)  # 2 face-down, 3 face-up
+        self.location_list[1] = Column(2, self.deck[3:13], face_up_start=9)  # 4 -> Queen face-down, King face-up
+
+        result = solve_game(self.location_list)
+        self.assertFalse(result.winnable)
+        self.assertIsNone(result.moves)
+
+    def test_solve_game_gives_up(self):
+        result = solve_game(deal_new_hand(seed=1), max_nodes=50)
+        self.assertIsNone(result.winnable)
+        self.assertEqual(result.nodes, 50)
+
+    def test_parallel_solve_game(self):
+        for seed, processes in [(8, 1), (2, 2)]:
+            test_location_list = deal_new_hand(seed)
+            result = parallel_solve_game(test_location_list, processes=processes)
+            self.assertTrue(result.winnable)
+            self.assertEqual(len(test_location_list[11].card_list), 24)  # starting hand not changed
+            for move in result.moves:
+                self.assertTrue(execute_move(test_location_list, move), move)
+            self.assertTrue(have_won(test_location_list))
+
+        # budgets are checked every SOLVE_BATCH positions
+        result = parallel_solve_game(deal_new_hand(seed=1), max_nodes=50, processes=2)
+        self.assertIsNone(result.winnable)
+        self.assertLessEqual(result.nodes, 2 * SOLVE_BATCH + 1)
+        self.assertIsNone(parallel_solve_game(deal_new_hand(seed=1), time_budget=0,
+                                              processes=1).winnable)
+
+    def test_parallel_solve_game_unwinnable(self):
+        # as in test_solve_game_unwinnable
+        self.location_list[7].add_cards(self.deck[26:39])
+        self.location_list[8].add_cards(self.deck[39:52])
+        self.location_list[9].add_cards(self.deck[0:1])
+        self.location_list[10].add_cards(self.deck[13:26])
+        self.location_list[0] = Column(1, [self.deck[1], self.deck[2]], face_up_start=1)
+        self.location_list[1] = Column(2, self.deck[3:13], face_up_start=9)
+
+        result = parallel_solve_game(self.location_list, processes=2)
+        self.assertFalse(result.winnable)
+        self.assertIsNone(result.moves)
+
+    def test_parallel_solve_game_worker_fails(self):
+        # the worker searching the only task fails, and the other one must
+        #   not wait for it forever (there's no time budget)
+        import Solitaire_1_5
+        with mock.patch.object(Solitaire_1_5, "search_task", side_effect=MemoryError), \
+                mock.patch("sys.stderr", new_callable=io.StringIO):
+            with self.assertRaises(RuntimeError):
+                parallel_solve_game(deal_new_hand(seed=1), processes=2)
+            with self.assertRaises(MemoryError):
+                parallel_solve_game(deal_new_hand(seed=1), processes=1)
+
+    def test_shared_hash_set(self):
+        seen = SharedHashSet(100)
+        self.assertEqual(len(seen.table), 1024)
+        self.assertTrue(seen.add(5))
+        self.assertFalse(seen.add(5))
+        self.assertTrue(seen.add(5 + 1024))  # same slot, so goes in the next one
+        self.assertFalse(seen.add(5 + 1024))
+        self.assertTrue(seen.add(0))
+
+    '''
+    batch simulation test cases
+    '''
+    def test_play_one_game(self):
+        result = play_one_game(3, random_policy, max_moves=300)
+        self.assertEqual(result, play_one_game(3, random_policy, max_moves=300))  # repeatable
+        seed, won, moves, stock_passes = result
+        self.assertEqual(seed, 3)
+        self.assertLessEqual(moves, 300)
+
+    def test_simulate_games(self):
+        report = simulate_games(1, 20, greedy_policy, processes=1)
+        self.assertEqual(report.games, 20)
+        self.assertTrue(0 <= report.win_rate() <= 1)
+        self.assertGreater(report.moves_per_game(), 0)
+
+        pool_report = simulate_games(1, 20, greedy_policy, processes=2)
+        self.assertEqual(
+            (pool_report.games, pool_report.wins, pool_report.moves, pool_report.stock_passes),
+            (report.games, report.wins, report.moves, report.stock_passes))
+
+    def test_move_hooks(self):
+        test_location_list = deal_new_hand(seed=1)
+        calls = []
+
+        class RecordingHook(MoveHook):
+            def before_move(self, hook_location_list, uppercase_move):
+                calls.append(("before", uppercase_move))
+
+            def after_move(self, hook_location_list, uppercase_move, result, seconds):
+                calls.append(("after", uppercase_move, result.applied))
+                self.seconds = seconds
+
+        hook = add_move_hook(RecordingHook())
+        counters = add_move_hook(MoveCounters())
+        try:
+            execute_move(test_location_list, "S")
+            execute_move(test_location_list, "M12")
+            execute_move(test_location_list, "X")
+        finally:
+            remove_move_hook(hook)
+            remove_move_hook(counters)
+        execute_move(test_location_list, "S")  # not seen by either hook
+
+        self.assertEqual(calls, [("before", "S"), ("after", "S", True),
+                                 ("before", "M12"), ("after", "M12", False),
+                                 ("before", "X"), ("after", "X", False)])
+        self.assertGreaterEqual(hook.seconds, 0)
+        self.assertEqual(MOVE_HOOKS, [])
+        self.assertEqual(counters.moves, {"advance": 1})
+        self.assertEqual(counters.illegal, {"column to column": 1, "not understood": 1})
+        self.assertEqual(counters.rule_calls, {"SpareCards.advance": 1, "Column.move_cards": 1})
+        self.assertTrue(all(seconds >= 0 for seconds in counters.rule_seconds.values()))
+        self.assertIn("Illegal attempts: 2", counters.summary())
+
+        # without hooks the rule method isn't timed
+        self.assertIsNone(apply_move(test_location_list, "S").rule_seconds)
+        self.assertIsNotNone(apply_move(test_location_list, "S", timed=True).rule_seconds)
+
+    def test_game_hooks(self):
+        games = []
+
+        class GameHook(MoveHook):
+            def game_start(self, hook_location_list):
+                games.append(("start", have_won(hook_location_list)))
+
+            def game_end(self, hook_location_list, won):
+                games.append(("end", won))
+
+        hook = add_move_hook(GameHook())
+        counters = add_move_hook(MoveCounters())
+        try:
+            play_one_game(3, random_policy, max_moves=20)
+            play_script(["S S U"], seed=1)
+        finally:
+            remove_move_hook(hook)
+            remove_move_hook(counters)
+        self.assertEqual(games, [("start", False), ("end", False)] * 2)
+        self.assertEqual((counters.games, counters.wins), (2, 0))
+        self.assertIn("Games: 2, won 0", counters.summary())
+
+    def test_move_counters_recycles(self):
+        counters = add_move_hook(MoveCounters())
+        try:
+            play_one_game(3, random_policy, max_moves=200)
+        finally:
+            remove_move_hook(counters)
+        self.assertGreater(counters.recycles, 0)
+        self.assertEqual(counters.moves.get("advance", 0), counters.rule_calls["SpareCards.advance"])
+        self.assertEqual(move_type("SE"), "spares to home")
+        self.assertEqual(move_type("S4"), "spares to column")
+        self.assertEqual(move_type("7"), "column to home")
+
+    def test_suggest_move(self):
+        # everything is home except the Queen and King of Hearts
+        self.location_list[7].add_cards(self.deck[26:39])  # Clubs
+        self.location_list[8].add_cards(self.deck[39:52])  # Diamonds
+        self.location_list[9].add_cards(self.deck[0:11])  # Ace -> Jack of Hearts
+        self.location_list[10].add_cards(self.deck[13:26])  # Spades
+        self.location_list[0].add_cards([self.deck[11]])
+        self.location_list[1].add_cards([self.deck[12]])
+        before = CompactState.from_location_list(self.location_list).pack()
+
+        hint = suggest_move(self.location_list, time_budget=0.01, seed=1)
+        self.assertEqual(hint.move, "1")
+        self.assertEqual(hint.win_rate, 1.0)
+        self.assertEqual(set(hint.scores), set(order_moves(self.location_list, find_legal_moves(self.location_list))))
+        self.assertEqual(hint.playouts, sum(playouts for wins, playouts in hint.scores.values()))
+        self.assertEqual(CompactState.from_location_list(self.location_list).pack(), before)
+
+        # with no time for any playouts, the first move from order_moves
+        hint = suggest_move(self.location_list, time_budget=0, seed=1)
+        self.assertEqual(hint.move, order_moves(self.location_list, find_legal_moves(self.location_list))[0])
+        self.assertIsNone(hint.win_rate)
+        self.assertEqual(hint.playouts, 0)
+
+        with multiprocessing.Pool(2) as pool:
+            pool_hint = suggest_move(self.location_list, time_budget=0.5, pool=pool, processes=2)
+        self.assertEqual(pool_hint.move, "1")
+        self.assertGreaterEqual(pool_hint.scores["1"][1], 2)
+
+    def test_suggest_move_no_moves(self):
+        self.assertIsNone(suggest_move(self.location_list, time_budget=0.01))
+
+    def test_shuffle_face_down(self):
+        state = CompactState.from_location_list(deal_new_hand(seed=1))
+        shuffled = state.copy()
+        shuffle_face_down(shuffled, random.Random(1))
+        for column, shuffled_column in zip(state.columns, shuffled.columns):
+            self.assertEqual(column[-1], shuffled_column[-1])  # the face-up card
+            self.assertEqual(len(column), len(shuffled_column))
+        self.assertEqual(sorted(b"".join(state.columns)), sorted(b"".join(shuffled.columns)))
+        self.assertNotEqual(state.columns, shuffled.columns)
+        self.assertEqual(state.spares, shuffled.spares)
+
+    def test_encode_moves(self):
+        self.assertEqual(len(MOVE_CODES), len(VALID_MOVES))
+        self.assertTrue(all(code < 256 for code in MOVE_CODES.values()))
+        move_list = ["M35", "S4", "SE", "S", "7"]
+        encoded_moves = encode_moves(move_list)
+        self.assertEqual(len(encoded_moves), 5)
+        self.assertEqual(decode_moves(encoded_moves), move_list)
+        with self.assertRaises(KeyError):
+            encode_moves(["NEW"])
+
+    def test_replay_log(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "games.log")
+            self.assertEqual(record_games(path, 1, 5, greedy_policy, processes=1), 5)
+            # appending keeps the games already there
+            self.assertEqual(record_games(path, 6, 3, greedy_policy, processes=2), 3)
+
+            records = list(read_replay_log(path))
+            self.assertEqual([record.seed for record in records], list(range(1, 9)))
+            for record in records:
+                seed, won, moves, stock_passes = play_one_game(record.seed, greedy_policy)
+                self.assertEqual((record.won, len(record.moves)), (won, moves))
+                replay_location_list, illegal_at = replay_game(record)
+                self.assertIsNone(illegal_at)
+                self.assertEqual(home_counts(replay_location_list), record.homes)
+
+            with open(path, "ab") as log_file:
+                log_file.write(b"\x01\x02")
+            with self.assertRaises(ValueError):
+                list(read_replay_log(path))
+
+            # only replay logs are appended to
+            other_path = os.path.join(directory, "deals.idx")
+            with open(other_path, "wb") as other_file:
+                other_file.write(SOLVE_INDEX_MAGIC)
+            self.assertRaises(ValueError, ReplayLogWriter, other_path)
+            with open(other_path, "rb") as other_file:
+                self.assertEqual(other_file.read(), SOLVE_INDEX_MAGIC)
+
+    def test_replay_game_illegal_move(self):
+        record = GameRecord(1, 3, ["S", "M12", "S"], False, (0, 0, 0, 0))
+        replay_location_list, illegal_at = replay_game(record)
+        self.assertEqual(illegal_at, 1)
+
+    def test_verify_replay_log(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "games.log")
+            record_games(path, 1, 6, greedy_policy, processes=1)
+            records = list(read_replay_log(path))
+            self.assertTrue(verify_replay_log(path, processes=1).ok())
+
+            # a game that claims a different result, and one with a bad move
+            records[1].won = not records[1].won
+            records[4].moves.insert(0, "M12")
+            bad_path = os.path.join(directory, "bad.log")
+            with ReplayLogWriter(bad_path) as writer:
+                for record in records:
+                    writer.write(record)
+
+            for processes, batch_size in [(1, 4096), (2, 4)]:
+                report = verify_replay_log(bad_path, processes, batch_size)
+                self.assertEqual(report.games, 6)
+                self.assertEqual([(game_index, seed) for game_index, seed, mismatch in report.mismatches],
+                                 [(1, 2), (4, 5)])
+                self.assertIn("M12", report.mismatches[1][2])
+
+            with open(bad_path, "ab") as log_file:
+                log_file.write(b"\x01\x02")
+            report = verify_replay_log(bad_path, processes=1)
+            self.assertEqual(report.mismatches[-1][0:2], (6, None))
+
+    def test_play_and_record(self):
+        moves_played = []
+        seed, won, moves, stock_passes = play_one_game(3, greedy_policy,
+                                                       moves_played=moves_played)
+        record = play_and_record(3, greedy_policy)
+        self.assertEqual((record.moves, record.won), (moves_played, won))
+        self.assertIsNone(verify_game(record))
+
+    def test_verify_homes_mismatch(self):
+        record = play_and_record(3, greedy_policy)
+        record.homes = (13, 13, 13, 13)
+        self.assertIn("home piles", verify_game(record))
+
+    def test_verify_bad_deal_number(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "games.log")
+            with ReplayLogWriter(path) as writer:
+                writer.write(play_and_record(3, greedy_policy))
+                writer.write(GameRecord(MAX_DEAL_NUMBER + 1, 3, ["S"], False, (0, 0, 0, 0)))
+            for processes in (1, 2):
+                report = verify_replay_log(path, processes)
+                self.assertEqual(report.games, 2)
+                self.assertEqual([(game_index, seed) for game_index, seed, mismatch in report.mismatches],
+                                 [(1, MAX_DEAL_NUMBER + 1)])
+                self.assertIn("deal number", report.mismatches[0][2])
+
+    def test_verify_main(self):
+        import Verify_Solitaire_1_5 as verify
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "games.log")
+            record_games(path, 1, 3, greedy_policy, processes=1)
+            with mock.patch("builtins.print"):
+                self.assertEqual(verify.main([path, "--processes", "1"]), 0)
+                with ReplayLogWriter(path) as writer:
+                    writer.write(GameRecord(1, 3, ["M12"], False, (0, 0, 0, 0)))
+                self.assertEqual(verify.main([path, "--processes", "1"]), 1)
+
+    def test_solve_index(self):
+        import Solitaire_1_5
+        # deals 100 -> 109: every third can be won, in 100 + seed moves
+        def fake_solve_deal(seed, max_nodes, draw_count):
+            if seed % 3 == 0:
+                return DEAL_WINNABLE, 100 + seed
+            return (DEAL_UNWINNABLE if seed % 3 == 1 else DEAL_UNKNOWN), 0
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "deals.idx")
+            with mock.patch.object(Solitaire_1_5, "solve_deal", fake_solve_deal):
+                counts = build_solve_index(path, 100, 10, processes=1)
+            self.assertEqual(counts, {"winnable": 3, "unwinnable": 4, "unknown": 3})
+            self.assertEqual(os.path.getsize(path),
+                             len(SOLVE_INDEX_MAGIC) + SOLVE_INDEX_HEADER.size + 3 + 20)
+
+            with SolveIndex(path) as solve_index:
+                self.assertEqual((solve_index.first_seed, len(solve_index)), (100, 10))
+                self.assertEqual([solve_index.status(seed) for seed in range(99, 111)],
+                                 [0, 2, 0, 1, 2, 0, 1, 2, 0, 1, 2, 0])
+                self.assertEqual(solve_index.solution_length(108), 208)
+                self.assertIsNone(solve_index.solution_length(107))
+                self.assertIn(solve_index.winnable_deal(random.Random(1)), (102, 105, 108))
+                deal_location_list = deal_new_hand(solve_index=solve_index)
+                self.assertIn(CompactState.from_location_list(deal_location_list),
+                              [CompactState.from_location_list(deal_new_hand(seed))
+                               for seed in (102, 105, 108)])
+                self.assertRaises(ValueError, deal_new_hand, draw_count=1,
+                                  solve_index=solve_index)
+                self.assertIn(play_script([], solve_index=solve_index)[0], (102, 105, 108))
+                self.assertRaises(ValueError, play_script, [], draw_count=1,
+                                  solve_index=solve_index)
+                with mock.patch.object(solve_index, "winnable_deal", return_value=None):
+                    self.assertRaises(ValueError, play_script, [], solve_index=solve_index)
+            # the scripted command line checks the index too
+            with mock.patch("sys.stdin", io.StringIO("")):
+                self.assertRaises(ValueError, main, ["-", "--draw-count", "1",
+                                                     "--winnable", path])
+
+            with open(path, "r+b") as index_file:
+                index_file.truncate(30)
+            self.assertRaises(ValueError, SolveIndex, path)
+
+            # unknown deals are solved again with parallel_solve_game
+            with mock.patch.object(Solitaire_1_5, "solve_deal", return_value=(DEAL_UNKNOWN, 0)):
+                counts = build_solve_index(path, 8, 1, processes=1, retry_nodes=10000)
+            self.assertEqual(counts["winnable"], 1)
+            with SolveIndex(path) as solve_index:
+                self.assertEqual(solve_index.status(8), DEAL_WINNABLE)
+                self.assertGreater(solve_index.solution_length(8), 0)
+
+    def test_solve_deal(self):
+        status, length = solve_deal(8)
+        self.assertEqual(status, DEAL_WINNABLE)
+        self.assertGreater(length, 0)
+
+    def test_solvability_main(self):
+        import Solvability_Solitaire_1_5 as solvability
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "deals.idx")
+            with mock.patch("builtins.print"):
+                self.assertEqual(solvability.main([path, "--first", "8", "--count", "1",
+                                                   "--processes", "1"]), 0)
+            with SolveIndex(path) as solve_index:
+                self.assertEqual(solve_index.status(8), DEAL_WINNABLE)
+                self.assertEqual(solve_index.solution_length(8), solve_deal(8)[1])
+
+    @mock.patch("shutil.get_terminal_size", return_value=os.terminal_size((200, 50)))
+    def test_board_renderer(self, mock_size):
+        output = io.StringIO()
+        game = Game(deal_new_hand(1))
+        renderer = add_move_hook(BoardRenderer(output, ansi=True))
+        self.addCleanup(remove_move_hook, renderer)
+        renderer.follow(game.location_list)
+        self.assertEqual(renderer.render(game.location_list), len(BOARD_ROWS))
+        self.assertTrue(output.getvalue().startswith("\x1b[H\x1b[2J"))
+
+        output.truncate(0)
+        output.seek(0)
+        game.move("S")
+        self.assertEqual(renderer.render(game.location_list), 2)  # spares and visible
+        self.assertIn(f"\x1b[{BOARD_ROWS.index(13) + 1};1HVisible pile: 9 of Hearts", output.getvalue())
+        self.assertEqual(output.getvalue().count("\x1b[K"), 2)
+        self.assertEqual(renderer.render(game.location_list), 0)
+
+        # the piles marked by the hook, including automatic moves and 
+        #   undoing them, are enough to keep every line up to date
+        game.auto_home = True
+        rng = random.Random(1)
+        for turn in range(0, 300):
+            legal_move_list = game.find_legal_moves()
+            if rng.random() < 0.2:
+                game.undo()
+            else:
+                game.move(rng.choice(legal_move_list))
+            renderer.render(game.location_list)
+            self.assertEqual(renderer.lines, board_lines(game.location_list))
+
+        # moves on other location_lists, i.e. a hint's playouts, are ignored
+        execute_move(deal_new_hand(2), "S")
+        self.assertEqual(renderer.dirty, set())
+
+        # on an 80 column terminal the row of dashes (100 wide) takes 2 rows, 
+        #   and a 30 card column several more
+        mock_size.return_value = os.terminal_size((80, 60))
+        self.assertEqual(renderer.render(game.location_list), len(BOARD_ROWS))  # new width
+        game.location_list[0].card_list = self.deck[0:30]
+        column_rows = screen_rows(pile_line(game.location_list, 0), 80)
+        self.assertGreater(column_rows, 3)
+        renderer.mark_moved(MoveResult("1", True, source=0, destination=7))
+        output.truncate(0)
+        output.seek(0)
+        self.assertEqual(renderer.render(game.location_list), len(BOARD_ROWS))  # rows moved
+        self.assertTrue(output.getvalue().startswith("\x1b[H\x1b[2J"))
+
+        output.truncate(0)
+        output.seek(0)
+        renderer.mark_moved(game.move("S"))
+        redrawn = renderer.render(game.location_list)
+        self.assertIn(redrawn, (2, 3))  # 3 if the spares were recycled
+        lines = board_lines(game.location_list)
+        self.assertEqual(renderer.lines, lines)
+        # below every row the lines above it take up, counting from 1
+        visible_row = 1 + sum(screen_rows(line, 80) for line in lines[0:BOARD_ROWS.index(13)])
+        self.assertGreater(visible_row, BOARD_ROWS.index(13) + column_rows)
+        self.assertIn(f"\x1b[{visible_row};1H{lines[BOARD_ROWS.index(13)]}\x1b[K",
+                      output.getvalue())
+        self.assertEqual(output.getvalue().count("\x1b[K"), redrawn)
+
+        # with no room for the prompt below the board, the whole board is drawn
+        mock_size.return_value = os.terminal_size((80, 24))
+        output.truncate(0)
+        output.seek(0)
+        game.move("S")
+        self.assertEqual(renderer.render(game.location_list), len(BOARD_ROWS))
+        self.assertTrue(output.getvalue().startswith("\x1b[H\x1b[2J"))
+
+        plain_output = io.StringIO()
+        plain_renderer = BoardRenderer(plain_output, ansi=False)
+        plain_renderer.render(game.location_list)
+        plain_renderer.render(game.location_list)
+        self.assertEqual(plain_output.getvalue(), board_frame(game.location_list) * 2)
+
+    def test_decide_move_help(self):
+        renderer = BoardRenderer(io.StringIO(), ansi=False)
+        renderer.render(self.location_list)
+        with mock.patch("builtins.input", side_effect=["?", "", "s"]), \
+                mock.patch("builtins.print") as mock_print:
+            self.assertEqual(decide_move(self.location_list, renderer), "S")
+        printed = [call.args[0] for call in mock_print.call_args_list]
+        self.assertIn("\n" + MOVE_HELP, printed)
+        self.assertTrue(all(text.count("\n") <= 1 for text in printed if text != "\n" + MOVE_HELP))
+
+    def test_display_text(self):
+        self.location_list[0].add_cards([self.deck[0], self.deck[12]])
+        self.location_list[0].face_up_start = 1
+        self.assertEqual(self.location_list[0].display_text(), "1: x, King of Hearts")
+        self.assertEqual(self.location_list[1].display_text(), "2: No cards")
+        self.assertEqual(pile_line(self.location_list, 7), "Clubs home - ...Empty")
+
+    def test_play_game_restart_and_new(self):
+        import Solitaire_1_5
+        moves = solve_game(deal_new_hand(8)).moves
+        # more new games than the recursion limit, then a restart, then a win
+        inputs = ["NEW", ""] * (sys.getrecursionlimit() + 10) + ["S", "RESTART"] + moves
+        with mock.patch("builtins.input", side_effect=inputs), \
+                mock.patch("builtins.print") as mock_print, \
+                mock.patch("sys.stdout", new_callable=io.StringIO), \
+                mock.patch.object(Solitaire_1_5, "new_deal_number", return_value=8), \
+                mock.patch.object(Solitaire_1_5, "deal_new_hand", wraps=deal_new_hand) as mock_deal:
+            play_game(auto_home=False)  # the solution already has its home moves
+        # the restart didn't deal again
+        self.assertEqual(mock_deal.call_count, sys.getrecursionlimit() + 11)
+        self.assertIn("Congratulations", mock_print.call_args[0][0])
+
+        # a deal number only picks the first deal
+        inputs = ["S", "NEW", ""] + moves
+        with mock.patch("builtins.input", side_effect=inputs), \
+                mock.patch("builtins.print"), \
+                mock.patch("sys.stdout", new_callable=io.StringIO), \
+                mock.patch.object(Solitaire_1_5, "new_deal_number", return_value=8), \
+                mock.patch.object(Solitaire_1_5, "deal_new_hand", wraps=deal_new_hand) as mock_deal:
+            play_game(auto_home=False, seed=3)
+        self.assertEqual([call[0][0] for call in mock_deal.call_args_list], [3, None])
+
+    def test_play_script(self):
+        moves = solve_game(deal_new_hand(8)).moves
+        move_lines = ["# the solution to deal 8\n", " ".join(moves[0:10]).lower() + "\n",
+                      "\n", "M12 U R  # M12 isn't allowed\n"] + [move + "\n" for move in moves[10:]]
+        seed, game, errors = play_script(iter(move_lines), seed=8)
+        self.assertEqual(seed, 8)
+        self.assertTrue(have_won(game.location_list))
+        self.assertEqual(game.get_moves(), moves)
+        self.assertEqual(errors[0][0:2], (4, "M12"))
+        self.assertEqual(len(errors), 1)
+
+        summary = script_summary(seed, game, errors)
+        self.assertEqual(json.loads(json.dumps(summary)), summary)
+        self.assertTrue(summary["won"])
+        self.assertEqual(summary["homes"], {"Clubs": 13, "Diamonds": 13, "Hearts": 13, "Spades": 13})
+        self.assertEqual(summary["errors"][0]["line"], 4)
+
+    def test_safe_home_move(self):
+        self.location_list[0].add_cards([self.deck[1]])  # 2 of Hearts
+        self.location_list[9].add_cards([self.deck[0]])
+        self.assertEqual(safe_home_move(self.location_list), "1")  # twos are always safe
+        self.location_list[9].add_cards([self.location_list[0].card_list.pop()])
+        self.location_list[13].add_cards([self.deck[2]])  # 3 of Hearts
+        self.assertIsNone(safe_home_move(self.location_list))  # a black 2 might need it
+        self.location_list[7].add_cards([self.deck[26], self.deck[27]])
+        self.location_list[10].add_cards([self.deck[13]])
+        self.assertIsNone(safe_home_move(self.location_list))
+        self.location_list[10].add_cards([self.deck[14]])
+        self.assertEqual(safe_home_move(self.location_list), "SE")
+        self.assertIsNone(safe_home_move(self.location_list, spares=False))
+        self.assertEqual([result.move for result in play_safe_home_moves(self.location_list)], ["SE"])
+
+    def test_game_auto_home(self):
+        # Ace of Hearts on a face-down Ace of Diamonds, which goes home by itself
+        self.location_list[0].add_cards([self.deck[39], self.deck[0]])
+        self.location_list[0].face_up_start = 1
+        self.location_list[1].add_cards([self.deck[14]])
+        game = Game(self.location_list, auto_home=True)
+        result = game.move("1")
+        self.assertEqual([(r.move, r.automatic) for r in game.last_results],
+                         [("1", False), ("1", True)])
+        self.assertEqual(len(self.location_list[8].card_list), 2)
+        self.assertEqual(game.hash, zobrist_hash(self.location_list))
+
+        self.assertIs(game.undo(), result)  # the automatic move is undone too
+        self.assertEqual(len(game.last_results), 2)
+        self.assertEqual(self.location_list[0].card_list, [self.deck[39], self.deck[0]])
+        self.assertEqual(self.location_list[0].face_up_start, 1)
+        self.assertEqual(game.hash, zobrist_hash(self.location_list))
+
+        self.assertEqual(game.redo().move, "1")
+        self.assertEqual(game.get_moves(), ["1", "1"])
+        self.assertEqual(len(self.location_list[0].card_list), 0)
+        self.assertEqual(game.hash, zobrist_hash(self.location_list))
+
+    def test_autocomplete(self):
+        # clubs and diamonds home, hearts and spades in two alternating runs
+        self.location_list[7].add_cards(self.deck[26:39])
+        self.location_list[8].add_cards(self.deck[39:52])
+        for x, first in ((0, 0), (1, 13)):
+            for value in range(12, -1, -1):
+                suit_start = first if value % 2 == 0 else 13 - first
+                self.location_list[x].add_cards([self.deck[suit_start + value]])
+        self.location_list[0].face_up_start = 1
+        self.assertIsNone(autocomplete_moves(self.location_list))
+        self.location_list[0].face_up_start = 0
+
+        game = Game(self.location_list)
+        results = game.autocomplete()
+        self.assertEqual(len(results), 26)
+        self.assertTrue(have_won(self.location_list))
+        self.assertEqual(game.hash, zobrist_hash(self.location_list))
+        game.undo()  # all of it at once
+        self.assertEqual(game.journal, [])
+        self.assertEqual(len(self.location_list[1].card_list), 13)
+
+        self.location_list[13].add_cards([self.location_list[1].card_list.pop()])
+        self.assertIsNone(Game(self.location_list).autocomplete())  # a spare card left
+
+    def test_play_position_auto_home(self):
+        for seed in range(1, 6):
+            moves_played = []
+            seed, won, moves, stock_passes = play_one_game(
+                seed, greedy_policy, moves_played=moves_played, auto_home=True)
+            self.assertLessEqual(moves, len(moves_played))
+            replay_location_list = deal_new_hand(seed)
+            for move in moves_played:
+                self.assertTrue(execute_move(replay_location_list, move).applied)
+            self.assertEqual(have_won(replay_location_list), won)
+
+    def test_main_script(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "moves.txt")
+            with open(path, "w") as moves_file:
+                moves_file.write("S\nS\n")
+            with mock.patch("builtins.print") as mock_print, \
+                    mock.patch("builtins.input") as mock_input:
+                self.assertEqual(main([path, "--seed", "1", "--json"]), 0)
+                summary = json.loads(mock_print.call_args[0][0])
+                self.assertEqual((summary["seed"], summary["moves"]), (1, ["S", "S"]))
+                with mock.patch("sys.stdin", ["X\n"]):
+                    self.assertEqual(main(["-", "--draw-count", "1"]), 1)
+                mock_input.assert_not_called()
+
+    def test_main_play(self):
+        import Solitaire_1_5
+        with mock.patch.object(Solitaire_1_5, "play_game") as mock_play_game:
+            self.assertEqual(main(["--seed", "8", "--draw-count", "1"]), 0)
+        mock_play_game.assert_called_once_with(1, seed=8)
+        with mock.patch("sys.stderr", new_callable=io.StringIO):
+            self.assertRaises(SystemExit, main, ["--draw-count", "0"])
+
+    '''
+    server module test cases
+    '''
+    def test_session(self):
+        from Server_Solitaire_1_5 import Session
+        session = Session(1, seed=1)
+        self.assertEqual(session.hello(), "HELLO session 1 deal 1")
+        self.assertEqual(session.handle("s\n"), "OK S")
+        self.assertEqual(session.handle("M12"), "ERR " + NOT_ALLOWED)
+        self.assertEqual(session.handle("u"), "OK U")
+        self.assertEqual(session.handle("U"), "ERR There is nothing to undo")
+        self.assertEqual(session.handle("R"), "OK R")
+        self.assertEqual(session.handle("M1 2"), "ERR " + NOT_UNDERSTOOD)
+        self.assertEqual(session.handle(""), "ERR " + NOT_UNDERSTOOD)
+        self.assertEqual(session.handle("NEW 8"), "HELLO session 1 deal 8")
+        self.assertEqual(session.handle("NEW -1"), "ERR That isn't a deal number")
+        self.assertIsNone(session.handle("quit"))
+
+        moves = solve_game(deal_new_hand(8)).moves
+        for move in moves[:-1]:
+            self.assertEqual(session.handle(move), "OK " + move)
+        self.assertEqual(session.handle(moves[-1]), "WON " + moves[-1])
+
+    def test_game_server(self):
+        from Server_Solitaire_1_5 import GameServer
+
+        async def read_reply(reader):
+            lines = []
+            while True:
+                line = (await reader.readline()).decode()
+                if line in (".\n", ""):
+                    return lines[0]
+                lines.append(line)
+
+        async def client(port):
+            reader, writer = await asyncio.open_connection("127.0.0.1", port)
+            replies = []
+            for command in ["NEW 1", "S", "M12", "QUIT"]:
+                status = await read_reply(reader)
+                replies.append(status.split()[0])
+                writer.write(f"{command}\n".encode())
+            replies.append(await reader.readline())
+            writer.close()
+            return replies
+
+        async def run():
+            game_server = GameServer()
+            server = await game_server.start(port=0)
+            port = server.sockets[0].getsockname()[1]
+            async with server:
+                replies = await asyncio.gather(*[client(port) for i in range(0, 20)])
+                await asyncio.sleep(0.01)
+                return replies, game_server.sessions
+
+        replies, sessions = asyncio.run(run())
+        self.assertEqual(len(replies), 20)
+        for reply in replies:
+            self.assertEqual(reply, ["HELLO", "HELLO", "OK", "ERR", b"BYE\n"])
+        self.assertEqual(sessions, {})
+
+    def test_session_snapshot(self):
+        from Server_Solitaire_1_5 import Session, SNAPSHOT_HEADER, RESULT_RECORD
+        session = Session(7, seed=8)
+        moves = solve_game(deal_new_hand(8)).moves
+        for move in moves[0:30]:
+            session.handle(move)
+        session.handle("U")
+        session.handle("U")
+
+        snapshot = session.to_bytes()
+        self.assertLessEqual(len(snapshot), SNAPSHOT_HEADER.size + 67 + 30 * RESULT_RECORD.size)
+        with mock.patch("Server_Solitaire_1_5.deal_new_hand") as mock_deal:
+            restored = Session.from_bytes(snapshot)
+            # undone from the journal, not by playing the game again
+            self.assertEqual(restored.handle("U"), "OK U")
+            self.assertEqual(restored.handle("R"), "OK R")
+        mock_deal.assert_not_called()
+        restored = Session.from_bytes(snapshot)
+        self.assertEqual((restored.session_id, restored.seed, restored.draw_count), (7, 8, 3))
+        self.assertEqual(restored.game.hash, session.game.hash)
+        self.assertEqual(restored.to_bytes(), snapshot)
+
+        # the moves made before the snapshot can still be redone and undone
+        self.assertEqual(restored.handle("R"), "OK R")
+        session.handle("R")
+        self.assertEqual(restored.game.hash, session.game.hash)
+        self.assertEqual(restored.game.get_moves(), moves[0:29])
+        for i in range(0, 29):
+            self.assertEqual(restored.handle("U"), "OK U")
+        self.assertEqual(restored.handle("U"), "ERR There is nothing to undo")
+        self.assertEqual(restored.game.hash, Game(deal_new_hand(8)).hash)
+
+        # a new move after restoring means nothing can be redone
+        restored = Session.from_bytes(snapshot)
+        restored.handle(moves[28])
+        self.assertEqual(restored.handle("R"), "ERR There is nothing to redo")
+
+    def test_session_store(self):
+        from Server_Solitaire_1_5 import Session, SessionStore
+        with tempfile.TemporaryDirectory() as directory:
+            store = SessionStore(directory, memory_cap=300)
+            sessions = [store.new_session() for i in range(0, 5)]
+            self.assertLessEqual(store.memory_used, 300)
+            self.assertLess(len(store.snapshots), 5)
+            self.assertIn(1, store)  # the oldest are on disk
+
+            sessions[0].handle("S")
+            store.put(sessions[0])
+            for session in sessions:
+                self.assertEqual(store.get(session.session_id).to_bytes(), session.to_bytes())
+            with self.assertRaises(KeyError):
+                store.get(99)
+
+            store.remove(5)
+            self.assertNotIn(5, store)
+            store.flush()
+            new_store = SessionStore(directory)
+            self.assertEqual(new_store.next_session_id, 5)
+            self.assertEqual(new_store.get(1).to_bytes(), sessions[0].to_bytes())
+
+    def test_game_server_resume(self):
+        from Server_Solitaire_1_5 import GameServer, Session, SessionStore
+
+        async def command(reader, writer, line):
+            writer.write(f"{line}\n".encode())
+            return await read_status(reader)
+
+        async def read_status(reader):
+            status = (await reader.readline()).decode().strip()
+            while (await reader.readline()) != b".\n":
+                pass
+            return status
+
+        async def run(store):
+            server = await GameServer(store=store).start(port=0)
+            port = server.sockets[0].getsockname()[1]
+            async with server:
+                reader, writer = await asyncio.open_connection("127.0.0.1", port)
+                statuses = [await read_status(reader)]
+                statuses.append(await command(reader, writer, "S"))
+                writer.close()
+                await asyncio.sleep(0.01)
+
+                reader, writer = await asyncio.open_connection("127.0.0.1", port)
+                statuses.append(await read_status(reader))
+                statuses.append(await command(reader, writer, "RESUME 1"))
+                statuses.append(await command(reader, writer, "RESUME 1"))
+                statuses.append(await command(reader, writer, "U"))
+                statuses.append(await command(reader, writer, "R"))
+                statuses.append(await command(reader, writer, "U"))
+                statuses.append(await command(reader, writer, "RESUME 9"))
+                writer.close()
+                await asyncio.sleep(0.01)
+            return statuses
+
+        with tempfile.TemporaryDirectory() as directory:
+            store = SessionStore(directory, memory_cap=0)  # every session on disk
+            with mock.patch.object(Session, "from_bytes", wraps=Session.from_bytes) as mock_from_bytes:
+                statuses = asyncio.run(run(store))
+            # only RESUME restores a session, the moves are played on it unpacked
+            self.assertEqual(mock_from_bytes.call_count, 1)
+            self.assertEqual([status.split()[0:3] for status in statuses],
+                             [["HELLO", "session", "1"], ["OK", "S"], ["HELLO", "session", "2"],
+                              ["HELLO", "session", "1"], ["ERR", "That", "session"], ["OK", "U"],
+                              ["OK", "R"], ["OK", "U"], ["ERR", "There", "is"]])
+            self.assertNotIn(2, store)  # nothing was played in it
+
+        # a store that fails while resuming leaves nothing behind
+        async def resume_failing():
+            game_server = GameServer(store=store)
+            session = Session(1)
+            with mock.patch.object(store, "get", side_effect=OSError):
+                with self.assertRaises(OSError):
+                    await game_server.handle_line(session, "RESUME 5")
+            game_server.close()
+            return game_server.sessions
+
+        with tempfile.TemporaryDirectory() as directory:
+            store = SessionStore(directory)
+            self.assertEqual(asyncio.run(resume_failing()), {})
+
+    def test_game_server_idle(self):
+        from Server_Solitaire_1_5 import GameServer, SessionStore
+
+        async def read_status(reader):
+            status = (await reader.readline()).decode().strip()
+            while (await reader.readline()) != b".\n":
+                pass
+            return status
+
+        async def run(store):
+            game_server = GameServer(store=store, idle_seconds=0.01)
+            server = await game_server.start(port=0)
+            port = server.sockets[0].getsockname()[1]
+            async with server:
+                reader, writer = await asyncio.open_connection("127.0.0.1", port)
+                statuses = [await read_status(reader)]
+                writer.write(b"S\n")
+                statuses.append(await read_status(reader))
+                await asyncio.sleep(0.1)
+                parked = dict(game_server.sessions)
+                in_store = store is not None and 1 in store.snapshots
+                writer.write(b"U\n")  # unpacked again for the next line
+                statuses.append(await read_status(reader))
+                writer.write(b"R\n")
+                statuses.append(await read_status(reader))
+                await asyncio.sleep(0.1)
+                writer.close()
+                await asyncio.sleep(0.1)
+            game_server.close()
+            return statuses, parked, in_store, game_server.sessions
+
+        for store_directory in [None, tempfile.TemporaryDirectory()]:
+            store = None
+            if store_directory is not None:
+                store = SessionStore(store_directory.name)
+            statuses, parked, in_store, sessions = asyncio.run(run(store))
+            self.assertEqual([status.split()[0:2] for status in statuses],
+                             [["HELLO", "session"], ["OK", "S"], ["OK", "U"], ["OK", "R"]])
+            self.assertEqual(parked, {1: None})
+            self.assertEqual(in_store, store is not None)
+            self.assertEqual(sessions, {})  # dropped while it was packed
+            if store is not None:
+                self.assertEqual(store.get(1).game.get_moves(), ["S"])
+                store_directory.cleanup()
+
+    '''
+    batch module test cases (these need NumPy)
+    '''
+    @unittest.skipUnless(importlib.util.find_spec("numpy"), "NumPy isn't installed")
+    def test_batch_games_deal(self):
+        from Batch_Solitaire_1_5 import BatchGames
+        batch = BatchGames(range(1, 21))
+        for n in range(0, 20):
+            self.assertEqual(batch.compact_state(n).pack(),
+                             CompactState.from_location_list(deal_new_hand(n + 1)).pack())
+        with self.assertRaises(ValueError):
+            BatchGames([1], draw_count=0)
+
+    @unittest.skipUnless(importlib.util.find_spec("numpy"), "NumPy isn't installed")
+    def test_batch_games_follow_the_rules(self):
+        from Batch_Solitaire_1_5 import BatchGames
+        for draw_count in [3, 1]:
+            batch = BatchGames(range(1, 101), draw_count, record_moves=True)
+            report = batch.run()
+            self.assertEqual(report.games, 100)
+            self.assertGreater(report.wins, 0)
+            # every game played again with execute_move ends in the same place
+            for n, record in enumerate(batch.records()):
+                self.assertIsNone(verify_game(record))
+                replay_location_list, illegal_at = replay_game(record)
+                self.assertEqual(CompactState.from_location_list(replay_location_list).pack(),
+                                 batch.compact_state(n).pack())
+                self.assertEqual(len(record.moves), batch.moves[n])
+
+    @unittest.skipUnless(importlib.util.find_spec("numpy"), "NumPy isn't installed")
+    def test_batch_games_match_single_games(self):
+        from Batch_Solitaire_1_5 import BatchGames, batch_policy
+        for draw_count in [3, 1]:
+            # deals 257 and 284 with draw 3, and 22 and 53 with draw 1, get to
+            # a point where the only spare cards left are visible ones
+            seeds = [257, 284, 22, 53] + list(range(1, 51))
+            batch = BatchGames(seeds, draw_count, record_moves=True)
+            batch.run()
+            for n, record in enumerate(batch.records()):
+                moves_played = []
+                seed, won, moves, stock_passes = play_one_game(
+                    seeds[n], batch_policy, draw_count=draw_count, moves_played=moves_played)
+                self.assertEqual((won, moves, stock_passes, moves_played),
+                                 (record.won, batch.moves[n], batch.stock_passes[n], record.moves))
+
+    @unittest.skipUnless(importlib.util.find_spec("numpy"), "NumPy isn't installed")
+    def test_simulate_batch(self):
+        from Batch_Solitaire_1_5 import simulate_batch
+        report = simulate_batch(1, 200, max_moves=20)
+        self.assertEqual(report.games, 200)
+        self.assertLessEqual(report.moves_per_game(), 20)
+
+    '''
+    benchmark module test cases
+    '''
+    def test_benchmarks(self):
+        import Benchmark_Solitaire_1_5 as benchmark
+        results = benchmark.run_benchmarks(["have_won", "SpareCards.advance"], repeat=1, scale=0.01)
+        self.assertEqual(set(results["benchmarks"]), {"have_won", "SpareCards.advance"})
+
+        slower_results = {"benchmarks": {"have_won": {"best": results["benchmarks"]["have_won"]["best"] * 2}}}
+        self.assertEqual(benchmark.compare_results(results, results), [])
+        self.assertEqual(benchmark.compare_results(results, slower_results)[0][0], "have_won")
     
     
 if __name__ == '__main__':
@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Welcome to the Solitaire Replay Verifier.
+
+Checks replay logs (see record_games and ReplayLogWriter): every game is
+    dealt again and its moves played through the rules engine, to check
+    that each move was allowed and that the game ended as recorded (won
+    or lost, and the same number of cards on each home pile).
+
+The games are shared out between all the CPU cores, and the logs are read
+    a batch at a time, so logs of any size can be checked.
+
+Usage:
+    python Verify_Solitaire_1_5.py games.log [more.log ...]
+
+Each mismatch is printed with its log file and game index, and the exit
+    code is 1 if there were any.
+
+"""
+
+import argparse
+import sys
+
+from Solitaire_1_5 import *  # import all from module
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Check Solitaire replay logs.")
+    parser.add_argument("paths", nargs="+", help="replay log files to check")
+    parser.add_argument("--processes", type=int, default=None,
+                        help="worker processes to use (default all CPU cores)")
+    parser.add_argument("--batch-size", type=int, default=4096,
+                        help="games read from the log at a time")
+    args = parser.parse_args(argv)
+
+    failed = False
+    for path in args.paths:
+        report = verify_replay_log(path, args.processes, args.batch_size)
+        for game_index, seed, mismatch in report.mismatches:
+            if seed is None:
+                print(f"{path} game {game_index}: {mismatch}")
+            else:
+                print(f"{path} game {game_index} (deal {seed}): {mismatch}")
+        print(f"{path}: {report}")
+        if not report.ok():
+            failed = True
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())